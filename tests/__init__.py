@@ -0,0 +1,9 @@
+import os
+import unittest
+
+
+def load_tests(loader: unittest.TestLoader, tests: unittest.TestSuite, pattern: str) -> unittest.TestSuite:
+    """ Let ``python -m unittest tests`` run every test module of the package. """
+    top: str = os.path.dirname(os.path.dirname(__file__))
+    tests.addTests(loader.discover(os.path.dirname(__file__), pattern or 'test*.py', top_level_dir=top))
+    return tests
@@ -0,0 +1,211 @@
+""" Helpers shared by the test modules. """
+import random
+from types import SimpleNamespace
+from typing import Any, Callable, Optional, cast
+
+from ygo_core.deck import Deck
+from ygo_core.enums import Player
+
+from ygo_client.executor import DelegatingExecutor
+from ygo_client.manager import GameManager
+from ygo_client.connection.packet import Packet
+from ygo_client.connection.codec import Message, encode
+from ygo_client.connection.enums.stoc_message import StocMessage
+from ygo_client.connection.messages import (
+    Start, DeckCount, PlayerOnly, NewPhase, Move, LocInfo, CardInfo, PosChange, Swap, Draw, LifePoints, ShuffleCards, Counter, CardPair
+)
+
+
+def game_message(msg_id: int, message: Message) -> Packet:
+    """ The GAME_MSG packet a server sends for message. """
+    return encode(StocMessage.GAME_MSG, message, msg_id)
+
+
+
+class RecordingExecutor(DelegatingExecutor):
+    """ Answers each decision with answers[method] and keeps the calls made. """
+    answers: dict[str, Any]
+    calls: list[tuple[str, tuple[Any, ...]]] # (method, arguments)
+
+    def __init__(self, **answers: Any) -> None:
+        self.answers = answers
+        self.calls = []
+
+
+    async def _decide(self, method: str, *args: Any) -> Any:
+        self.calls.append((method, args))
+        return self.answers[method]
+
+
+
+class ListCard:
+    """ Card holding the values GameManager sets and the views read. """
+    def __init__(self, card_id: int=0) -> None:
+        self.id = card_id
+        self.position: Any = 0
+        self.level = self.rank = self.attack = self.defence = 0
+        self.attribute: Any = None
+        self.race: Any = None
+        self.type: Any = None
+        self.is_faceup = False
+        self.counters: dict[int, int] = {}
+        self.equip_target: Optional[ListCard] = None
+        self.equip_cards: list[ListCard] = []
+        self.target_cards: list[ListCard] = []
+        self.targeted_by: list[ListCard] = []
+
+
+
+_ZONES: dict[int, int] = {0x04: 7, 0x08: 8} # location -> zones
+_LOCATIONS: tuple[int, ...] = (0x01, 0x02, 0x04, 0x08, 0x10, 0x20, 0x40)
+
+
+class ListDuel:
+    """ Duel keeping the cards of each location in a list, of fixed length for the zones.
+    Cards are inserted at their index and drawn from the end of the deck; the
+    notifications GameManager sends and this duel does not model do nothing. """
+    def __init__(self) -> None:
+        self.players: list[Player] = [Player.ME, Player.OPPONENT]
+        self.turn_player: Optional[Player] = None
+        self.phase: Any = None
+        self.cards: dict[tuple[Player, int], list[Optional[ListCard]]] = {
+            (player, location): [None] * _ZONES[location] if location in _ZONES else []
+            for player in self.players for location in _LOCATIONS
+        }
+        self.field: dict[Player, SimpleNamespace] = {
+            player: SimpleNamespace(
+                life_point=8000, deck=self.cards[(player, 0x01)], hand=self.cards[(player, 0x02)], extradeck=self.cards[(player, 0x40)]
+            ) for player in self.players
+        }
+
+
+    def __getattr__(self, name: str) -> Callable[..., None]:
+        if name.startswith(('on_', 'at_')):
+            return lambda *args: None
+        raise AttributeError(name)
+
+
+    def get_cards(self, player: Player, location: Any) -> list[Optional[ListCard]]:
+        return self.cards[(player, getattr(location, 'value', location))]
+
+
+    def get_card(self, player: Player, location: Any, index: int) -> ListCard:
+        cards: list[Optional[ListCard]] = self.get_cards(player, location)
+        card: Optional[ListCard] = cards[index]
+        if card is None:
+            card = cards[index] = ListCard()
+        return card
+
+
+    def add_card(self, card: ListCard, player: Player, location: Any, index: int) -> None:
+        cards: list[Optional[ListCard]] = self.get_cards(player, location)
+        if getattr(location, 'value', location) in _ZONES:
+            cards[index] = card
+        else:
+            cards.insert(index, card)
+
+
+    def remove_card(self, card: ListCard, player: Player, location: Any, index: int) -> None:
+        cards: list[Optional[ListCard]] = self.get_cards(player, location)
+        at: int = next(i for i, other in enumerate(cards) if other is card)
+        if getattr(location, 'value', location) in _ZONES:
+            cards[at] = None
+        else:
+            del cards[at]
+
+
+    def set_deck(self, player: Player, main: int, extra: int) -> None:
+        for location in _LOCATIONS:
+            cards: list[Optional[ListCard]] = self.cards[(player, location)]
+            cards[:] = [None] * len(cards) if location in _ZONES else []
+        self.cards[(player, 0x01)][:] = [ListCard() for _ in range(main)]
+        self.cards[(player, 0x40)][:] = [ListCard() for _ in range(extra)]
+
+
+    def on_draw(self, player: Player) -> None:
+        self.cards[(player, 0x02)].append(self.cards[(player, 0x01)].pop())
+
+
+    def on_lp_update(self, player: Player, lp: int) -> None:
+        self.field[player].life_point = lp
+
+
+    def on_damage(self, player: Player, damage: int) -> None:
+        self.field[player].life_point = max(0, self.field[player].life_point - damage)
+
+
+    def on_recover(self, player: Player, recover: int) -> None:
+        self.field[player].life_point += recover
+
+
+    def on_new_turn(self, player: Player) -> None:
+        self.turn_player = player
+
+
+    def on_new_phase(self, phase: Any) -> None:
+        self.phase = phase
+
+
+
+def list_manager() -> GameManager:
+    """ GameManager tracking a ListDuel. """
+    manager: GameManager = GameManager(Deck([], [], []), RecordingExecutor())
+    manager.duel = cast(Any, ListDuel())
+    return manager
+
+
+async def start(manager: GameManager, main: tuple[int, int]=(40, 40), extra: tuple[int, int]=(15, 15)) -> None:
+    await manager.on_start(Start(
+        player_type=0, lp_0=8000, lp_1=8000, deck_0=DeckCount(main=main[0], extra=extra[0]), deck_1=DeckCount(main=main[1], extra=extra[1])
+    ))
+
+
+async def play(manager: GameManager, rnd: random.Random) -> None:
+    """ Pass manager one random message changing its ListDuel. """
+    duel: ListDuel = cast(ListDuel, manager.duel)
+    side: int = rnd.randrange(2)
+    player: Player = duel.players[side]
+    cards: Callable[[int], list[Optional[ListCard]]] = lambda location: duel.cards[(player, location)]
+    occupied: Callable[[int], list[int]] = lambda location: [i for i, card in enumerate(cards(location)) if card is not None]
+
+    def move(location: int, index: int, to: int, to_index: int) -> Move:
+        return Move(card_id=rnd.randrange(1, 500), previous=LocInfo(side, location, index, 1), current=LocInfo(side, to, to_index, 1), reason=0)
+
+    kind: int = rnd.randrange(12)
+    if kind == 0 and cards(0x01):
+        manager.on_draw(Draw(player=side, count=rnd.randrange(1, 3) if len(cards(0x01)) > 1 else 1))
+    elif kind == 1 and cards(0x02):
+        zone: int = rnd.choice((0x04, 0x08))
+        free: list[int] = [i for i, card in enumerate(cards(zone)) if card is None]
+        to, to_index = (zone, free[0]) if free else (0x10, len(cards(0x10)))
+        manager.on_move(move(0x02, rnd.randrange(len(cards(0x02))), to, to_index))
+    elif kind == 2 and occupied(0x04) + occupied(0x08):
+        zone = rnd.choice([location for location in (0x04, 0x08) if occupied(location)])
+        to = rnd.choice((0x10, 0x20))
+        manager.on_move(move(zone, rnd.choice(occupied(zone)), to, len(cards(to))))
+    elif kind == 3 and cards(0x01):
+        manager.on_move(move(0x01, rnd.randrange(len(cards(0x01))), 0x20, 0))
+    elif kind == 4 and occupied(0x04):
+        index: int = rnd.choice(occupied(0x04))
+        manager.on_poschange(PosChange(card_id=0, controller=side, location=0x04, index=index, previous_position=1, current_position=rnd.choice((1, 4, 8))))
+    elif kind == 5 and occupied(0x04) and any(duel.cards[(duel.players[1 - side], 0x04)]):
+        other: int = next(i for i, card in enumerate(duel.cards[(duel.players[1 - side], 0x04)]) if card)
+        manager.on_swap(Swap(
+            first=CardInfo(rnd.randrange(1, 500), side, 0x04, rnd.choice(occupied(0x04)), 1),
+            second=CardInfo(rnd.randrange(1, 500), 1 - side, 0x04, other, 1)
+        ))
+    elif kind == 6:
+        (manager.on_damage if rnd.random() < 0.7 else manager.on_recover)(LifePoints(player=side, amount=rnd.randrange(100, 1000)))
+    elif kind == 7:
+        await manager.on_new_phase(NewPhase(phase=rnd.choice((1, 2, 4, 8))))
+        if rnd.random() < 0.3:
+            await manager.on_new_turn(PlayerOnly(player=side))
+    elif kind == 8 and cards(0x02):
+        manager.on_shuffle_hand(ShuffleCards(player=side, card_ids=[rnd.randrange(500) for _ in cards(0x02)]))
+    elif kind == 9 and cards(0x10):
+        manager.on_move(move(0x10, rnd.randrange(len(cards(0x10))), 0x02, rnd.randrange(len(cards(0x02)) + 1)))
+    elif kind == 10 and occupied(0x04):
+        manager.on_add_counter(Counter(counter_type=rnd.randrange(1, 4), controller=side, location=0x04, index=rnd.choice(occupied(0x04)), count=1))
+    elif kind == 11 and occupied(0x04) and occupied(0x08):
+        first, second = rnd.choice(occupied(0x08)), rnd.choice(occupied(0x04))
+        manager.on_equip(CardPair(first=LocInfo(side, 0x08, first, 1), second=LocInfo(side, 0x04, second, 1)))
@@ -0,0 +1,91 @@
+import struct
+import unittest
+from typing import Any
+
+from ygo_core.deck import Deck
+
+from ygo_client.actions import ACTIONS, Actions, PolicyExecutor, encode_place, encode_select_card
+from ygo_client.bus import Event
+from ygo_client.manager import GameManager
+from ygo_client.host import _check_actions
+from ygo_client.connection.packet import Packet
+from ygo_client.connection.enums.game_message import GameMessage
+from ygo_client.connection.messages import SelectCard, SelectTribute, SelectPlace
+
+from tests.support import RecordingExecutor
+
+_CARD: int = ACTIONS['card'].start
+_PLACE: int = ACTIONS['place'].start
+
+
+def _select_card(min_: int, max_: int) -> SelectCard:
+    return SelectCard(player=0, cancelable=False, min=min_, max=max_, choices=[(100 + i, 0, 2, i, 0) for i in range(4)])
+
+
+
+class TestActions(unittest.TestCase):
+    def test_card_selection_takes_min_to_max_actions(self) -> None:
+        actions: Actions = encode_select_card(_select_card(2, 3))
+        self.assertEqual((actions.min, actions.max), (2, 3))
+        self.assertEqual(actions.reply(_CARD + 1, _CARD + 3).content, struct.pack('<IIII', 0, 2, 1, 3))
+        for indices in ((_CARD,), (_CARD, _CARD + 1, _CARD + 2, _CARD + 3), (_CARD, _CARD), (_CARD, _CARD + 4)):
+            with self.subTest(indices=indices), self.assertRaises(ValueError):
+                actions.reply(*indices)
+
+
+    def test_other_prompts_take_one_action(self) -> None:
+        actions: Actions = encode_place(SelectPlace(player=0, min=1, selectable=~0b11 & 0xffffffff))
+        with self.assertRaises(ValueError):
+            actions.reply(_PLACE, _PLACE + 1)
+
+
+    def test_place_names_the_selecting_player_0(self) -> None:
+        # zone 2 of the selecting player and zone 0 of its opponent
+        actions: Actions = encode_place(SelectPlace(player=1, min=1, selectable=~(1 << 2 | 1 << 16) & 0xffffffff))
+        self.assertEqual(list(actions.legal()), [_PLACE + 2, _PLACE + 16])
+        self.assertEqual(actions.reply(_PLACE + 2).content, bytes((0, 0x04, 2)))
+        self.assertEqual(actions.reply(_PLACE + 16).content, bytes((1, 0x04, 0)))
+
+
+    def test_host_accepts_the_place_answer_of_game_manager(self) -> None:
+        message: SelectPlace = SelectPlace(player=1, min=1, selectable=~(1 << 9) & 0xffffffff)
+        self.assertTrue(_check_actions(GameMessage.SELECT_PLACE, message, memoryview(bytes((0, 0x08, 1)))))
+        self.assertFalse(_check_actions(GameMessage.SELECT_PLACE, message, memoryview(bytes((1, 0x08, 1)))))
+
+
+
+class TestPolicyExecutor(unittest.IsolatedAsyncioTestCase):
+    async def _answer(self, message: Any, choice: Any) -> Packet:
+        executor: PolicyExecutor = PolicyExecutor(lambda actions: choice, RecordingExecutor())
+        manager: GameManager = GameManager(Deck([], [], []), executor)
+        msg_id: GameMessage = GameMessage.SELECT_TRIBUTE if isinstance(message, SelectTribute) else GameMessage.SELECT_CARD
+        executor.on_prompt(Event(msg_id, message))
+        handler: Any = manager.on_select_tribute if msg_id == GameMessage.SELECT_TRIBUTE else manager.on_select_card
+        reply: Packet = await handler(message)
+        return reply
+
+
+    async def test_policy_selects_several_cards(self) -> None:
+        reply: Packet = await self._answer(_select_card(2, 2), [_CARD + 3, _CARD])
+        self.assertEqual(reply.content, struct.pack('<IIII', 0, 2, 3, 0))
+
+
+    async def test_policy_selects_several_tributes(self) -> None:
+        message: SelectTribute = SelectTribute(player=0, cancelable=False, min=2, max=2, choices=[(100 + i, 0, 4, i, 1) for i in range(3)])
+        reply: Packet = await self._answer(message, (_CARD + 1, _CARD + 2))
+        self.assertEqual(reply.content, struct.pack('<IIII', 0, 2, 1, 2))
+
+
+    async def test_single_index_answers_a_single_card(self) -> None:
+        reply: Packet = await self._answer(_select_card(1, 1), _CARD + 2)
+        self.assertEqual(reply.content, struct.pack('<III', 0, 1, 2))
+
+
+    async def test_too_few_cards_are_refused(self) -> None:
+        with self.assertRaises(ValueError):
+            await self._answer(_select_card(2, 3), _CARD + 2)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
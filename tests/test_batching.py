@@ -0,0 +1,84 @@
+import asyncio
+import concurrent.futures
+import unittest
+from typing import Any, List, NamedTuple
+
+import numpy as np
+
+from ygo_client.batching import BatchBroker, BrokeredExecutor, Decision, stack_arrays
+
+
+class _Features(NamedTuple):
+    cards: np.ndarray
+    scalars: np.ndarray
+
+
+
+class TestBatchBroker(unittest.IsolatedAsyncioTestCase):
+    async def test_requests_are_run_together(self) -> None:
+        batches: List[List[int]] = []
+
+        def double(requests: List[int]) -> List[int]:
+            batches.append(requests)
+            return [2 * request for request in requests]
+
+        broker: BatchBroker = BatchBroker(double, max_batch_size=2, max_delay=0.01)
+        results: List[int] = await asyncio.gather(*(broker.submit(i) for i in range(5)))
+        self.assertEqual(results, [0, 2, 4, 6, 8])
+        self.assertEqual(batches, [[0, 1], [2, 3], [4]])
+        self.assertEqual((broker.stats.batches, broker.stats.requests, broker.stats.max_batch_size), (3, 5, 2))
+        self.assertEqual(broker.stats.sizes, {2: 2, 1: 1})
+
+
+    async def test_batch_function_gets_one_stacked_input(self) -> None:
+        inputs: List[_Features] = []
+
+        async def score(features: _Features) -> np.ndarray:
+            inputs.append(features)
+            return features.cards.sum(axis=(1, 2)) + features.scalars[:, 0]
+
+        broker: BatchBroker = BatchBroker(score, max_batch_size=3, stack=stack_arrays)
+        requests: List[_Features] = [_Features(np.full((2, 4), i), np.array([10 * i, 0])) for i in range(3)]
+        results: List[Any] = await asyncio.gather(*(broker.submit(request) for request in requests))
+        self.assertEqual([int(result) for result in results], [0, 18, 36])
+        self.assertIsInstance(inputs[0], _Features)
+        self.assertEqual((inputs[0].cards.shape, inputs[0].scalars.shape), ((3, 2, 4), (3, 2)))
+
+
+    async def test_stacked_input_runs_in_the_pool(self) -> None:
+        with concurrent.futures.ThreadPoolExecutor(1) as pool:
+            broker: BatchBroker = BatchBroker(lambda stacked: stacked.sum(axis=1), max_batch_size=2, pool=pool, stack=stack_arrays)
+            results: List[Any] = await asyncio.gather(broker.submit(np.arange(3)), broker.submit(np.ones(3)))
+        self.assertEqual([int(result) for result in results], [3, 3])
+
+
+    async def test_wrong_number_of_results_fails_every_request(self) -> None:
+        broker: BatchBroker = BatchBroker(lambda requests: requests[:1], max_batch_size=2)
+        results: List[Any] = await asyncio.gather(broker.submit(1), broker.submit(2), return_exceptions=True)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+
+    async def test_brokered_executors_share_a_batch(self) -> None:
+        batches: List[List[Decision]] = []
+
+        def answer(decisions: List[Decision]) -> List[bool]:
+            batches.append(decisions)
+            return [decision.source == 1 for decision in decisions]
+
+        broker: BatchBroker = BatchBroker(answer, max_batch_size=2)
+        executors: List[BrokeredExecutor] = [BrokeredExecutor(broker, key) for key in (1, 2)]
+        self.assertEqual(await asyncio.gather(*(executor.select_yn() for executor in executors)), [True, False])
+        self.assertEqual(batches, [[Decision('select_yn', (), 1), Decision('select_yn', (), 2)]])
+
+
+
+class TestStackArrays(unittest.TestCase):
+    def test_plain_tuples_stay_tuples(self) -> None:
+        stacked: Any = stack_arrays([(np.zeros(2), np.ones(1, dtype=np.bool_)) for _ in range(4)])
+        self.assertIs(type(stacked), tuple)
+        self.assertEqual([field.shape for field in stacked], [(4, 2), (4, 1)])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import asyncio
+import functools
+import unittest
+from typing import Any
+from unittest import mock
+
+from ygo_client.bus import EventBus, Event, Subscription
+from ygo_client.connection.packet import Packet
+from ygo_client.connection.enums.stoc_message import StocMessage
+from ygo_client.connection.enums.game_message import GameMessage
+from ygo_client.connection.messages import Draw, PlayerOnly
+
+from tests.support import game_message
+
+
+def _draw(count: int=1) -> Packet:
+    return game_message(GameMessage.DRAW, Draw(player=0, count=count))
+
+
+
+class TestRouting(unittest.TestCase):
+    def setUp(self) -> None:
+        self.bus: EventBus = EventBus()
+        patcher = mock.patch.object(Draw, 'decode', wraps=Draw.decode)
+        self.decode: mock.MagicMock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+    def test_unwanted_messages_are_not_decoded(self) -> None:
+        self.assertIsNone(self.bus.route(_draw()))
+        self.assertIsNone(self.bus.publish(_draw()))
+        self.bus.register_handler(GameMessage.NEW_TURN, lambda message: None)
+        self.assertIsNone(self.bus.publish(_draw()))
+        self.decode.assert_not_called()
+
+
+    def test_handler_gets_the_decoded_payload(self) -> None:
+        received: list[Draw] = []
+        self.bus.register_handler(GameMessage.DRAW, received.append)
+        self.bus.publish(_draw(2))
+        self.assertEqual(self.decode.call_count, 1)
+        self.assertEqual([message.count for message in received], [2])
+
+
+    def test_stoc_and_game_ids_are_routed_apart(self) -> None:
+        received: list[tuple[str, Any]] = []
+        self.bus.register_handler(StocMessage.DUEL_START, lambda message: received.append(('stoc', message)))
+        self.bus.register_handler(GameMessage.WIN, lambda message: received.append(('game', message)))
+        self.bus.publish(Packet.from_bytes(bytes((StocMessage.DUEL_START,))))
+        self.bus.publish(game_message(GameMessage.WIN, PlayerOnly(player=1)))
+        self.assertEqual([kind for kind, _ in received], ['stoc', 'game'])
+        self.assertEqual(received[1][1], PlayerOnly(player=1))
+
+
+    def test_game_msg_cannot_be_registered(self) -> None:
+        with self.assertRaises(ValueError):
+            self.bus.register_handler(StocMessage.GAME_MSG, lambda message: None)
+
+
+    def test_unsubscribed_messages_stop_being_decoded(self) -> None:
+        events: list[Event] = []
+        subscription: Subscription = self.bus.subscribe(events.append, [GameMessage.DRAW])
+        self.bus.publish(_draw())
+        self.assertEqual([event.msg_id for event in events], [GameMessage.DRAW])
+        self.bus.unsubscribe(subscription)
+        self.assertIsNone(self.bus.route(_draw()))
+
+
+
+class TestSubscriptions(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.bus: EventBus = EventBus()
+
+
+    async def test_sync_subscriber_sees_the_event_before_the_handler(self) -> None:
+        calls: list[str] = []
+        self.bus.subscribe(lambda event: calls.append('subscriber'), [GameMessage.DRAW])
+        self.bus.register_handler(GameMessage.DRAW, lambda message: calls.append('handler'))
+        self.bus.publish(_draw())
+        self.assertEqual(calls, ['subscriber', 'handler'])
+
+
+    async def test_awaitables_returned_by_any_callable_are_run(self) -> None:
+        received: list[tuple[str, int]] = []
+
+        async def record(name: str, event: Event) -> None:
+            await asyncio.sleep(0)
+            received.append((name, event.message.count))
+
+        self.bus.subscribe(functools.partial(record, 'partial'), [GameMessage.DRAW])
+        self.bus.subscribe(lambda event: record('lambda', event), [GameMessage.DRAW])
+        self.bus.subscribe(_Recorder(received).on_event, [GameMessage.DRAW])
+        self.bus.publish(_draw(1))
+        self.bus.publish(_draw(2))
+        await self.bus.join()
+        self.assertEqual(sorted(received), [('lambda', 1), ('lambda', 2), ('method', 1), ('method', 2), ('partial', 1), ('partial', 2)])
+        self.bus.close()
+
+
+    async def test_slow_subscriber_drops_the_oldest_events(self) -> None:
+        received: list[int] = []
+
+        async def slow(event: Event) -> None:
+            received.append(event.message.count)
+
+        subscription: Subscription = self.bus.subscribe(slow, [GameMessage.DRAW], maxsize=2)
+        for count in range(5):
+            self.bus.publish(_draw(count))
+        self.assertEqual(subscription.pending, 2)
+        self.assertEqual(subscription.dropped, 3)
+        await self.bus.join()
+        self.assertEqual(received, [3, 4])
+        self.bus.close()
+
+
+    async def test_failing_subscriber_does_not_stop_the_others(self) -> None:
+        received: list[Event] = []
+
+        def fail(event: Event) -> None:
+            raise RuntimeError('subscriber failed')
+
+        async def fail_later(event: Event) -> None:
+            raise RuntimeError('subscriber failed')
+
+        self.bus.subscribe(fail, [GameMessage.DRAW])
+        self.bus.subscribe(fail_later, [GameMessage.DRAW])
+        self.bus.subscribe(received.append, [GameMessage.DRAW])
+        with self.assertLogs('ygo_client.bus', 'ERROR'):
+            self.bus.publish(_draw())
+            await self.bus.join()
+        self.assertEqual(len(received), 1)
+        self.bus.close()
+
+
+
+class _Recorder:
+    def __init__(self, received: list[tuple[str, int]]) -> None:
+        self.received = received
+
+
+    async def on_event(self, event: Event) -> None:
+        self.received.append(('method', event.message.count))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
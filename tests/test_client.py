@@ -0,0 +1,173 @@
+import asyncio
+import unittest
+from typing import Any, Optional
+
+from ygo_core.deck import Deck
+from ygo_core.card import Location
+from ygo_core.enums import Player
+
+from ygo_client.client import GameClient
+from ygo_client.connection.packet import Packet
+from ygo_client.connection.enums.ctos_message import CtosMessage
+from ygo_client.connection.codec import Message
+from ygo_client.connection.enums.stoc_message import StocMessage
+from ygo_client.connection.enums.game_message import GameMessage
+from ygo_client.connection.messages import ConfirmCards, ChainIndex, Counter, Empty, Hint, SelectYesNo
+
+from tests.support import RecordingExecutor, game_message
+
+_MONSTER_ZONE: int = 0x04
+
+
+
+class TestDefaultHandlers(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.client: GameClient = GameClient(RecordingExecutor(), Deck([], [], []))
+
+
+    def test_confirm_cards_sets_the_revealed_ids(self) -> None:
+        self.client.publish(game_message(GameMessage.CONFIRM_CARDS, ConfirmCards(player=1, cards=[(4242, 1, _MONSTER_ZONE, 3)])))
+        self.assertEqual(self.client.get_duel().get_card(Player.OPPONENT, Location(_MONSTER_ZONE), 3).id, 4242)
+
+
+    def test_counters_are_added_and_removed(self) -> None:
+        for msg_id, count in ((GameMessage.ADD_COUNTER, 3), (GameMessage.REMOVE_COUNTER, 1)):
+            self.client.publish(game_message(msg_id, Counter(counter_type=0x1019, controller=0, location=_MONSTER_ZONE, index=1, count=count)))
+        card = self.client.get_duel().get_card(Player.ME, Location(_MONSTER_ZONE), 1)
+        self.assertEqual(card.counters, {0x1019: 2})
+        self.client.publish(game_message(GameMessage.REMOVE_COUNTER, Counter(counter_type=0x1019, controller=0, location=_MONSTER_ZONE, index=1, count=2)))
+        self.assertEqual(card.counters, {})
+
+
+    def test_chain_solving_is_tracked(self) -> None:
+        manager = self.client._gamemanager
+        self.client.publish(game_message(GameMessage.CHAIN_SOLVING, ChainIndex(index=2)))
+        self.assertEqual(manager.chain_solving, 2)
+        self.client.publish(game_message(GameMessage.CHAIN_SOLVED, ChainIndex(index=2)))
+        self.assertIsNone(manager.chain_solving)
+
+
+    def test_register_handler_overrides_a_default_handler(self) -> None:
+        received: list[ConfirmCards] = []
+        answer: Packet = Packet(CtosMessage.RESPONSE)
+
+        def on_confirm_cards(message: ConfirmCards) -> Optional[Packet]:
+            received.append(message)
+            return answer
+
+        self.client.register_handler(GameMessage.CONFIRM_CARDS, on_confirm_cards)
+        message: ConfirmCards = ConfirmCards(player=1, cards=[(4242, 1, _MONSTER_ZONE, 3)])
+        reply = self.client.publish(game_message(GameMessage.CONFIRM_CARDS, message))
+        self.assertIs(reply, answer)
+        self.assertEqual(received, [message])
+        self.assertNotEqual(self.client.get_duel().get_card(Player.OPPONENT, Location(_MONSTER_ZONE), 3).id, 4242)
+
+
+    def test_register_handler_with_another_layout(self) -> None:
+        received: list[Empty] = []
+        self.client.register_handler(GameMessage.CHAIN_SOLVING, received.append, Empty)
+        self.client.publish(game_message(GameMessage.CHAIN_SOLVING, ChainIndex(index=1)))
+        self.assertEqual(received, [Empty()])
+        self.assertIsNone(self.client._gamemanager.chain_solving)
+
+
+
+class _SlowExecutor(RecordingExecutor):
+    """ RecordingExecutor taking a while for each decision. """
+    async def _decide(self, method: str, *args: Any) -> Any:
+        await asyncio.sleep(0.01)
+        return await super()._decide(method, *args)
+
+
+async def _serve(frames: list[bytes], replies: int) -> tuple[asyncio.AbstractServer, asyncio.Future[bytes]]:
+    """ Serve frames to one client, then DUEL_END once it has sent replies decisions of one byte. """
+    received: asyncio.Future[bytes] = asyncio.get_running_loop().create_future()
+
+    async def serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        writer.writelines(frames)
+        data: bytes = await reader.readexactly(len(_handshake()) + 4 * replies)
+        received.set_result(data[len(_handshake()):])
+        writer.write(bytes(Packet(StocMessage.DUEL_END).frame))
+        await writer.drain()
+        writer.close()
+
+    return await asyncio.start_server(serve, '127.0.0.1', 0), received
+
+
+def _handshake() -> bytes:
+    """ PLAYER_INFO and JOIN_GAME, as sent by GameClient. """
+    return bytes(2 + 1 + 40) + bytes(2 + 1 + 2 + 6 + 40 + 4)
+
+
+def _frame(msg_id: GameMessage, message: Message) -> bytes:
+    return bytes(game_message(msg_id, message).frame)
+
+
+def _response(answer: bool) -> memoryview:
+    reply: Packet = Packet(CtosMessage.RESPONSE)
+    reply.write_bool(answer)
+    return reply.frame
+
+
+
+class TestPipeline(unittest.IsolatedAsyncioTestCase):
+    async def _run(self, client: GameClient, frames: list[bytes], replies: int) -> bytes:
+        server, received = await _serve(frames, replies)
+        try:
+            await asyncio.wait_for(client.connect('127.0.0.1', server.sockets[0].getsockname()[1], 'client', 0), 10.0)
+        finally:
+            server.close()
+        return received.result()
+
+
+    async def test_events_are_published_in_stream_order(self) -> None:
+        frames: list[bytes] = []
+        sent: list[tuple[str, int]] = []
+        for i in range(3):
+            frames.append(_frame(GameMessage.SELECT_YESNO, SelectYesNo(player=0, description=i)))
+            sent.append(('SELECT_YESNO', i))
+            for j in range(5):
+                frames.append(_frame(GameMessage.HINT, Hint(hint_type=0, player=0, data=10 * i + j)))
+                sent.append(('HINT', 10 * i + j))
+
+        executor: _SlowExecutor = _SlowExecutor(select_yn=True)
+        client: GameClient = GameClient(executor, Deck([], [], []))
+        published: list[tuple[str, int]] = []
+        client.subscribe(
+            lambda event: published.append((event.msg_id.name, getattr(event.message, 'description', getattr(event.message, 'data', -1)))),
+            [GameMessage.SELECT_YESNO, GameMessage.HINT]
+        )
+        replies: bytes = await self._run(client, frames, 3)
+        self.assertEqual(published, sent)
+        self.assertEqual([method for method, _ in executor.calls], ['select_yn'] * 3)
+        self.assertEqual(replies, bytes(_response(True)) * 3)
+
+
+    async def test_slow_decisions_hold_the_reader_back(self) -> None:
+        frames: list[bytes] = [
+            _frame(GameMessage.SELECT_YESNO, SelectYesNo(player=0, description=i)) for i in range(4)
+        ] + [_frame(GameMessage.HINT, Hint(hint_type=0, player=0, data=i)) for i in range(20)]
+        client: GameClient = GameClient(_SlowExecutor(select_yn=False), Deck([], [], []), queue_size=1)
+        replies: bytes = await self._run(client, frames, 4)
+        self.assertEqual(replies, bytes(_response(False)) * 4)
+        self.assertEqual(client.stats.prompt_peak, 1)
+        self.assertGreater(client.stats.reader_waits, 0)
+
+
+    async def test_cancelled_reader_does_not_wait_for_room(self) -> None:
+        client: GameClient = GameClient(RecordingExecutor(), Deck([], [], []))
+        never: asyncio.Future[Packet] = asyncio.get_running_loop().create_future()
+        client._connection.receive = lambda: never # type: ignore
+        inbound: asyncio.Queue[Optional[Packet]] = asyncio.Queue(1)
+        inbound.put_nowait(Packet(1))
+        reader: asyncio.Task[None] = asyncio.create_task(client._read(inbound))
+        await asyncio.sleep(0)
+        reader.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await asyncio.wait_for(reader, 1.0)
+        self.assertIsNone(inbound.get_nowait())
+
+
+
+if __name__ == '__main__':
+    unittest.main()
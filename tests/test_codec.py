@@ -0,0 +1,115 @@
+import struct
+import unittest
+from typing import Any
+
+from ygo_client.connection.packet import Packet
+from ygo_client.connection.codec import Record, Message, Array, Str, Raw, Rest, _unwrap
+from ygo_client.connection.messages import STOC_MESSAGES, GAME_MESSAGES, Move, LocInfo, CardInfo, NewPhase
+
+
+def _scalar(fmt: str, seed: int) -> Any:
+    if fmt == '?':
+        return bool(seed % 2)
+    size: int = struct.calcsize('<' + fmt)
+    return (seed * 37 + 11) % (1 << min(8 * size, 31))
+
+
+def _sample(layout: type, seed: int=1) -> Any:
+    """ An instance of layout with a value in every field, lists of two elements. """
+    values: dict[str, Any] = {}
+    for name, annotation in layout._fields:
+        seed += 1
+        values[name] = _field(annotation, seed, values)
+    return layout(**values)
+
+
+def _field(annotation: Any, seed: int, values: dict[str, Any]) -> Any:
+    typ, metadata = _unwrap(annotation)
+    if isinstance(typ, type) and issubclass(typ, Record):
+        return _sample(typ, seed)
+    for meta in metadata:
+        if isinstance(meta, str):
+            return _scalar(meta, seed)
+        if isinstance(meta, Str):
+            return ('name' * meta.size)[:meta.size // 2] # fills the field: decoding keeps the padding
+        if isinstance(meta, Raw):
+            return bytes(range(meta.size))
+        if isinstance(meta, Rest):
+            return memoryview(b'rest of the payload')
+        if isinstance(meta, Array):
+            count: int = 2 if meta.length is None else values[meta.length]
+            element: Any = typ.__args__[0]
+            if isinstance(meta.element, type) and issubclass(meta.element, Record):
+                return [_sample(meta.element, seed + i)._to_values() for i in range(count)]
+            if isinstance(element, type) and issubclass(element, Record):
+                return [_sample(element, seed + i) for i in range(count)]
+            return [_scalar(meta.element, seed + i) for i in range(count)]
+    raise AssertionError(f'No sample for {annotation!r}.')
+
+
+def _round_trip(message: Message) -> Message:
+    packet: Packet = Packet(0)
+    message.encode(packet)
+    return type(message).decode(Packet.from_bytes(packet.data))
+
+
+
+class TestCodec(unittest.TestCase):
+    def test_round_trip_of_every_layout(self) -> None:
+        layouts: set[type[Message]] = {*STOC_MESSAGES.values(), *GAME_MESSAGES.values()}
+        for layout in sorted(layouts, key=lambda layout: layout.__name__):
+            with self.subTest(layout=layout.__name__):
+                message: Message = _sample(layout)
+                self.assertEqual(_round_trip(message), message)
+
+
+    def test_keyword_and_positional_construction(self) -> None:
+        previous: LocInfo = LocInfo(0, 4, 2, 1)
+        self.assertEqual(
+            Move(card_id=7, previous=previous, current=LocInfo(controller=1, location=16, index=0, position=5), reason=32),
+            Move(7, previous, LocInfo(1, 16, 0, 5), 32)
+        )
+
+
+    def test_decode_reads_the_wire_layout(self) -> None:
+        packet: Packet = Packet(0)
+        packet.write_int(7) # card id
+        for controller, location, index, position in ((0, 4, 2, 1), (1, 16, 0, 5)):
+            packet.write_int(controller, byte_size=1)
+            packet.write_int(location, byte_size=1)
+            packet.write_int(index)
+            packet.write_int(position)
+        packet.write_int(32) # reason
+        self.assertEqual(Move.decode(Packet.from_bytes(packet.data)), Move(7, LocInfo(0, 4, 2, 1), LocInfo(1, 16, 0, 5), 32))
+        self.assertEqual(_encoded(Move(7, LocInfo(0, 4, 2, 1), LocInfo(1, 16, 0, 5), 32)), packet.content)
+
+
+    def test_field_index_in_flat_tuples(self) -> None:
+        self.assertEqual(CardInfo.field_index('position'), 4)
+        self.assertEqual(Move.field_index('reason'), 1 + 2 * LocInfo._width)
+        with self.assertRaises(KeyError):
+            CardInfo.field_index('description')
+
+
+    def test_abstract_layouts_cannot_be_built(self) -> None:
+        with self.assertRaises(TypeError):
+            Message()
+        with self.assertRaises(TypeError):
+            Record()
+
+
+    def test_truncated_payload_decodes_missing_bytes_as_zero(self) -> None:
+        content: bytes = _encoded(Move(7, LocInfo(0, 4, 2, 1), LocInfo(1, 16, 0, 5), 0x030201))
+        self.assertEqual(Move.decode(Packet.from_bytes(content[:-2], msg_id=0)), Move(7, LocInfo(0, 4, 2, 1), LocInfo(1, 16, 0, 5), 0x0201))
+        self.assertEqual(NewPhase.decode(Packet.from_bytes(b'\x04', msg_id=0)), NewPhase(phase=4))
+
+
+def _encoded(message: Message) -> bytes:
+    packet: Packet = Packet(0)
+    message.encode(packet)
+    return packet.content
+
+
+
+if __name__ == '__main__':
+    unittest.main()
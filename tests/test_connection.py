@@ -0,0 +1,168 @@
+import asyncio
+import unittest
+
+from ygo_core.deck import Deck
+
+from ygo_client.client import GameClient
+from ygo_client.connection.connect import FrameProtocol, BufferedYGOConnection
+from ygo_client.connection.packet import Packet
+
+from tests.support import RecordingExecutor
+
+
+def _frame(msg_id: int, content: bytes) -> bytes:
+    packet: Packet = Packet(msg_id)
+    packet.write_bytes(content)
+    return bytes(packet.frame)
+
+
+def _feed(protocol: FrameProtocol, data: bytes, chunk: int) -> None:
+    """ Receive data as the event loop would, at most chunk bytes per read. """
+    for i in range(0, len(data), chunk):
+        part: bytes = data[i:i+chunk]
+        buffer: memoryview = protocol.get_buffer(len(part))
+        buffer[:len(part)] = part
+        protocol.buffer_updated(len(part))
+
+
+def _contents(n: int) -> list[bytes]:
+    return [bytes([i % 256]) * (i * 37 % 3000) for i in range(n)]
+
+
+
+class TestFrameProtocol(unittest.IsolatedAsyncioTestCase):
+    async def test_frames_split_across_reads(self) -> None:
+        protocol: FrameProtocol = FrameProtocol()
+        contents: list[bytes] = _contents(50)
+        _feed(protocol, b''.join(_frame(1, content) for content in contents), chunk=1000)
+        received: list[Packet] = [await protocol.receive() for _ in contents]
+        self.assertEqual([packet.content for packet in received], contents)
+        self.assertTrue(all(packet.msg_id == 1 for packet in received))
+
+
+    async def test_received_packets_are_views_that_stay_valid(self) -> None:
+        protocol: FrameProtocol = FrameProtocol()
+        contents: list[bytes] = _contents(1000) # several buffers worth
+        _feed(protocol, b''.join(_frame(2, content) for content in contents), chunk=4096)
+        received: list[Packet] = [await protocol.receive() for _ in contents]
+        self.assertIsInstance(received[0].read_rest(), memoryview)
+        self.assertEqual([packet.content for packet in received], contents)
+
+
+    async def test_zero_size_frame_closes(self) -> None:
+        protocol: FrameProtocol = FrameProtocol()
+        _feed(protocol, _frame(3, b'x') + b'\x00\x00', chunk=100)
+        self.assertEqual((await protocol.receive()).content, b'x')
+        with self.assertRaises(ConnectionResetError):
+            await protocol.receive()
+
+
+
+class TestBufferedYGOConnection(unittest.IsolatedAsyncioTestCase):
+    async def test_round_trip_through_a_socket(self) -> None:
+        contents: list[bytes] = _contents(300)
+        answer: asyncio.Future[bytes] = asyncio.get_running_loop().create_future()
+
+        async def serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            writer.write(b''.join(_frame(1, content) for content in contents))
+            answer.set_result(await reader.readexactly(5))
+            writer.write(b'\x00\x00')
+            writer.close()
+
+        server: asyncio.AbstractServer = await asyncio.start_server(serve, '127.0.0.1', 0)
+        port: int = server.sockets[0].getsockname()[1]
+        connection: BufferedYGOConnection = BufferedYGOConnection()
+        try:
+            await connection.connect('127.0.0.1', port)
+            received: list[bytes] = [(await connection.receive()).content for _ in contents]
+            reply: Packet = Packet(9)
+            reply.write_int(5, byte_size=2)
+            await connection.send(reply)
+            self.assertEqual(await asyncio.wait_for(answer, 5.0), b'\x03\x00\x09\x05\x00')
+            with self.assertRaises(ConnectionResetError):
+                await connection.receive()
+        finally:
+            connection.close()
+            server.close()
+        self.assertEqual(received, contents)
+
+
+    def test_game_client_uses_it_by_default(self) -> None:
+        client: GameClient = GameClient(RecordingExecutor(), Deck([], [], []))
+        self.assertIsInstance(client._connection, BufferedYGOConnection)
+
+
+
+class _Transport:
+    """ Write side of a transport, keeping each writelines call. """
+    writes: list[list[bytes]]
+    high_water: int
+
+    def __init__(self, high_water: int=1 << 16) -> None:
+        self.writes = []
+        self.high_water = high_water
+
+
+    def is_closing(self) -> bool:
+        return False
+
+
+    def writelines(self, frames: list[memoryview]) -> None:
+        self.writes.append([bytes(frame) for frame in frames])
+
+
+    def get_write_buffer_size(self) -> int:
+        return 0
+
+
+    def get_write_buffer_limits(self) -> tuple[int, int]:
+        return 0, self.high_water
+
+
+    def close(self) -> None:
+        pass
+
+
+def _connected(transport: _Transport) -> BufferedYGOConnection:
+    connection: BufferedYGOConnection = BufferedYGOConnection()
+    connection._transport = transport # type: ignore
+    connection._protocol = FrameProtocol()
+    return connection
+
+
+
+class TestCoalescedWrites(unittest.IsolatedAsyncioTestCase):
+    async def test_packets_of_one_iteration_go_in_one_write(self) -> None:
+        transport: _Transport = _Transport()
+        connection: BufferedYGOConnection = _connected(transport)
+        frames: list[bytes] = [_frame(i, bytes([i])) for i in range(3)]
+        for i in range(3):
+            packet: Packet = Packet(i)
+            packet.write_bytes(bytes([i]))
+            await connection.send(packet)
+        self.assertEqual(transport.writes, [])
+        await asyncio.sleep(0)
+        self.assertEqual(transport.writes, [frames])
+
+
+    async def test_high_water_mark_flushes_at_once(self) -> None:
+        transport: _Transport = _Transport(high_water=10000)
+        connection: BufferedYGOConnection = _connected(transport)
+        for _ in range(3):
+            packet: Packet = Packet(1)
+            packet.write_bytes(bytes(4000))
+            await connection.send(packet)
+        self.assertEqual([len(frames) for frames in transport.writes], [3])
+
+
+    async def test_close_flushes_what_is_queued(self) -> None:
+        transport: _Transport = _Transport()
+        connection: BufferedYGOConnection = _connected(transport)
+        await connection.send(Packet(7))
+        connection.close()
+        self.assertEqual(transport.writes, [[_frame(7, b'')]])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
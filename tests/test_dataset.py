@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from ygo_client.actions import ACTIONS
+from ygo_client.dataset import COLUMNS, MANIFEST, Rows, build, load_shard
+from ygo_client.recorder import PacketRecorder, RECEIVED, SENT
+from ygo_client.connection.packet import Packet
+from ygo_client.connection.enums.ctos_message import CtosMessage
+from ygo_client.connection.enums.stoc_message import StocMessage
+from ygo_client.connection.enums.game_message import GameMessage
+from ygo_client.connection.messages import PlayerOnly, SelectChain, SelectOption, SelectPlace
+
+from tests.support import game_message
+
+_PLACE: int = ACTIONS['place'].start
+_DUEL_START: bytes = bytes((StocMessage.DUEL_START,))
+_DUEL_END: bytes = bytes((StocMessage.DUEL_END,))
+
+
+def _response(content: bytes) -> bytes:
+    return bytes((CtosMessage.RESPONSE,)) + content
+
+
+def _place(selectable: int) -> bytes:
+    return game_message(GameMessage.SELECT_PLACE, SelectPlace(player=0, min=1, selectable=~selectable & 0xffffffff)).data
+
+
+def _game(winner: int) -> list[tuple[int, bytes]]:
+    """ The frames of a game of four prompts won by winner, of which two answers make rows. """
+    return [
+        (RECEIVED, _DUEL_START),
+        (RECEIVED, _place(1 << 2 | 1 << 3)),
+        (SENT, _response(bytes((0, 0x04, 3)))),
+        (RECEIVED, game_message(GameMessage.SELECT_OPTION, SelectOption(player=0, options=[10, 20])).data),
+        (SENT, _response((1).to_bytes(4, 'little'))), # not in the action space
+        (RECEIVED, game_message(GameMessage.SELECT_CHAIN, SelectChain(player=0, specount=0, forced=False, hint1=0, hint2=0, choices=[])).data),
+        (SENT, _response((-1).to_bytes(4, 'little', signed=True))),
+        (RECEIVED, _place(1 << 2)),
+        (SENT, _response(bytes((0, 0x04, 5)))), # not a selectable zone
+        (RECEIVED, game_message(GameMessage.WIN, PlayerOnly(player=winner)).data),
+        (RECEIVED, _DUEL_END),
+    ]
+
+
+
+class TestBuild(unittest.TestCase):
+    def setUp(self) -> None:
+        directory: tempfile.TemporaryDirectory[str] = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log: str = os.path.join(directory.name, 'games.ylog')
+        self.out: str = os.path.join(directory.name, 'shards')
+        with PacketRecorder(self.log) as recorder:
+            for direction, data in _game(0) + _game(1):
+                recorder.record(direction, data)
+
+
+    def test_shard_holds_a_row_per_answer_in_the_action_space(self) -> None:
+        entries: list[dict[str, object]] = build([self.log], self.out, workers=1)
+        self.assertEqual(entries, [{'log': self.log, 'shard': 'games', 'games': 2, 'rows': 4, 'skipped': 2, 'mismatches': 0}])
+        rows: Rows = load_shard(os.path.join(self.out, 'games'))
+        for (name, dtype, shape), column in zip(COLUMNS, rows):
+            self.assertEqual((name, column.dtype, column.shape), (name, np.dtype(dtype), (4, *shape)))
+        self.assertIsInstance(rows.cards, np.memmap)
+        np.testing.assert_array_equal(rows.action, [_PLACE + 3, ACTIONS['no_chain'].start] * 2)
+        np.testing.assert_array_equal(rows.prompt, [GameMessage.SELECT_PLACE, GameMessage.SELECT_CHAIN] * 2)
+        np.testing.assert_array_equal(rows.outcome, [1, 1, -1, -1])
+        self.assertTrue(rows.mask[0, _PLACE + 2] and rows.mask[0, _PLACE + 3] and not rows.mask[0, _PLACE + 4])
+
+
+    def test_shards_written_are_skipped(self) -> None:
+        build([self.log], self.out, workers=1)
+        self.assertEqual(build([self.log], self.out, workers=1), [])
+        with open(os.path.join(self.out, MANIFEST)) as manifest:
+            self.assertEqual([json.loads(line)['shard'] for line in manifest], ['games'])
+        self.assertEqual(sorted(os.listdir(self.out)), ['games', MANIFEST])
+
+
+    def test_logs_of_the_same_name_are_refused(self) -> None:
+        with self.assertRaises(ValueError):
+            build([self.log, os.path.join(self.out, 'games.ylog')], self.out)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+from ygo_core.enums import Player
+
+from ygo_client import events
+from ygo_client.events import RecordedEvent, iter_events
+from ygo_client.recorder import PacketRecorder, RECEIVED, SENT
+from ygo_client.replay import ReplayDriver
+from ygo_client.yrp import REPLAY_YRPX, REPLAY_SINGLE_MODE
+from ygo_client.connection.enums.ctos_message import CtosMessage
+from ygo_client.connection.enums.stoc_message import StocMessage
+from ygo_client.connection.enums.game_message import GameMessage
+from ygo_client.connection.messages import Start, DeckCount, LifePoints, NewPhase
+
+from tests.support import game_message
+
+_START: bytes = game_message(GameMessage.START, Start(
+    player_type=0, lp_0=8000, lp_1=8000, deck_0=DeckCount(main=40, extra=15), deck_1=DeckCount(main=40, extra=15)
+)).data
+_DAMAGE: list[bytes] = [game_message(GameMessage.DAMAGE, LifePoints(player=0, amount=amount)).data for amount in (500, 300)]
+_PHASE: bytes = game_message(GameMessage.NEW_PHASE, NewPhase(phase=4)).data
+
+# (direction, frame) of the start of a duel
+_FRAMES: list[tuple[int, bytes]] = [
+    (RECEIVED, bytes((StocMessage.DUEL_START,))),
+    (RECEIVED, _START),
+    (RECEIVED, _DAMAGE[0]),
+    (SENT, bytes((CtosMessage.CHAT,)) + b'gl'),
+    (RECEIVED, _PHASE),
+    (RECEIVED, _DAMAGE[1]),
+]
+
+
+def _lp(event: RecordedEvent) -> int:
+    return int(event.duel().field[Player.ME].life_point)
+
+
+
+class TestIterEvents(unittest.TestCase):
+    def setUp(self) -> None:
+        directory: tempfile.TemporaryDirectory[str] = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory: str = directory.name
+        self.log: str = os.path.join(directory.name, 'games.ylog')
+        with PacketRecorder(self.log) as recorder:
+            for timestamp, (direction, data) in enumerate(_FRAMES):
+                recorder.record(direction, data, timestamp)
+
+
+    def test_received_messages_are_decoded(self) -> None:
+        received: list[RecordedEvent] = list(iter_events(self.log))
+        self.assertEqual([event.msg_id for event in received], [
+            StocMessage.DUEL_START, GameMessage.START, GameMessage.DAMAGE, GameMessage.NEW_PHASE, GameMessage.DAMAGE
+        ])
+        self.assertEqual([event.timestamp for event in received], [0, 1, 2, 4, 5])
+        self.assertEqual(received[2].message, LifePoints(player=0, amount=500))
+
+
+    def test_messages_of_other_types_are_skipped(self) -> None:
+        self.assertEqual([event.message for event in iter_events(self.log, [GameMessage.NEW_PHASE])], [NewPhase(phase=4)])
+        self.assertEqual([event.msg_id for event in iter_events(self.log, [StocMessage.DUEL_START, int(GameMessage.START)])], [
+            StocMessage.DUEL_START, GameMessage.START
+        ])
+
+
+    def test_duel_is_rebuilt_only_when_asked_for(self) -> None:
+        with mock.patch.object(events, 'ReplayDriver', wraps=ReplayDriver) as driver:
+            self.assertEqual(len(list(iter_events(self.log))), 5)
+            driver.assert_not_called()
+            self.assertEqual([_lp(event) for event in iter_events(self.log, [GameMessage.DAMAGE])], [7500, 7200])
+            driver.assert_called_once()
+
+
+    def test_replay_events_have_no_timestamp(self) -> None:
+        data: bytes = (
+            'A'.encode('utf-16-le').ljust(40, b'\0') + 'B'.encode('utf-16-le').ljust(40, b'\0') + struct.pack('<I', 0)
+            + b''.join(struct.pack('<BI', frame[1], len(frame) - 2) + frame[2:] for frame in (_START, *_DAMAGE))
+        )
+        path: str = os.path.join(self.directory, 'duel.yrpX')
+        with open(path, 'wb') as file:
+            file.write(struct.pack('<IIIIII8s', REPLAY_YRPX, 0x1000, REPLAY_SINGLE_MODE, 0, len(data), 0, b'') + data)
+        self.assertEqual([(event.timestamp, _lp(event)) for event in iter_events(path, [GameMessage.DAMAGE])], [(None, 7500), (None, 7200)])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
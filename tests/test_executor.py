@@ -0,0 +1,44 @@
+import unittest
+
+import ygo_client
+from ygo_client.executor import DuelExecutor, AsyncDuelExecutor, SyncExecutorAdapter, as_async
+from ygo_client.replay import ScriptedExecutor
+
+from tests.support import RecordingExecutor
+
+
+def _reply(content: bytes) -> memoryview:
+    return memoryview(b'\x01' + content)
+
+
+
+class TestAsAsync(unittest.IsolatedAsyncioTestCase):
+    def test_async_executor_is_returned_as_is(self) -> None:
+        executor: RecordingExecutor = RecordingExecutor()
+        self.assertIs(as_async(executor), executor)
+
+
+    async def test_sync_executor_is_adapted(self) -> None:
+        executor: ScriptedExecutor = ScriptedExecutor(iter([_reply(b'\x02'), _reply(b'\x01'), _reply(b'\x03\x00\x00\x00')]))
+        adapted: AsyncDuelExecutor = as_async(executor)
+        self.assertIsInstance(adapted, SyncExecutorAdapter)
+        self.assertEqual(await adapted.select_hand(), 2)
+        self.assertTrue(await adapted.select_yn())
+        self.assertEqual(await adapted.select_option([10, 20, 30, 40]), 3)
+        self.assertEqual(executor.used, 3)
+
+
+
+class TestExports(unittest.TestCase):
+    def test_all_names_are_exported(self) -> None:
+        self.assertTrue(all(isinstance(name, str) for name in ygo_client.__all__))
+        namespace: dict[str, object] = {}
+        exec('from ygo_client import *', namespace)
+        self.assertIs(namespace['DuelExecutor'], DuelExecutor)
+        self.assertIs(namespace['AsyncDuelExecutor'], AsyncDuelExecutor)
+        self.assertEqual(set(ygo_client.__all__) - set(namespace), set())
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import asyncio
+import unittest
+
+from ygo_client.host import StandInHost, Step, scripted_client
+from ygo_client.connection.packet import Packet
+from ygo_client.connection.codec import Message, encode
+from ygo_client.connection.enums.ctos_message import CtosMessage
+from ygo_client.connection.enums.stoc_message import StocMessage
+from ygo_client.connection.enums.game_message import GameMessage
+from ygo_client.connection.messages import Start, DeckCount, PlayerOnly, NewPhase, SelectIdleCmd, SelectChain
+
+
+def _message(msg_id: GameMessage, message: Message) -> bytes:
+    return encode(StocMessage.GAME_MSG, message, msg_id).data
+
+
+def _response(value: int) -> bytes:
+    reply: Packet = Packet(CtosMessage.RESPONSE)
+    reply.write_int(value)
+    return reply.data
+
+
+def _script() -> list[Step]:
+    """ The start of a duel with a prompt the executor answers and one GameManager answers by itself. """
+    deck: DeckCount = DeckCount(main=40, extra=15)
+    return [
+        Step(_message(GameMessage.START, Start(player_type=0, lp_0=8000, lp_1=8000, deck_0=deck, deck_1=deck))),
+        Step(_message(GameMessage.NEW_TURN, PlayerOnly(player=0))),
+        Step(_message(GameMessage.NEW_PHASE, NewPhase(phase=4))),
+        Step(_message(GameMessage.SELECT_IDLE_CMD, SelectIdleCmd(
+            player=0, summonable=[], special_summonable=[], repositionable=[], monster_setable=[],
+            spell_setable=[], activatable=[], can_battle=True, can_end=True, can_shuffle=False
+        )), prompt=True, expected=_response(7)), # to the end phase
+        Step(_message(GameMessage.SELECT_CHAIN, SelectChain(
+            player=0, specount=0, forced=False, hint1=0, hint2=0, choices=[]
+        )), prompt=True, expected=_response(-1)),
+        Step(_message(GameMessage.WIN, PlayerOnly(player=0))),
+    ]
+
+
+
+class TestStandInHost(unittest.IsolatedAsyncioTestCase):
+
+    async def test_scripted_client(self) -> None:
+        script: list[Step] = _script()
+        host: StandInHost = StandInHost(script, timeout=5.0)
+        port: int = await host.start()
+        try:
+            await asyncio.wait_for(scripted_client(script).connect('127.0.0.1', port, 'client', 0), 10.0)
+        finally:
+            await host.close()
+        self.assertEqual(host.stats.clients, 1)
+        self.assertEqual(host.stats.messages, len(script))
+        self.assertEqual(host.stats.decisions, 2)
+        self.assertEqual(host.stats.invalid, 0)
+        self.assertEqual(host.stats.mismatches, 0)
+        self.assertEqual(host.stats.timeouts, 0)
+
+
+    async def test_wrong_decision(self) -> None:
+        script: list[Step] = _script()
+        recorded: list[Step] = [step._replace(expected=_response(6)) if step.expected == _response(7) else step for step in script]
+        host: StandInHost = StandInHost(recorded, timeout=5.0)
+        port: int = await host.start()
+        try:
+            await asyncio.wait_for(scripted_client(script).connect('127.0.0.1', port, 'client', 0), 10.0)
+        finally:
+            await host.close()
+        self.assertEqual(host.stats.mismatches, 1)
+        self.assertEqual(host.stats.invalid, 0)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import struct
+import unittest
+
+from ygo_core.deck import Deck
+from ygo_core.duel import Card
+from ygo_core.card import Location, Position
+from ygo_core.enums import Player, Query
+
+from ygo_client.manager import GameManager
+from ygo_client.connection.packet import Packet
+from ygo_client.connection.enums.game_message import GameMessage
+from ygo_client.connection.messages import SelectCard, SelectChain, SelectSum, UpdateCard, UpdateData
+
+from tests.support import RecordingExecutor, game_message
+
+_MONSTER_ZONE: int = 0x04
+
+
+def _manager(**answers: object) -> tuple[GameManager, RecordingExecutor]:
+    executor: RecordingExecutor = RecordingExecutor(**answers)
+    return GameManager(Deck([], [], []), executor), executor
+
+
+
+class TestSelections(unittest.IsolatedAsyncioTestCase):
+    async def test_select_card_resolves_every_choice(self) -> None:
+        manager, executor = _manager(select_card=[1])
+        packet: Packet = game_message(GameMessage.SELECT_CARD, SelectCard(
+            player=0, cancelable=False, min=1, max=1, choices=[(101, 0, 4, 0, 1), (102, 1, 4, 2, 1)]
+        ))
+        packet.read_int(1) # game message id
+        reply: Packet = await manager.on_select_card(SelectCard.decode(packet))
+        (method, args), = executor.calls
+        self.assertEqual(method, 'select_card')
+        self.assertEqual([card.id for card in args[0]], [101, 102])
+        self.assertIs(args[0][1], manager.duel.get_card(Player.OPPONENT, Location(4), 2))
+        self.assertEqual(args[1:3], (1, 1))
+        self.assertEqual(reply.content, struct.pack('<III', 0, 1, 1))
+
+
+    async def test_select_chain_passes_the_descriptions(self) -> None:
+        manager, executor = _manager(select_chain=0)
+        reply: Packet = await manager.on_select_chain(SelectChain(
+            player=0, specount=0, forced=True, hint1=0, hint2=0,
+            choices=[(201, 0, 8, 1, 1, 1 << 33, 0)]
+        ))
+        (method, args), = executor.calls
+        self.assertEqual([card.id for card in args[0]], [201])
+        self.assertEqual(args[1:], ([1 << 33], True))
+        self.assertEqual(reply.content, struct.pack('<i', 0))
+
+
+    async def test_select_chain_without_choices_passes(self) -> None:
+        manager, executor = _manager()
+        reply: Packet = await manager.on_select_chain(SelectChain(player=0, specount=0, forced=False, hint1=0, hint2=0, choices=[]))
+        self.assertEqual(executor.calls, [])
+        self.assertEqual(reply.content, struct.pack('<i', -1))
+
+
+    async def test_select_sum_writes_the_selection_into_the_reply(self) -> None:
+        manager, executor = _manager(select_sum=[1])
+        reply: Packet = await manager.on_select_sum(SelectSum(
+            player=0, select_mode=False, sum_value=8, min=1, max=2,
+            must_selected=[(301, 0, 4, 0, 3, 0)],
+            choices=[(302, 0, 4, 1, 4, 0), (303, 0, 4, 2, 5, 0)]
+        ))
+        (method, args), = executor.calls
+        self.assertEqual([(card.id, value1, value2) for card, value1, value2 in args[0]], [(302, 4, 0), (303, 5, 0)])
+        self.assertEqual(args[1], 5) # what is left once the card selected by the server is counted
+        self.assertEqual(reply.content, b'\x00\x01\x00\x00' + struct.pack('<I', 2) + b'\x00\x01')
+
+
+
+def _query(query: int, data: bytes) -> bytes:
+    """ One query block: size (query included), query and data. """
+    return struct.pack('<HI', 4 + len(data), query) + data
+
+
+def _queries(*blocks: bytes) -> memoryview:
+    return memoryview(b''.join(blocks) + _query(Query.END, b''))
+
+
+
+class TestCardQueries(unittest.TestCase):
+    def setUp(self) -> None:
+        self.manager, _ = _manager()
+
+
+    def test_update_card_applies_every_query(self) -> None:
+        queries: memoryview = _queries(
+            _query(Query.ID, struct.pack('<I', 89631139)),
+            _query(Query.POSITION, struct.pack('<I', 1)),
+            _query(Query.ATTACK, struct.pack('<I', 3000)),
+            _query(Query.OVERLAY_CARD, struct.pack('<III', 2, 11, 12)),
+            _query(Query.COUNTERS, struct.pack('<II', 1, 3 << 16 | 0x1019)),
+            _query(Query.CONTROLLER, b'\x01'),
+            _query(Query.IS_PUBLIC, b'\x01'), # not tracked: skipped by its size
+            _query(Query.LEVEL, struct.pack('<I', 8)),
+        )
+        self.manager.on_update_card(UpdateCard(player=0, location=_MONSTER_ZONE, index=2, queries=queries))
+        card: Card = self.manager.duel.get_card(Player.ME, Location(_MONSTER_ZONE), 2)
+        self.assertEqual((card.id, card.attack, card.level), (89631139, 3000, 8))
+        self.assertEqual(card.position, Position(1))
+        self.assertEqual(card.overlays, [11, 12])
+        self.assertEqual(card.counters, {0x1019: 3})
+        self.assertEqual(card.controller, Player.OPPONENT)
+
+
+    def test_unchanged_flags_keep_their_object(self) -> None:
+        card: Card = self.manager.duel.get_card(Player.ME, Location(_MONSTER_ZONE), 0)
+        card.position = Position(4)
+        position: Position = card.position
+        self.manager.on_update_card(UpdateCard(player=0, location=_MONSTER_ZONE, index=0, queries=_queries(_query(Query.POSITION, struct.pack('<I', 4)))))
+        self.assertIs(card.position, position)
+
+
+    def test_update_data_walks_the_cards_of_a_location(self) -> None:
+        cards: list[Card] = [self.manager.duel.get_card(Player.OPPONENT, Location(_MONSTER_ZONE), i) for i in range(2)]
+        data: bytes = b''.join(bytes(_queries(_query(Query.ATTACK, struct.pack('<I', 100 * (i + 1))))) for i in range(2))
+        self.manager.on_update_data(UpdateData(player=1, location=_MONSTER_ZONE, size=len(data), queries=memoryview(data)))
+        self.assertEqual([card.attack for card in cards], [100, 200])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
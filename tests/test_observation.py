@@ -0,0 +1,58 @@
+import random
+import unittest
+
+import numpy as np
+
+from ygo_client.manager import GameManager
+from ygo_client.observation import ObservationEncoder, Observation, SCALARS
+
+from tests.support import list_manager, start, play
+
+
+_TURN: int = SCALARS.index('turn')
+
+
+class TestObservationEncoder(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.manager: GameManager = list_manager()
+        self.encoder: ObservationEncoder = ObservationEncoder(self.manager.duel)
+        self.manager.add_listener(self.encoder)
+        await start(self.manager, main=(70, 40))
+
+
+    def assertEncodesTheDuel(self, observation: Observation, message: str='') -> None:
+        fresh: ObservationEncoder = ObservationEncoder(self.manager.duel)
+        fresh.refresh()
+        fresh.scalars[_TURN] = observation.scalars[_TURN]
+        np.testing.assert_array_equal(observation.cards, fresh.cards, message)
+        np.testing.assert_array_equal(observation.scalars, fresh.scalars, message)
+
+
+    async def test_changes_keep_the_arrays_equal_to_a_full_encoding(self) -> None:
+        self.assertEncodesTheDuel(self.encoder.observe())
+        rnd: random.Random = random.Random(16)
+        for step in range(2000):
+            await play(self.manager, rnd)
+            self.assertEncodesTheDuel(self.encoder.observe(), f'after step {step}')
+
+
+    async def test_observe_returns_a_copy(self) -> None:
+        observation: Observation = self.encoder.observe()
+        observation.cards[:] = -1
+        observation.scalars[:] = -1
+        self.assertFalse((self.encoder.cards == -1).any())
+        self.assertFalse((self.encoder.scalars == -1).any())
+
+
+    async def test_removed_listener_is_no_longer_told(self) -> None:
+        self.manager.remove_listener(self.encoder)
+        before: Observation = self.encoder.observe()
+        rnd: random.Random = random.Random(0)
+        for _ in range(50):
+            await play(self.manager, rnd)
+        np.testing.assert_array_equal(self.encoder.observe().cards, before.cards)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
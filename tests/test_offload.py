@@ -0,0 +1,114 @@
+import asyncio
+import concurrent.futures
+import threading
+import unittest
+from typing import Any, Optional, Union, Awaitable
+
+from ygo_core.deck import Deck
+
+from ygo_client.bus import Event
+from ygo_client.client import GameClient
+from ygo_client.offload import OffloadExecutor, FallbackExecutor
+from ygo_client.connection.packet import Packet
+from ygo_client.connection.enums.game_message import GameMessage
+from ygo_client.connection.messages import Hint
+
+from tests.support import game_message
+
+
+class _BlockingExecutor(FallbackExecutor):
+    """ Answers select_yn with True once released. """
+    released: threading.Event
+    started: threading.Event
+
+    def __init__(self) -> None:
+        self.released = threading.Event()
+        self.started = threading.Event()
+
+
+    def select_yn(self) -> bool:
+        self.started.set()
+        self.released.wait(5.0)
+        return True
+
+
+
+class TestOffloadExecutor(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.executor: _BlockingExecutor = _BlockingExecutor()
+        self.pool: concurrent.futures.ThreadPoolExecutor = concurrent.futures.ThreadPoolExecutor(2)
+        self.addCleanup(self.pool.shutdown)
+        self.addCleanup(self.executor.released.set)
+
+
+    async def test_decision_in_time_is_the_executor_answer(self) -> None:
+        offload: OffloadExecutor = OffloadExecutor(self.executor, self.pool, timeout=5.0)
+        self.executor.released.set()
+        self.assertTrue(await offload.select_yn())
+        self.assertEqual(offload.fallback_rate, 0.0)
+        self.assertIsNone(offload.lingering)
+
+
+    async def test_late_decision_is_answered_by_the_fallback_and_lingers(self) -> None:
+        offload: OffloadExecutor = OffloadExecutor(self.executor, self.pool, timeout=0.05)
+        with self.assertLogs('ygo_client.offload', 'WARNING'):
+            self.assertFalse(await offload.select_yn())
+        self.assertEqual((offload.decisions, offload.fallbacks), (1, 1))
+        lingering: Optional[asyncio.Future[Any]] = offload.lingering
+        assert lingering is not None
+        self.assertFalse(lingering.done())
+        self.executor.released.set()
+        self.assertTrue(await lingering)
+        self.assertIsNone(offload.lingering)
+
+
+    async def test_lingering_waits_for_every_late_decision(self) -> None:
+        offload: OffloadExecutor = OffloadExecutor(self.executor, self.pool, timeout=0.05)
+        with self.assertLogs('ygo_client.offload', 'WARNING'):
+            await offload.select_yn()
+            await offload.select_yn()
+        lingering: Optional[asyncio.Future[Any]] = offload.lingering
+        assert lingering is not None
+        self.executor.released.set()
+        await lingering
+        self.assertIsNone(offload.lingering)
+
+
+    async def test_exhausted_time_limit_answers_at_once(self) -> None:
+        offload: OffloadExecutor = OffloadExecutor(self.executor, self.pool, margin=1.0)
+        await offload.on_timelimit(1)
+        with self.assertLogs('ygo_client.offload', 'WARNING'):
+            self.assertFalse(await offload.select_yn())
+        self.assertFalse(self.executor.started.is_set())
+        self.assertIsNone(offload.lingering)
+        self.assertEqual(offload.fallback_rate, 1.0)
+
+
+
+class TestLingeringDecision(unittest.IsolatedAsyncioTestCase):
+    async def test_state_task_waits_for_it(self) -> None:
+        offload: OffloadExecutor = OffloadExecutor(FallbackExecutor(), concurrent.futures.ThreadPoolExecutor(1))
+        self.addCleanup(offload.pool.shutdown)
+        client: GameClient = GameClient(offload, Deck([], [], []))
+        published: list[Event] = []
+        client.subscribe(published.append, [GameMessage.HINT])
+
+        lingering: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        offload.lingering = lingering
+        inbound: asyncio.Queue[Optional[Packet]] = asyncio.Queue()
+        prompts: asyncio.Queue[Optional[Union[Packet, Awaitable[Optional[Packet]]]]] = asyncio.Queue()
+        inbound.put_nowait(game_message(GameMessage.HINT, Hint(hint_type=0, player=0, data=1)))
+        inbound.put_nowait(None)
+        updater: asyncio.Task[None] = asyncio.create_task(client._update(inbound, prompts))
+        await asyncio.sleep(0.01)
+        self.assertEqual(published, [])
+
+        offload.lingering = None
+        lingering.set_result(None)
+        await asyncio.wait_for(updater, 1.0)
+        self.assertEqual([event.message.data for event in published], [1])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
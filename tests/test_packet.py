@@ -0,0 +1,110 @@
+import struct
+import unittest
+
+from ygo_client.connection.packet import Packet, MAX_PACKET_SIZE
+
+
+def _frame(msg_id: int, content: bytes) -> bytes:
+    return bytes((msg_id,)) + content
+
+
+
+class TestPacketRead(unittest.TestCase):
+    def test_read_ints_of_every_width(self) -> None:
+        content: bytes = struct.pack('<BHIQ', 0xfe, 0xbeef, 0xdeadbeef, 1 << 40) + b'\x01\x02\x03'
+        packet: Packet = Packet.from_bytes(_frame(3, content))
+        self.assertEqual(packet.msg_id, 3)
+        self.assertEqual(packet.read_int(1), 0xfe)
+        self.assertEqual(packet.read_int(2), 0xbeef)
+        self.assertEqual(packet.read_int(4), 0xdeadbeef)
+        self.assertEqual(packet.read_int(8), 1 << 40)
+        self.assertEqual(packet.read_int(3), 0x030201)
+
+
+    def test_short_read_decodes_what_remains(self) -> None:
+        packet: Packet = Packet.from_bytes(_frame(1, b'\x05\x01'))
+        self.assertEqual(packet.read_int(4), 0x0105)
+
+
+    def test_read_struct_and_structs(self) -> None:
+        record: struct.Struct = struct.Struct('<BI')
+        content: bytes = struct.pack('<H', 7) + b''.join(record.pack(i, 10 * i) for i in range(3))
+        packet: Packet = Packet.from_bytes(_frame(1, content))
+        self.assertEqual(packet.read_struct(struct.Struct('<H')), (7,))
+        self.assertEqual(list(packet.read_structs(record, 2)), [(0, 0), (1, 10)])
+        self.assertEqual(packet.read_struct(record), (2, 20))
+
+
+    def test_read_rest_is_a_view_of_the_received_buffer(self) -> None:
+        data: bytearray = bytearray(_frame(1, b'\x02abc'))
+        packet: Packet = Packet.from_bytes(data)
+        self.assertEqual(packet.read_int(1), 2)
+        rest: memoryview = packet.read_rest()
+        self.assertEqual(rest.tobytes(), b'abc')
+        data[-1] = ord('z')
+        self.assertEqual(rest.tobytes(), b'abz')
+        self.assertEqual(packet.read_rest().tobytes(), b'')
+
+
+    def test_read_str_bool_and_id(self) -> None:
+        content: bytes = 'ab'.encode('utf-16-le') + b'\x01' + struct.pack('<I', 1234)
+        packet: Packet = Packet.from_bytes(_frame(1, content))
+        self.assertEqual(packet.read_str(4), 'ab')
+        self.assertTrue(packet.read_bool())
+        self.assertEqual(packet.read_id(), 1234)
+
+
+    def test_content_without_msg_id(self) -> None:
+        packet: Packet = Packet.from_bytes(b'\x07\x00', msg_id=9)
+        self.assertEqual(packet.msg_id, 9)
+        self.assertEqual(packet.content, b'\x07\x00')
+        self.assertEqual(packet.data, b'\x09\x07\x00')
+        self.assertEqual(packet.read_int(2), 7)
+
+
+
+class TestPacketWrite(unittest.TestCase):
+    def test_frame_has_size_header_and_msg_id(self) -> None:
+        packet: Packet = Packet(5)
+        packet.write_int(0x0102, byte_size=2)
+        packet.write_bool(True)
+        packet.write_str('ab', byte_size=6)
+        self.assertEqual(bytes(packet.frame), struct.pack('<HB', 10, 5) + b'\x02\x01\x01' + 'ab'.encode('utf-16-le') + b'\x00\x00')
+        self.assertEqual(packet.size, 10)
+
+
+    def test_negative_and_odd_width_ints(self) -> None:
+        packet: Packet = Packet(1)
+        packet.write_int(-1)
+        packet.write_int(0x030201, byte_size=3)
+        self.assertEqual(packet.content, b'\xff\xff\xff\xff\x01\x02\x03')
+
+
+    def test_buffer_grows_past_its_capacity(self) -> None:
+        packet: Packet = Packet(1, capacity=4)
+        for i in range(100):
+            packet.write_int(i)
+        packet.write_struct(struct.Struct('<HH'), 1, 2)
+        self.assertEqual(packet.content, b''.join(struct.pack('<I', i) for i in range(100)) + struct.pack('<HH', 1, 2))
+
+
+    def test_too_large_packet_is_refused(self) -> None:
+        packet: Packet = Packet(1)
+        packet.write_bytes(bytes(MAX_PACKET_SIZE - 1))
+        with self.assertRaises(ValueError):
+            packet.write_int(0, byte_size=1)
+
+
+    def test_writing_to_a_received_packet_copies_it(self) -> None:
+        data: bytes = _frame(2, b'\x01')
+        packet: Packet = Packet.from_bytes(data)
+        self.assertEqual(packet.read_int(1), 1)
+        packet.write_int(3, byte_size=1)
+        self.assertEqual(packet.data, b'\x02\x01\x03')
+        self.assertEqual(data, b'\x02\x01')
+        self.assertEqual(bytes(packet.frame), b'\x03\x00\x02\x01\x03')
+
+
+
+if __name__ == '__main__':
+    unittest.main()
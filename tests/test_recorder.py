@@ -0,0 +1,119 @@
+import os
+import tempfile
+import time
+import unittest
+
+from ygo_client.recorder import PacketRecorder, PacketLog, Frame, RECEIVED, SENT
+from ygo_client.connection.enums.stoc_message import StocMessage
+from ygo_client.connection.enums.game_message import GameMessage
+from ygo_client.connection.messages import PlayerOnly, NewPhase
+
+from tests.support import game_message
+
+_DUEL_START: bytes = bytes((StocMessage.DUEL_START,))
+_DUEL_END: bytes = bytes((StocMessage.DUEL_END,))
+_CHAT: bytes = bytes((StocMessage.CHAT,)) + b'hi'
+_RESPONSE: bytes = b'\x01\x07\x00\x00\x00'
+
+
+def _turn(player: int) -> bytes:
+    return game_message(GameMessage.NEW_TURN, PlayerOnly(player=player)).data
+
+
+def _phase(phase: int) -> bytes:
+    return game_message(GameMessage.NEW_PHASE, NewPhase(phase=phase)).data
+
+
+# (direction, frame) of two games, the first of two turns
+_FRAMES: list[tuple[int, bytes]] = [
+    (RECEIVED, _CHAT),
+    (RECEIVED, _DUEL_START),
+    (RECEIVED, _turn(0)),
+    (RECEIVED, _phase(4)),
+    (SENT, _RESPONSE),
+    (RECEIVED, _turn(1)),
+    (RECEIVED, _DUEL_END),
+    (RECEIVED, _DUEL_START),
+    (RECEIVED, _turn(1)),
+    (RECEIVED, _DUEL_END),
+]
+
+
+
+class TestPacketLog(unittest.TestCase):
+    def setUp(self) -> None:
+        directory: tempfile.TemporaryDirectory[str] = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path: str = os.path.join(directory.name, 'games.ylog')
+
+
+    def _record(self, frames: list[tuple[int, bytes]]=_FRAMES) -> None:
+        with PacketRecorder(self.path, buffer_size=16) as recorder:
+            for timestamp, (direction, data) in enumerate(frames):
+                recorder.record(direction, data, timestamp)
+
+
+    def assertLogged(self, log: PacketLog) -> None:
+        frames: list[Frame] = list(log.frames())
+        self.assertEqual([(frame.direction, frame.timestamp, bytes(frame.data)) for frame in frames], [
+            (direction, timestamp, data) for timestamp, (direction, data) in enumerate(_FRAMES)
+        ])
+        self.assertEqual(len(log.games), 2)
+        self.assertEqual([bytes(frame.data) for frame in log.game(1)], [_DUEL_START, _turn(1), _DUEL_END])
+        self.assertEqual(len(log.games[0].turns), 2)
+        self.assertEqual([bytes(frame.data) for frame in log.turn(0, 0)], [_turn(0), _phase(4), _RESPONSE])
+        self.assertEqual([bytes(frame.data) for frame in log.turn(0, 1)], [_turn(1), _DUEL_END])
+
+
+    def test_frames_round_trip_through_the_index(self) -> None:
+        self._record()
+        with PacketLog(self.path) as log:
+            self.assertLogged(log)
+
+
+    def test_log_without_index_is_scanned(self) -> None:
+        self._record()
+        with PacketLog(self.path) as log:
+            end: int = log._end
+        with open(self.path, 'r+b') as file:
+            file.truncate(end + 5) # the index is lost and a record begun
+        with PacketLog(self.path) as log:
+            self.assertLogged(log)
+
+
+    def test_game_cut_short_ends_with_the_log(self) -> None:
+        self._record(_FRAMES[:4])
+        with PacketLog(self.path) as log:
+            self.assertEqual(len(log.games), 1)
+            self.assertEqual([bytes(frame.data) for frame in log.game(0)], [_DUEL_START, _turn(0), _phase(4)])
+
+
+    def test_game_is_written_when_it_ends(self) -> None:
+        recorder: PacketRecorder = PacketRecorder(self.path, buffer_size=1 << 20, flush_interval=3600.0)
+        self.addCleanup(recorder.close)
+        for timestamp, (direction, data) in enumerate(_FRAMES[:7]):
+            recorder.record(direction, data, timestamp)
+        deadline: float = time.monotonic() + 5.0
+        while os.path.getsize(self.path) < recorder._offset and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with PacketLog(self.path) as log:
+            self.assertEqual([len(game.turns) for game in log.games], [2])
+
+
+    def test_closed_recorder_refuses_frames(self) -> None:
+        recorder: PacketRecorder = PacketRecorder(self.path)
+        recorder.close()
+        with self.assertRaises(ValueError):
+            recorder.received(_CHAT)
+
+
+    def test_other_files_are_refused(self) -> None:
+        with open(self.path, 'wb') as file:
+            file.write(b'not a log')
+        with self.assertRaises(ValueError):
+            PacketLog(self.path)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
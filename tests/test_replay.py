@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+from ygo_client.recorder import PacketRecorder, PacketLog, RECEIVED, SENT
+from ygo_client.replay import ReplayDriver, ReplayStats
+from ygo_client.connection.packet import Packet
+from ygo_client.connection.enums.ctos_message import CtosMessage
+from ygo_client.connection.enums.game_message import GameMessage
+from ygo_client.connection.messages import SelectOption, SelectChain, SelectYesNo, AnnounceNumber
+
+from tests.support import game_message
+
+
+def _response(value: int, size: int=4) -> bytes:
+    reply: Packet = Packet(CtosMessage.RESPONSE)
+    reply.write_int(value, size)
+    return reply.data
+
+
+# (direction, frame) of four prompts and their replies; GameManager answers the chain by itself
+_FRAMES: list[tuple[int, bytes]] = [
+    (RECEIVED, game_message(GameMessage.SELECT_OPTION, SelectOption(player=0, options=[10, 20, 30])).data),
+    (SENT, _response(2)),
+    (RECEIVED, game_message(GameMessage.SELECT_CHAIN, SelectChain(player=0, specount=0, forced=False, hint1=0, hint2=0, choices=[])).data),
+    (SENT, _response(-1)),
+    (SENT, bytes((CtosMessage.CHAT,)) + b'gl'),
+    (RECEIVED, game_message(GameMessage.SELECT_YESNO, SelectYesNo(player=0, description=0)).data),
+    (SENT, _response(1, 1)),
+    (RECEIVED, game_message(GameMessage.ANNOUNCE_NUNBER, AnnounceNumber(player=0, options=[3, 6])).data),
+    (SENT, _response(1)),
+]
+
+
+
+class TestReplayDriver(unittest.TestCase):
+    def setUp(self) -> None:
+        directory: tempfile.TemporaryDirectory[str] = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path: str = os.path.join(directory.name, 'games.ylog')
+
+
+    def _replay(self, frames: list[tuple[int, bytes]]) -> tuple[ReplayStats, list[bytes]]:
+        """ Record frames, replay them and return the stats and the recorded replies used. """
+        with PacketRecorder(self.path) as recorder:
+            for direction, data in frames:
+                recorder.record(direction, data)
+        decisions: list[bytes] = []
+        with PacketLog(self.path) as log:
+            driver: ReplayDriver = ReplayDriver(log)
+            driver.on_decision = lambda reply: decisions.append(bytes(reply))
+            stats: ReplayStats = driver.run()
+            del driver
+        return stats, decisions
+
+
+    def test_recorded_replies_are_made_again(self) -> None:
+        stats, decisions = self._replay(_FRAMES)
+        self.assertEqual((stats.messages, stats.decisions, stats.mismatches, stats.truncated), (4, 4, 0, False))
+        self.assertEqual(decisions, [_response(2), _response(-1), _response(1, 1), _response(1)])
+
+
+    def test_differing_reply_is_a_mismatch(self) -> None:
+        frames: list[tuple[int, bytes]] = list(_FRAMES)
+        frames[3] = (SENT, _response(0)) # not the answer GameManager makes to a chain with no choices
+        stats, _ = self._replay(frames)
+        self.assertEqual((stats.decisions, stats.mismatches, stats.truncated), (4, 1, False))
+
+
+    def test_recording_ending_on_a_prompt_is_truncated(self) -> None:
+        stats, decisions = self._replay(_FRAMES[:-1])
+        self.assertEqual((stats.messages, stats.decisions, stats.truncated), (3, 3, True))
+        self.assertEqual(len(decisions), 3)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import asyncio
+import os
+import threading
+import unittest
+from typing import List
+
+from ygo_client.shm import ShmRing, ShmClient, ShmServer, ShmExecutor, FREE, REQUEST, RESPONSE, _fifos
+
+
+def _upper(requests: List[memoryview]) -> List[bytes]:
+    return [bytes(request).upper() for request in requests]
+
+
+
+class TestShmRing(unittest.TestCase):
+    def setUp(self) -> None:
+        self.ring: ShmRing = ShmRing.create(2, request_size=16, response_size=8)
+        self.addCleanup(self.ring.close)
+
+
+    def test_slot_goes_through_its_states(self) -> None:
+        other: ShmRing = ShmRing.attach(self.ring.name)
+        self.addCleanup(other.close)
+        other.write_request(1, b'abc')
+        self.assertEqual((self.ring.state(1), self.ring.ready()), (REQUEST, [1]))
+        self.assertEqual(bytes(self.ring.read_request(1)), b'abc')
+        self.ring.write_response(1, b'xy')
+        self.assertEqual(other.state(1), RESPONSE)
+        self.assertEqual(other.read_response(1), b'xy')
+        self.assertEqual(self.ring.state(1), FREE)
+
+
+    def test_oversized_payloads_are_refused(self) -> None:
+        with self.assertRaises(ValueError):
+            self.ring.write_request(0, bytes(17))
+        with self.assertRaises(ValueError):
+            self.ring.write_response(0, bytes(9))
+
+
+    def test_wait_returns_once_notified(self) -> None:
+        self.assertFalse(self.ring.wait(0, 0.01))
+        self.ring.notify(0)
+        self.ring.notify(0)
+        self.assertTrue(self.ring.wait(0, 0.01))
+        self.assertFalse(self.ring.wait(0, 0.01)) # both notifications were cleared
+        self.ring.write_request(1, b'a')
+        self.assertTrue(self.ring.wait(None, 0.01))
+
+
+    def test_close_removes_the_fifos(self) -> None:
+        ring: ShmRing = ShmRing.create(1)
+        paths: List[str] = _fifos(ring.name, 1)
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+        ring.close()
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+
+
+
+class TestShmServer(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.ring: ShmRing = ShmRing.create(3, request_size=16, response_size=16)
+        self.server: ShmServer = ShmServer(self.ring, _upper, timeout=0.01)
+        self.stop: threading.Event = threading.Event()
+        self.thread: threading.Thread = threading.Thread(target=self.server.serve, args=(self.stop.is_set,))
+        self.thread.start()
+        self.addCleanup(self.ring.close)
+        self.addCleanup(self.thread.join)
+        self.addCleanup(self.stop.set)
+
+
+    async def test_blocking_requests_are_answered(self) -> None:
+        client: ShmClient = ShmClient(self.ring, 0)
+        self.assertEqual([client.request(data) for data in (b'ab', b'cd')], [b'AB', b'CD'])
+        self.assertEqual(self.server.requests, 2)
+
+
+    async def test_requests_of_many_slots_are_answered_in_the_event_loop(self) -> None:
+        clients: List[ShmClient] = [ShmClient(self.ring, slot) for slot in range(3)]
+        responses: List[bytes] = await asyncio.wait_for(
+            asyncio.gather(*(client.arequest(b'slot%d' % client.slot) for client in clients for _ in range(10))), 5.0
+        )
+        self.assertEqual(responses, [b'SLOT%d' % slot for slot in range(3) for _ in range(10)])
+        self.assertEqual(self.server.requests, 30)
+        self.assertLessEqual(self.server.batches, 30)
+
+
+    async def test_executor_decodes_the_response(self) -> None:
+        executor: ShmExecutor = ShmExecutor(
+            ShmClient(self.ring, 2),
+            lambda method, args: method[-2:].encode(),
+            lambda method, response: response == b'YN'
+        )
+        self.assertTrue(await asyncio.wait_for(executor.select_yn(), 5.0))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
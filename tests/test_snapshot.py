@@ -0,0 +1,104 @@
+import random
+import unittest
+from typing import Any, cast
+
+import numpy as np
+
+from ygo_core.enums import Player
+
+from ygo_client.manager import GameManager
+from ygo_client.observation import ObservationEncoder
+from ygo_client.snapshot import DuelSnapshot, snapshot
+from ygo_client.connection.messages import PosChange
+
+from tests.support import ListCard, ListDuel, list_manager, start, play
+
+
+def _state(duel: ListDuel) -> Any:
+    """ The locations, cards, LP and phase of duel, with the cards referred to by identity. """
+    def value(item: Any) -> Any:
+        if isinstance(item, list):
+            return [id(card) for card in item]
+        if isinstance(item, dict):
+            return dict(item)
+        return id(item) if isinstance(item, ListCard) else item
+
+    cards: list[ListCard] = [card for cards in duel.cards.values() for card in cards if card]
+    return (
+        {key: [id(card) if card else None for card in cards] for key, cards in duel.cards.items()},
+        {id(card): {name: value(item) for name, item in vars(card).items()} for card in cards},
+        [field.life_point for field in duel.field.values()],
+        duel.phase, duel.turn_player,
+    )
+
+
+
+class TestDuelSnapshot(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.manager: GameManager = list_manager()
+        self.duel: ListDuel = cast(ListDuel, self.manager.duel)
+        await start(self.manager)
+
+
+    async def test_restore_undoes_random_changes(self) -> None:
+        rnd: random.Random = random.Random(18)
+        for trial in range(40):
+            for _ in range(rnd.randrange(10)):
+                await play(self.manager, rnd)
+            saved: Any = _state(self.duel)
+            snap: DuelSnapshot = snapshot(self.manager)
+            for branch in range(3):
+                for _ in range(rnd.randrange(1, 30)):
+                    await play(self.manager, rnd)
+                snap.restore()
+                self.assertEqual(_state(self.duel), saved, f'trial {trial}, branch {branch}')
+                self.assertEqual(snap.restore(full=True), 0) # nothing was left for a full compare
+            snap.close()
+        self.assertIs(self.duel.field[Player.ME].deck, self.duel.cards[(Player.ME, 0x01)])
+
+
+    async def test_restore_compares_only_the_changed_cards(self) -> None:
+        snap: DuelSnapshot = snapshot(self.manager)
+        self.assertEqual(snap.restore(), 0)
+        untold: ListCard = self.duel.cards[(Player.OPPONENT, 0x01)][0] # type: ignore
+        untold.id = 99
+        self.manager.on_poschange(PosChange(card_id=0, controller=0, location=0x04, index=2, previous_position=1, current_position=4))
+        self.assertEqual(snap.restore(), 1) # the zone, from which the card created since is dropped
+        self.assertEqual(untold.id, 99)
+        self.assertIsNone(self.duel.cards[(Player.ME, 0x04)][2])
+        self.assertEqual(snap.restore(full=True), 1)
+        self.assertEqual(untold.id, 0)
+
+
+    async def test_other_listeners_are_told_of_the_restore(self) -> None:
+        encoder: ObservationEncoder = ObservationEncoder(self.manager.duel)
+        self.manager.add_listener(encoder)
+        encoder.refresh()
+        snap: DuelSnapshot = snapshot(self.manager)
+        before: np.ndarray = encoder.observe().cards
+        rnd: random.Random = random.Random(1)
+        for _ in range(30):
+            await play(self.manager, rnd)
+        snap.restore()
+        np.testing.assert_array_equal(encoder.observe().cards, before)
+
+
+    async def test_nested_snapshots(self) -> None:
+        rnd: random.Random = random.Random(2)
+        outer: DuelSnapshot = snapshot(self.manager)
+        outer_state: Any = _state(self.duel)
+        for _ in range(20):
+            await play(self.manager, rnd)
+        inner: DuelSnapshot = snapshot(self.manager)
+        inner_state: Any = _state(self.duel)
+        for _ in range(20):
+            await play(self.manager, rnd)
+        outer.restore()
+        self.assertEqual(_state(self.duel), outer_state)
+        inner.restore()
+        self.assertEqual(_state(self.duel), inner_state)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import random
+import unittest
+from typing import cast
+from unittest import mock
+
+from ygo_core.enums import Player
+
+from ygo_client import tracking
+from ygo_client.manager import GameManager
+from ygo_client.snapshot import DuelSnapshot, snapshot
+from ygo_client.tracking import StateHash
+from ygo_client.connection.messages import Draw, LifePoints
+
+from tests.support import ListCard, ListDuel, list_manager, start, play
+
+
+class TestStateHash(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.manager: GameManager = list_manager()
+        self.duel: ListDuel = cast(ListDuel, self.manager.duel)
+        await start(self.manager)
+
+
+    async def test_updates_equal_a_rehash(self) -> None:
+        self.assertEqual(self.manager.state_hash, StateHash(self.manager.duel).value)
+        rnd: random.Random = random.Random(19)
+        for step in range(2000):
+            await play(self.manager, rnd)
+            self.assertEqual(self.manager.state_hash, StateHash(self.manager.duel).value, f'after step {step}')
+
+
+    async def test_draw_xors_two_keys(self) -> None:
+        self.manager.state_hash
+        with mock.patch.object(tracking, 'zobrist_key', wraps=tracking.zobrist_key) as zobrist_key:
+            self.manager.on_draw(Draw(player=0, count=1))
+        self.assertEqual(zobrist_key.call_count, 2) # the card out of the deck and into the hand
+
+
+    async def test_state_is_hashed_not_its_history(self) -> None:
+        before: int = self.manager.state_hash
+        self.manager.on_damage(LifePoints(player=1, amount=500))
+        self.assertNotEqual(self.manager.state_hash, before)
+        self.manager.on_recover(LifePoints(player=1, amount=500))
+        self.assertEqual(self.manager.state_hash, before)
+
+
+    def test_hand_is_a_multiset(self) -> None:
+        hand: list[ListCard] = self.duel.cards[(Player.ME, 0x02)] # type: ignore
+        empty: int = StateHash(self.duel).value
+        hand[:] = [ListCard(5), ListCard(5)]
+        twice: int = StateHash(self.duel).value
+        self.assertNotEqual(twice, empty) # equal cards do not cancel out
+        hand.append(ListCard(7))
+        in_order: int = StateHash(self.duel).value
+        hand.insert(0, hand.pop())
+        self.assertEqual(StateHash(self.duel).value, in_order)
+
+
+    async def test_restored_duel_has_its_hash_back(self) -> None:
+        before: int = self.manager.state_hash
+        snap: DuelSnapshot = snapshot(self.manager)
+        rnd: random.Random = random.Random(3)
+        for _ in range(30):
+            await play(self.manager, rnd)
+        self.assertNotEqual(self.manager.state_hash, before)
+        snap.restore()
+        self.assertEqual(self.manager.state_hash, before)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import lzma
+import os
+import struct
+import tempfile
+import unittest
+
+from ygo_client.yrp import (
+    Replay, REPLAY_YRP1, REPLAY_YRPX, REPLAY_COMPRESSED, REPLAY_SINGLE_MODE, REPLAY_NEWREPLAY,
+    REPLAY_64BIT_DUELFLAG, REPLAY_EXTENDED_HEADER, OLD_REPLAY_MODE
+)
+from ygo_client.connection.packet import Packet
+from ygo_client.connection.codec import Message
+from ygo_client.connection.enums.stoc_message import StocMessage
+from ygo_client.connection.enums.game_message import GameMessage
+from ygo_client.connection.messages import PlayerOnly, NewPhase, Payload
+
+from tests.support import game_message
+
+
+def _name(name: str) -> bytes:
+    return name.encode('utf-16-le').ljust(40, b'\0')
+
+
+def _packet(msg_id: int, body: bytes) -> bytes:
+    return struct.pack('<BI', msg_id, len(body)) + body
+
+
+def _body(msg_id: int, message: Message) -> bytes:
+    return game_message(msg_id, message).data[2:]
+
+
+def _replay(replay_id: int, flags: int, data: bytes) -> bytes:
+    """ A replay of data, compressed if flags say so. """
+    size: int = len(data)
+    props: bytes = b''
+    if flags & REPLAY_COMPRESSED:
+        compressed: bytes = lzma.compress(data, format=lzma.FORMAT_ALONE)
+        props, data = compressed[:5], compressed[13:] # the .lzma header is not part of a replay
+    header: bytes = struct.pack('<IIIIII8s', replay_id, 0x1000, flags, 7, size, 0, props)
+    if flags & REPLAY_EXTENDED_HEADER:
+        header += struct.pack('<Q32s', 1, bytes(32))
+    return header + data
+
+
+_TURN: bytes = _body(GameMessage.NEW_TURN, PlayerOnly(player=1))
+_PHASE: bytes = _body(GameMessage.NEW_PHASE, NewPhase(phase=4))
+
+# the names and duel flags of a single mode duel, then its messages
+_MESSAGES: bytes = (
+    _name('Yugi') + _name('Kaiba') + struct.pack('<I', 0x2a)
+    + _packet(GameMessage.NEW_TURN, _TURN)
+    + _packet(OLD_REPLAY_MODE, b'yrp1...')
+    + _packet(GameMessage.NEW_PHASE, _PHASE)
+    + _packet(250, b'\x01\x02')
+)
+
+
+
+class TestReplay(unittest.TestCase):
+    def test_compressed_messages_are_decoded(self) -> None:
+        with Replay(_replay(REPLAY_YRPX, REPLAY_COMPRESSED | REPLAY_SINGLE_MODE | REPLAY_EXTENDED_HEADER, _MESSAGES)) as replay:
+            self.assertTrue(replay.is_new_replay)
+            self.assertEqual((replay.players, replay.home_count, replay.duel_flags), (['Yugi', 'Kaiba'], 1, 0x2a))
+            messages: list[tuple[int, Message]] = list(replay.messages())
+        self.assertEqual([msg_id for msg_id, _ in messages], [GameMessage.NEW_TURN, GameMessage.NEW_PHASE, 250])
+        self.assertEqual(messages[0][1], PlayerOnly(player=1))
+        self.assertEqual(messages[1][1], NewPhase(phase=4))
+        self.assertIsInstance(messages[2][1], Payload)
+
+
+    def test_messages_of_other_types_are_skipped(self) -> None:
+        replay: Replay = Replay(_replay(REPLAY_YRPX, REPLAY_SINGLE_MODE, _MESSAGES))
+        self.assertEqual([message for _, message in replay.messages(types=(GameMessage.NEW_PHASE,))], [NewPhase(phase=4)])
+
+
+    def test_frames_are_game_messages(self) -> None:
+        replay: Replay = Replay(_replay(REPLAY_YRPX, REPLAY_SINGLE_MODE, _MESSAGES))
+        packets: list[Packet] = [Packet.from_bytes(frame) for frame in replay.frames()]
+        self.assertEqual([packet.msg_id for packet in packets], [StocMessage.GAME_MSG] * 3)
+        self.assertEqual(bytes(packets[0].data), game_message(GameMessage.NEW_TURN, PlayerOnly(player=1)).data)
+
+
+    def test_large_replay_is_read_in_chunks(self) -> None:
+        data: bytes = _name('a') + _name('b') + struct.pack('<I', 0) + _packet(GameMessage.NEW_TURN, _TURN) * 20000
+        with tempfile.TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, 'duel.yrpX')
+            with open(path, 'wb') as file:
+                file.write(_replay(REPLAY_YRPX, REPLAY_COMPRESSED | REPLAY_SINGLE_MODE, data))
+            with Replay.open(path) as replay:
+                self.assertEqual(sum(1 for _ in replay.packets()), 20000)
+
+
+    def test_truncated_replay_ends_at_its_last_whole_message(self) -> None:
+        replay: Replay = Replay(_replay(REPLAY_YRPX, REPLAY_SINGLE_MODE, _MESSAGES)[:-1])
+        self.assertEqual([msg_id for msg_id, _ in replay.packets()], [GameMessage.NEW_TURN, GameMessage.NEW_PHASE])
+
+
+    def test_yrp_has_its_preamble_read(self) -> None:
+        data: bytes = (
+            struct.pack('<I', 2) + _name('A') + _name('B') + struct.pack('<I', 1) + _name('C')
+            + struct.pack('<III', 8000, 5, 1) + struct.pack('<Q', 1 << 40)
+        )
+        replay: Replay = Replay(_replay(REPLAY_YRP1, REPLAY_NEWREPLAY | REPLAY_64BIT_DUELFLAG, data))
+        self.assertFalse(replay.is_new_replay)
+        self.assertEqual((replay.players, replay.home_count), (['A', 'B', 'C'], 2))
+        self.assertEqual((replay.start_lp, replay.start_hand, replay.draw_count, replay.duel_flags), (8000, 5, 1, 1 << 40))
+        with self.assertRaises(ValueError):
+            next(replay.packets())
+
+
+    def test_other_files_are_refused(self) -> None:
+        with self.assertRaises(ValueError):
+            Replay(bytes(64))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
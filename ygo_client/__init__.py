@@ -1,12 +1,13 @@
 __version__ = '0.0.1'
 
 from .client import GameClient
-from .executor import DuelExecutor
+from .executor import DuelExecutor, AsyncDuelExecutor
 from ygo_core.deck import Deck
 
 __all__ = [
-    GameClient,
-    DuelExecutor,
-    Deck
+    'GameClient',
+    'DuelExecutor',
+    'AsyncDuelExecutor',
+    'Deck'
 ]
 
@@ -0,0 +1,313 @@
+""" Fixed-size action space for the prompts, for agents choosing by index.
+
+Each prompt is turned into Actions: a boolean mask of the legal indices of the
+action space and the RESPONSE value of every index, so a policy can score all
+ACTION_SIZE actions of a batch of prompts at once and answer with reply(index),
+or reply(*indices) for the card selections taking several cards.
+PolicyExecutor answers these prompts with a policy through GameManager, so the
+duel is still updated from them.
+
+numpy is optional: pip install ygo-client-python[numpy]
+"""
+from inspect import isawaitable
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional, Sequence, Union
+
+from ygo_core import Deck
+
+from ygo_client.bus import Event, Subscription
+from ygo_client.executor import DuelExecutor, AsyncDuelExecutor, DelegatingExecutor, as_async
+from ygo_client.connection.packet import Packet
+from ygo_client.connection.enums.ctos_message import CtosMessage
+from ygo_client.connection.enums.game_message import GameMessage
+from ygo_client.connection.codec import Message
+from ygo_client.connection.messages import (
+    SelectIdleCmd, SelectBattleCmd, SelectCard, SelectTribute, SelectChain, SelectPlace,
+    CardLocation, RepositionableCard, ActivatableCard
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None # type: ignore
+
+if TYPE_CHECKING:
+    from ygo_client.client import GameClient
+
+
+# (name, size) of the ranges of the action space, in order
+LAYOUT: tuple[tuple[str, int], ...] = (
+    ('summon', 16),
+    ('special_summon', 16),
+    ('reposition', 7),
+    ('monster_set', 16),
+    ('spell_set', 16),
+    ('activate', 32), # idle and battle commands
+    ('attack', 7),
+    ('to_battle', 1),
+    ('to_main2', 1),
+    ('to_end', 1), # idle and battle commands
+    ('shuffle', 1),
+    ('chain', 32),
+    ('no_chain', 1),
+    ('card', 64), # select card and select tribute, by choice
+    ('place', 32), # by bit of the zone flag, relative to the selecting player
+)
+ACTIONS: dict[str, slice] = {}
+_start: int = 0
+for _name, _size in LAYOUT:
+    ACTIONS[_name] = slice(_start, _start + _size)
+    _start += _size
+ACTION_SIZE: int = _start
+
+# command types of the idle and battle RESPONSE values: (index << 16) | type
+_IDLE_TYPES: tuple[str, ...] = ('summon', 'special_summon', 'reposition', 'monster_set', 'spell_set', 'activate')
+_IDLE_BATTLE, _IDLE_END, _IDLE_SHUFFLE = 6, 7, 8
+_BATTLE_ACTIVATE, _BATTLE_ATTACK, _BATTLE_MAIN2, _BATTLE_END = 0, 1, 2, 3
+_PLACE_ZONES: int = 0xff7fff7f # monster zones (bits 0-6) and spell zones (bits 8-15) of each player
+_MONSTER_ZONE: int = 0x04
+_SPELL_ZONE: int = 0x08
+
+
+class Actions:
+    """ The legal actions of one prompt.\n
+    mask[i] tells whether index i is legal and responses[i] is its RESPONSE value.
+    Choices beyond the size of their range are left out. An answer chooses between
+    min and max distinct actions; only card selections take other than one. """
+    msg_id: GameMessage
+    mask: 'np.ndarray' # bool, (ACTION_SIZE,)
+    responses: 'np.ndarray' # int64, (ACTION_SIZE,)
+    min: int = 1
+    max: int = 1
+
+    def __init__(self, msg_id: GameMessage) -> None:
+        if np is None:
+            raise ImportError('Actions requires numpy: pip install ygo-client-python[numpy]')
+        self.msg_id = msg_id
+        self.mask = np.zeros(ACTION_SIZE, dtype=np.bool_)
+        self.responses = np.zeros(ACTION_SIZE, dtype=np.int64)
+
+
+    def add(self, name: str, responses: Union[int, 'np.ndarray']) -> None:
+        """ Allow the first actions of range name, answered by responses (a value, or one per action). """
+        indices: slice = ACTIONS[name]
+        count: int = 1 if isinstance(responses, int) else min(len(responses), indices.stop - indices.start)
+        self.mask[indices.start:indices.start+count] = True
+        self.responses[indices.start:indices.start+count] = responses if isinstance(responses, int) else responses[:count]
+
+
+    def legal(self) -> 'np.ndarray':
+        return np.flatnonzero(self.mask)
+
+
+    def index_of(self, content: Union[bytes, memoryview]) -> int:
+        """ The index a RESPONSE of content (without msg id) answers with, the first one
+        for card selections, or -1 if it is not part of the action space. """
+        if self.msg_id in (GameMessage.SELECT_CARD, GameMessage.SELECT_TRIBUTE):
+            value: int = int.from_bytes(content[8:12], 'little', signed=True) if len(content) >= 12 else -1
+            if value < 0:
+                return -1
+        elif self.msg_id in (GameMessage.SELECT_PLACE, GameMessage.SELECT_DISFIELD):
+            value = int.from_bytes(content[:3], 'little')
+        else:
+            value = int.from_bytes(content[:4], 'little', signed=True)
+        matches: 'np.ndarray' = np.flatnonzero(self.mask & (self.responses == value))
+        return int(matches[0]) if len(matches) else -1
+
+
+    def check(self, indices: Sequence[int]) -> None:
+        """ Raise ValueError unless indices are an answer: between min and max distinct legal actions. """
+        if not self.min <= len(indices) <= self.max or len(set(indices)) != len(indices):
+            raise ValueError(f'{self.msg_id.name} takes {self.min} to {self.max} distinct actions, not {list(indices)}.')
+        for index in indices:
+            if not self.mask[index]:
+                raise ValueError(f'Action {index} is not legal for {self.msg_id.name}.')
+
+
+    def reply(self, *indices: int) -> Packet:
+        """ The RESPONSE packet choosing indices. """
+        self.check(indices)
+        reply: Packet = Packet(CtosMessage.RESPONSE)
+        if self.msg_id in (GameMessage.SELECT_CARD, GameMessage.SELECT_TRIBUTE):
+            reply.write_int(0)
+            reply.write_int(len(indices))
+            for index in indices:
+                reply.write_int(int(self.responses[index]))
+        elif self.msg_id in (GameMessage.SELECT_PLACE, GameMessage.SELECT_DISFIELD):
+            reply.write_int(int(self.responses[indices[0]]), byte_size=3) # player, location, sequence
+        else:
+            reply.write_int(int(self.responses[indices[0]]))
+        return reply
+
+
+
+def _commands(count: int, command_type: int) -> 'np.ndarray':
+    return np.arange(count, dtype=np.int64) << 16 | command_type
+
+
+def encode_idle_cmd(message: SelectIdleCmd) -> Actions:
+    actions: Actions = Actions(GameMessage.SELECT_IDLE_CMD)
+    records: tuple[Sequence[Union[CardLocation, RepositionableCard, ActivatableCard]], ...] = (
+        message.summonable, message.special_summonable, message.repositionable,
+        message.monster_setable, message.spell_setable, message.activatable
+    )
+    for command_type, (name, cards) in enumerate(zip(_IDLE_TYPES, records)):
+        actions.add(name, _commands(len(cards), command_type))
+    if message.can_battle:
+        actions.add('to_battle', _IDLE_BATTLE)
+    if message.can_end:
+        actions.add('to_end', _IDLE_END)
+    if message.can_shuffle:
+        actions.add('shuffle', _IDLE_SHUFFLE)
+    return actions
+
+
+def encode_battle_cmd(message: SelectBattleCmd) -> Actions:
+    actions: Actions = Actions(GameMessage.SELECT_BATTLE_CMD)
+    actions.add('activate', _commands(len(message.activatable), _BATTLE_ACTIVATE))
+    actions.add('attack', _commands(len(message.attackable), _BATTLE_ATTACK))
+    if message.can_main2:
+        actions.add('to_main2', _BATTLE_MAIN2)
+    if message.can_end:
+        actions.add('to_end', _BATTLE_END)
+    return actions
+
+
+def encode_select_card(message: Union[SelectCard, SelectTribute]) -> Actions:
+    actions: Actions = Actions(GameMessage.SELECT_TRIBUTE if isinstance(message, SelectTribute) else GameMessage.SELECT_CARD)
+    actions.add('card', np.arange(len(message.choices), dtype=np.int64))
+    actions.min, actions.max = message.min, message.max
+    return actions
+
+
+def encode_chain(message: SelectChain) -> Actions:
+    actions: Actions = Actions(GameMessage.SELECT_CHAIN)
+    actions.add('chain', np.arange(len(message.choices), dtype=np.int64))
+    if not message.forced or not message.choices:
+        actions.add('no_chain', -1)
+    return actions
+
+
+def encode_place(message: SelectPlace, msg_id: GameMessage=GameMessage.SELECT_PLACE) -> Actions:
+    """ The zones of the selecting player come first; as GameManager does, a response
+    names them as player 0 and the zones of the opponent as player 1. """
+    actions: Actions = Actions(msg_id)
+    bits: 'np.ndarray' = np.arange(32, dtype=np.int64)
+    selectable: 'np.ndarray' = ((~message.selectable & _PLACE_ZONES) >> bits & 1).astype(np.bool_)
+    player: 'np.ndarray' = (bits >= 16).astype(np.int64)
+    location: 'np.ndarray' = np.where(bits & 8, _SPELL_ZONE, _MONSTER_ZONE)
+    place: slice = ACTIONS['place']
+    actions.mask[place] = selectable
+    actions.responses[place] = player | location << 8 | (bits & 7) << 16
+    return actions
+
+
+# each encoder takes the message class GAME_MESSAGES decodes its id to
+ENCODERS: dict[GameMessage, Callable[[Any], Actions]] = {
+    GameMessage.SELECT_IDLE_CMD: encode_idle_cmd,
+    GameMessage.SELECT_BATTLE_CMD: encode_battle_cmd,
+    GameMessage.SELECT_CARD: encode_select_card,
+    GameMessage.SELECT_TRIBUTE: encode_select_card,
+    GameMessage.SELECT_CHAIN: encode_chain,
+    GameMessage.SELECT_PLACE: encode_place,
+    GameMessage.SELECT_DISFIELD: lambda message: encode_place(message, GameMessage.SELECT_DISFIELD),
+}
+
+
+def encode_prompt(msg_id: GameMessage, message: Message) -> Optional[Actions]:
+    """ Actions of the prompt msg_id, or None if it is not part of the action space. """
+    encoder: Optional[Callable[[Any], Actions]] = ENCODERS.get(msg_id)
+    return None if encoder is None else encoder(message)
+
+
+Choice = Union[int, Sequence[int]] # an index, or the indices of a card selection
+Policy = Callable[[Actions], Union[Choice, Awaitable[Choice]]]
+
+# prompts answered by the policy and the value GameManager expects back from the RESPONSE values chosen, by executor method
+_ANSWERS: dict[str, tuple[tuple[GameMessage, ...], Callable[[list[int]], Any]]] = {
+    'select_mainphase_action': ((GameMessage.SELECT_IDLE_CMD,), lambda responses: responses[0]),
+    'select_battle_action': ((GameMessage.SELECT_BATTLE_CMD,), lambda responses: responses[0]),
+    'select_card': ((GameMessage.SELECT_CARD,), list),
+    'select_tribute': ((GameMessage.SELECT_TRIBUTE,), list),
+    'select_chain': ((GameMessage.SELECT_CHAIN,), lambda responses: responses[0]),
+    'select_place': ((GameMessage.SELECT_PLACE, GameMessage.SELECT_DISFIELD), lambda responses: responses[0] >> 16), # the sequence
+}
+
+
+
+class PolicyExecutor(DelegatingExecutor):
+    """ AsyncDuelExecutor answering the prompts of the action space with the index chosen
+    by policy, and every other decision with executor.\n
+    For a card selection the policy returns Actions.min to Actions.max indices (a
+    single index when one card is enough); an answer Actions.check refuses raises
+    ValueError instead of reaching the server.\n
+    GameManager handles these prompts as usual and only asks this executor for the
+    choice, so the card ids they reveal still reach the Duel. attach() subscribes
+    to the prompts to encode their Actions before GameManager asks. GameManager
+    places in the first of the monster and spell zones of each player holding a
+    free zone, so the place actions of the other zones are masked out. """
+    policy: Policy
+    executor: AsyncDuelExecutor
+    actions: Optional[Actions] = None # the actions of the pending prompt
+
+    def __init__(self, policy: Policy, executor: Union[DuelExecutor, AsyncDuelExecutor]) -> None:
+        self.policy = policy
+        self.executor = as_async(executor)
+
+
+    def attach(self, client: 'GameClient') -> Subscription:
+        """ Subscribe to the prompts of client in the action space. """
+        return client.subscribe(self.on_prompt, types=ENCODERS.keys())
+
+
+    def on_prompt(self, event: Event) -> None:
+        self.actions = encode_prompt(event.msg_id, event.message) # type: ignore
+
+
+    async def _decide(self, method: str, *args: Any) -> Any:
+        actions: Optional[Actions] = self.actions
+        answer: Optional[tuple[tuple[GameMessage, ...], Callable[[list[int]], Any]]] = _ANSWERS.get(method)
+        if answer is None or actions is None or actions.msg_id not in answer[0]:
+            return await getattr(self.executor, method)(*args)
+        self.actions = None
+        if method == 'select_place':
+            _keep_first_place_group(actions)
+        chosen: Union[Choice, Awaitable[Choice]] = self.policy(actions)
+        choice: Choice = await chosen if isawaitable(chosen) else chosen
+        indices: list[int] = [int(index) for index in np.atleast_1d(choice)]
+        actions.check(indices)
+        return answer[1]([int(actions.responses[index]) for index in indices])
+
+
+    async def on_timelimit(self, left_time: int) -> None:
+        await self.executor.on_timelimit(left_time)
+
+
+    async def on_start(self) -> None:
+        await self.executor.on_start()
+
+
+    async def on_new_turn(self) -> None:
+        await self.executor.on_new_turn()
+
+
+    async def on_new_phase(self) -> None:
+        await self.executor.on_new_phase()
+
+
+    async def on_win(self, win: bool) -> None:
+        await self.executor.on_win(win)
+
+
+    async def change_side(self, deck: Deck) -> None:
+        await self.executor.change_side(deck)
+
+
+
+def _keep_first_place_group(actions: Actions) -> None:
+    """ Mask out the place actions outside the first group of 8 zones holding a legal one. """
+    mask: 'np.ndarray' = actions.mask[ACTIONS['place']]
+    legal: 'np.ndarray' = np.flatnonzero(mask)
+    if len(legal):
+        group: int = int(legal[0]) // 8 * 8
+        mask[:group] = False
+        mask[group+8:] = False
@@ -0,0 +1,182 @@
+import asyncio
+import collections
+import concurrent.futures
+import itertools
+import time
+from inspect import isawaitable
+from typing import Any, Awaitable, Callable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union, cast
+
+from ygo_client.executor import DelegatingExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None # type: ignore
+
+
+BatchFunction = Callable[[Any], Union[Sequence[Any], Awaitable[Sequence[Any]]]]
+StackFunction = Callable[[List[Any]], Any]
+
+
+class BatchStats:
+    """ Sizes of the batches run by a BatchBroker and how long requests waited for them. """
+    batches: int = 0
+    requests: int = 0
+    max_batch_size: int = 0
+    total_delay: float = 0.0 # seconds between submitting a request and running its batch
+    max_delay: float = 0.0
+    sizes: collections.Counter[int] # number of batches of each size
+
+    def __init__(self) -> None:
+        self.sizes = collections.Counter()
+
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.requests / self.batches if self.batches else 0.0
+
+
+    @property
+    def mean_delay(self) -> float:
+        return self.total_delay / self.requests if self.requests else 0.0
+
+
+    def record(self, size: int, delays: List[float]) -> None:
+        self.batches += 1
+        self.requests += size
+        self.max_batch_size = max(self.max_batch_size, size)
+        self.sizes[size] += 1
+        self.total_delay += sum(delays)
+        self.max_delay = max(self.max_delay, max(delays))
+
+
+
+class BatchBroker:
+    """ Collects requests submitted from any number of coroutines and evaluates them together.\n
+    A batch is run when max_batch_size requests are waiting or max_delay seconds after
+    its first request. batch_fn receives the list of requests, or stack(requests) if stack
+    is given, e.g. stack_arrays to pass one array per field, and returns one result per
+    request, in order. It may be a coroutine function, or a plain function which runs in
+    pool if one is given; stack runs on the event loop first, so a ProcessPoolExecutor
+    pickles the stacked input of each batch. """
+    batch_fn: BatchFunction
+    stack: Optional[StackFunction]
+    max_batch_size: int
+    max_delay: float
+    pool: Optional[concurrent.futures.Executor]
+    stats: BatchStats
+    _pending: List[Tuple[Any, 'asyncio.Future[Any]', float]]
+    _timer: Optional[asyncio.TimerHandle] = None
+    _tasks: set['asyncio.Task[None]'] # batches running, kept until they are done
+
+    def __init__(
+        self,
+        batch_fn: BatchFunction,
+        max_batch_size: int=32,
+        max_delay: float=0.002,
+        pool: Optional[concurrent.futures.Executor]=None,
+        stack: Optional[StackFunction]=None
+    ) -> None:
+        self.batch_fn = batch_fn
+        self.stack = stack
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.pool = pool
+        self.stats = BatchStats()
+        self._pending = []
+        self._tasks = set()
+
+
+    async def submit(self, request: Any) -> Any:
+        """ Wait for the result of request, computed in the next batch. """
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        future: asyncio.Future[Any] = loop.create_future()
+        self._pending.append((request, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self.flush)
+        return await future
+
+
+    def flush(self) -> None:
+        """ Run the waiting requests now, whatever their number. """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task: asyncio.Task[None] = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+    async def _run(self, batch: List[Tuple[Any, 'asyncio.Future[Any]', float]]) -> None:
+        now: float = time.perf_counter()
+        self.stats.record(len(batch), [now - submitted for _, _, submitted in batch])
+        requests: List[Any] = [request for request, _, _ in batch]
+        results: Sequence[Any]
+        try:
+            inputs: Any = requests if self.stack is None else self.stack(requests)
+            if self.pool is not None:
+                sync_fn: Callable[[Any], Sequence[Any]] = cast(Callable[[Any], Sequence[Any]], self.batch_fn) # a coroutine function cannot run in a pool
+                results = await asyncio.get_running_loop().run_in_executor(self.pool, sync_fn, inputs)
+            else:
+                returned: Union[Sequence[Any], Awaitable[Sequence[Any]]] = self.batch_fn(inputs)
+                results = await returned if isawaitable(returned) else returned
+            if len(results) != len(batch):
+                raise ValueError(f'batch_fn returned {len(results)} results for {len(batch)} requests.')
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+
+def stack_arrays(requests: List[Any]) -> Any:
+    """ Stack requests along a new first axis: arrays into one array, and tuples of
+    them (an Observation, or (observation, actions.mask)) field by field into a tuple of
+    the same type, so batch_fn gets e.g. an Observation of (batch, ...) arrays. """
+    if np is None:
+        raise ImportError('stack_arrays requires numpy: pip install ygo-client-python[numpy]')
+    first: Any = requests[0]
+    if not isinstance(first, tuple):
+        return np.stack(requests)
+    fields: List[Any] = [stack_arrays(list(values)) for values in zip(*requests)]
+    return type(first)(*fields) if hasattr(first, '_fields') else tuple(fields)
+
+
+
+class Decision(NamedTuple):
+    """ One prompt of a BrokeredExecutor, as passed to the batch function.
+    It holds no reference to the executor so it can be pickled along with its args. """
+    method: str # name of the DuelExecutor method, e.g. 'select_card'
+    args: Tuple[Any, ...]
+    source: int # key of the BrokeredExecutor asking, e.g. to find its duel
+
+
+
+_keys: Iterator[int] = itertools.count()
+
+
+
+class BrokeredExecutor(DelegatingExecutor):
+    """ AsyncDuelExecutor submitting every decision as a Decision to a shared BatchBroker,
+    so the prompts of many duels are answered by one call of the batch function.
+    The notifications do nothing; override them to keep per-duel state. """
+    broker: BatchBroker
+    key: int # sent as Decision.source, unique in the process unless given
+
+    def __init__(self, broker: BatchBroker, key: Optional[int]=None) -> None:
+        self.broker = broker
+        self.key = next(_keys) if key is None else key
+
+
+    async def _decide(self, method: str, *args: Any) -> Any:
+        return await self.broker.submit(Decision(method, args, self.key))
@@ -0,0 +1,275 @@
+import asyncio
+import logging
+from inspect import isawaitable, iscoroutine
+from typing import Any, Awaitable, Callable, Iterable, NamedTuple, Optional, Union
+
+from ygo_client.connection.packet import Packet
+from ygo_client.connection.enums.stoc_message import StocMessage
+from ygo_client.connection.enums.game_message import GameMessage
+from ygo_client.connection.codec import Message
+from ygo_client.connection.messages import Payload, STOC_MESSAGES, GAME_MESSAGES
+
+
+logger = logging.getLogger(__name__)
+
+MessageID = Union[StocMessage, GameMessage]
+Handler = Callable[[Any], Union[Optional[Packet], Awaitable[Optional[Packet]]]]
+DEFAULT_QUEUE_SIZE: int = 256
+PROMPT_PREFIXES: tuple[str, ...] = ('SELECT_', 'ANNOUNCE_', 'SORT_') # messages waiting for a decision
+
+
+class Event(NamedTuple):
+    """ One received message, shared by every subscriber; it must not be modified.\n
+    message is the object the handler gets too, and it is not copied for each
+    subscriber: its lists are shared, and its Rest fields are memoryviews of the
+    received packet. Copy a field before changing it. """
+    msg_id: MessageID
+    message: Message
+
+
+
+class Subscription:
+    """ A subscriber of the EventBus and the state of its queue.\n
+    Callbacks are called as events are published. If a callback returns an awaitable, as
+    a coroutine function or a partial or lambda wrapping one does, the awaitable is run
+    by a task of its own reading a bounded queue; when it is full the oldest is dropped
+    (and counted) so a slow subscriber never blocks the reader. """
+    callback: Callable[[Event], Union[None, Awaitable[None]]]
+    types: Optional[frozenset[MessageID]] # None for every message with a layout
+    maxsize: int
+    dropped: int = 0
+    _queue: Optional[asyncio.Queue[tuple[Event, Awaitable[None]]]] = None
+    _task: Optional[asyncio.Task[None]] = None
+
+    def __init__(
+        self,
+        callback: Callable[[Event], Union[None, Awaitable[None]]],
+        types: Optional[Iterable[MessageID]]=None,
+        maxsize: int=DEFAULT_QUEUE_SIZE
+    ) -> None:
+        self.callback = callback
+        self.types = None if types is None else frozenset(types)
+        self.maxsize = maxsize
+
+
+    @property
+    def pending(self) -> int:
+        return 0 if self._queue is None else self._queue.qsize()
+
+
+    def deliver(self, event: Event) -> None:
+        try:
+            result: Union[None, Awaitable[None]] = self.callback(event)
+        except Exception:
+            logger.exception('Subscriber %r failed on %s.', self.callback, event.msg_id.name)
+            return
+        if not isawaitable(result):
+            return
+
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.maxsize)
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._consume())
+        if self._queue.full():
+            self._discard()
+            self.dropped += 1
+        self._queue.put_nowait((event, result))
+
+
+    async def join(self) -> None:
+        """ Wait until every queued event has been consumed. """
+        if self._queue is not None and self._task is not None:
+            await self._queue.join()
+
+
+    def cancel(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        while self._queue is not None and not self._queue.empty():
+            self._discard()
+
+
+    def _discard(self) -> None:
+        """ Drop the oldest queued awaitable, closing it if it is a coroutine. """
+        assert self._queue is not None
+        _, awaitable = self._queue.get_nowait()
+        if iscoroutine(awaitable):
+            awaitable.close()
+        self._queue.task_done()
+
+
+    async def _consume(self) -> None:
+        assert self._queue is not None
+        while True:
+            event, awaitable = await self._queue.get()
+            try:
+                await awaitable
+            except Exception:
+                logger.exception('Subscriber %r failed on %s.', self.callback, event.msg_id.name)
+            finally:
+                self._queue.task_done()
+
+
+
+class Route:
+    """ Layout and consumers of one message id. """
+    __slots__ = ('msg_id', 'message', 'handler', 'subscriptions', 'prompt')
+    msg_id: MessageID
+    message: type[Message]
+    handler: Optional[Handler]
+    subscriptions: tuple[Subscription, ...]
+    prompt: bool
+
+    def __init__(self, msg_id: MessageID, message: type[Message], subscriptions: tuple[Subscription, ...]) -> None:
+        self.msg_id = msg_id
+        self.message = message
+        self.handler = None
+        self.subscriptions = subscriptions
+        self.prompt = msg_id.name.startswith(PROMPT_PREFIXES)
+
+
+
+class EventBus:
+    """ Decodes each received message once and passes it to its reply handler and subscribers.\n
+    A payload is decoded only if its id has a handler or a subscriber; other
+    messages are skipped after reading their id. """
+    _stoc_routes: list[Optional[Route]] # indexed by StocMessage id
+    _game_routes: list[Optional[Route]] # indexed by GameMessage id
+    _wildcards: tuple[Subscription, ...] # subscriptions to every message
+
+    def __init__(self) -> None:
+        self._stoc_routes = [None] * 256
+        self._game_routes = [None] * 256
+        self._wildcards = ()
+
+
+    def register_handler(self, msg_id: MessageID, handler: Handler, message: Optional[type[Message]]=None) -> None:
+        """ Dispatch msg_id to handler, replacing the current one.\n
+        msg_id must be a StocMessage or GameMessage member. handler receives the payload
+        decoded by message (by default its layout in messages.py, or Payload if it has none)
+        and may return a reply packet, directly or as a coroutine for the caller to await. """
+        route: Route = self._route(msg_id)
+        if message is not None:
+            route.message = message
+        route.handler = handler
+
+
+    def subscribe(
+        self,
+        callback: Callable[[Event], Union[None, Awaitable[None]]],
+        types: Optional[Iterable[MessageID]]=None,
+        maxsize: int=DEFAULT_QUEUE_SIZE
+    ) -> Subscription:
+        """ Pass callback an Event for each received message of types
+        (every message with a layout if None), before its handler runs. """
+        subscription: Subscription = Subscription(callback, types, maxsize)
+        if subscription.types is None:
+            self._wildcards += (subscription,)
+            msg_ids: Iterable[MessageID] = [*STOC_MESSAGES, *GAME_MESSAGES] # type: ignore
+        else:
+            msg_ids = subscription.types
+        for msg_id in msg_ids:
+            route: Route = self._route(msg_id)
+            if subscription not in route.subscriptions:
+                route.subscriptions += (subscription,)
+        return subscription
+
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscription.cancel()
+        self._wildcards = tuple(s for s in self._wildcards if s is not subscription)
+        for table in (self._stoc_routes, self._game_routes):
+            for i, route in enumerate(table):
+                if route is None:
+                    continue
+                route.subscriptions = tuple(s for s in route.subscriptions if s is not subscription)
+                if route.handler is None and not route.subscriptions:
+                    table[i] = None # nobody is interested: stop decoding it
+
+
+    def publish(self, packet: Packet) -> Union[Optional[Packet], Awaitable[Optional[Packet]]]:
+        """ Decode packet for its handler and subscribers, and return the handler's reply. """
+        route: Optional[Route] = self.route(packet)
+        if route is None:
+            return None
+        return self.dispatch(route, packet)
+
+
+    def route(self, packet: Packet) -> Optional[Route]:
+        """ Read the message id of packet and return its route, or None if nobody wants it. """
+        if packet.msg_id == StocMessage.GAME_MSG:
+            return self._game_routes[packet.read_int(1)]
+        return self._stoc_routes[packet.msg_id]
+
+
+    def dispatch(self, route: Route, packet: Packet) -> Union[Optional[Packet], Awaitable[Optional[Packet]]]:
+        """ Second half of publish, for a packet whose id has been read by route. """
+        message: Message = route.message.decode(packet)
+        if route.subscriptions:
+            event: Event = Event(route.msg_id, message)
+            for subscription in route.subscriptions:
+                subscription.deliver(event)
+        if route.handler is None:
+            return None
+        return route.handler(message)
+
+
+    async def join(self) -> None:
+        """ Wait until the asynchronous subscribers have consumed their queues. """
+        for subscription in self._subscriptions():
+            await subscription.join()
+
+
+    def close(self) -> None:
+        for subscription in self._subscriptions():
+            subscription.cancel()
+
+
+    def _subscriptions(self) -> set[Subscription]:
+        return {
+            subscription
+            for table in (self._stoc_routes, self._game_routes)
+            for route in table if route is not None
+            for subscription in route.subscriptions
+        }
+
+
+    def _route(self, msg_id: MessageID) -> Route:
+        table: list[Optional[Route]]
+        layouts: dict[int, type[Message]]
+        if isinstance(msg_id, GameMessage):
+            table, layouts = self._game_routes, GAME_MESSAGES
+        elif msg_id == StocMessage.GAME_MSG:
+            raise ValueError('GAME_MSG is dispatched by its GameMessage id.')
+        else:
+            table, layouts = self._stoc_routes, STOC_MESSAGES
+            msg_id = StocMessage(msg_id)
+        route: Optional[Route] = table[msg_id]
+        if route is None:
+            route = table[msg_id] = Route(msg_id, layouts.get(msg_id, Payload), self._wildcards)
+        return route
+
+
+
+def benchmark(count: int=100000, rounds: int=3) -> dict[str, float]:
+    """ Time EventBus.publish for HINT and TAG_SWAP, the first and the last id of the if/elif
+    chain GameClient used to walk, and print the best ns per message of rounds. Both ids
+    decode the same Payload for a handler doing nothing, so only the dispatch differs.
+    Run ``python -c 'from ygo_client.bus import benchmark; benchmark()'``. """
+    import time
+    bus: EventBus = EventBus()
+    for msg_id in GameMessage:
+        bus.register_handler(msg_id, lambda message: None, Payload)
+    results: dict[str, float] = {}
+    for _ in range(rounds):
+        for msg_id in (GameMessage.HINT, GameMessage.TAG_SWAP):
+            data: bytes = bytes((StocMessage.GAME_MSG, msg_id)) + bytes(10)
+            start: float = time.perf_counter()
+            for _ in range(count):
+                bus.publish(Packet.from_bytes(data))
+            elapsed: float = (time.perf_counter() - start) / count * 1e9
+            results[msg_id.name] = min(results.get(msg_id.name, elapsed), elapsed)
+    for name, ns in results.items():
+        print(f'{name}: {ns:.0f}ns per message')
+    return results
@@ -1,32 +1,80 @@
+import asyncio
 import logging
-from typing import Optional
+import time
+from inspect import isawaitable
+from typing import Awaitable, Callable, Iterable, Optional, Union
 
 from ygo_core import Duel, Deck
-from ygo_client.executor import DuelExecutor
+from ygo_client.executor import DuelExecutor, AsyncDuelExecutor
 from ygo_client.manager import GameManager
-from ygo_client.connection.connect import YGOConnection
+from ygo_client.tracking import DuelListener
+from ygo_client.bus import EventBus, Event, Subscription, MessageID, Handler, DEFAULT_QUEUE_SIZE, Route
+from ygo_client.connection.connect import YGOConnection, BufferedYGOConnection
 from ygo_client.connection.packet import Packet
 from ygo_client.connection.enums.stoc_message import StocMessage
 from ygo_client.connection.enums.ctos_message import CtosMessage
 from ygo_client.connection.enums.game_message import GameMessage
+from ygo_client.connection.codec import Message
+from ygo_client.connection.messages import Empty, ErrorMsg
+from ygo_client.recorder import PacketRecorder
 
 
 
 logger = logging.getLogger(__name__)
 
+class PipelineStats:
+    """ Backpressure counters of the receive pipeline of GameClient.connect. """
+    inbound_peak: int = 0 # most packets waiting for the state task
+    prompt_peak: int = 0 # most prompts waiting for the decision task
+    reader_waits: int = 0 # times the reader found the inbound queue full
+    reader_wait_time: float = 0.0 # seconds the reader spent waiting for room
+    decision_time: float = 0.0 # seconds spent handling prompts
+
+
+
 class GameClient:
+    """ Connects to a host and passes each received message to its handler and subscribers.\n
+    Messages are published on an EventBus, so a payload is decoded only if its id has a
+    handler or a subscriber. With track_state=False the GameManager handlers are not
+    registered, which leaves only the messages subscribed to.\n
+    connect() runs three tasks joined by bounded queues: a reader, a state task
+    publishing every message in the order received, and a decision task awaiting the
+    replies to the SELECT_*, ANNOUNCE_* and SORT_* prompts, so the socket is read
+    while a decision is made. While the executor has lingering work (see
+    AsyncDuelExecutor.lingering), the state task waits for it before publishing.\n
+    The connection is a BufferedYGOConnection unless given, e.g. a YGOConnection to read
+    through asyncio streams instead.\n
+    A recorder, if given, logs every frame the connection sends and receives; closing it is left to the caller. """
     _connection: YGOConnection
     _gamemanager: GameManager
+    _bus: EventBus
+    _queue_size: int
+    _closed: bool = False
     _name: str
     _version: int
+    stats: PipelineStats
 
     def __init__(
         self,  
-        executor: DuelExecutor,
-        deck: Deck
+        executor: Union[DuelExecutor, AsyncDuelExecutor],
+        deck: Deck,
+        connection: Optional[YGOConnection]=None,
+        track_state: bool=True,
+        queue_size: int=DEFAULT_QUEUE_SIZE,
+        recorder: Optional[PacketRecorder]=None
     ) -> None:
-        self._connection = YGOConnection()
+        self._connection = connection or BufferedYGOConnection()
+        if recorder is not None:
+            self._connection.recorder = recorder
         self._gamemanager = GameManager(deck, executor)
+        self._bus = EventBus()
+        self._queue_size = queue_size
+        self.stats = PipelineStats()
+        if track_state:
+            self._register_default_handlers()
+        else:
+            self.register_handler(StocMessage.ERROR_MSG, self._close_on)
+            self.register_handler(StocMessage.DUEL_END, self._close_on)
 
     
     def get_deck(self) -> Deck:
@@ -37,6 +85,26 @@ class GameClient:
         return self._gamemanager.duel
 
 
+    def add_listener(self, listener: DuelListener) -> None:
+        """ Tell listener of the changes made to the tracked duel, see ygo_client.tracking. """
+        self._gamemanager.add_listener(listener)
+
+
+    def remove_listener(self, listener: DuelListener) -> None:
+        self._gamemanager.remove_listener(listener)
+
+
+    def get_state_hash(self) -> int:
+        """ Zobrist hash of the tracked duel state, see GameManager.state_hash. """
+        return self._gamemanager.state_hash
+
+
+    def get_replay(self) -> Optional[bytes]:
+        """ The last replay sent by the server, as a file: the .yrpX if it sent one, else the .yrp.
+        See ygo_client.yrp.Replay to read it. """
+        return self._gamemanager.new_replay or self._gamemanager.replay
+
+
     async def connect(
         self,
         host: str, 
@@ -48,16 +116,30 @@ class GameClient:
         self._version = version
         await self._connection.connect(host, port)
         if self._connection.is_connected():
-            self._on_connected()
+            await self._on_connected()
 
-        while self._connection.is_connected():
-            packet: Packet = await self._connection.receive()
-            await self._on_received(packet)
+        inbound: asyncio.Queue[Optional[Packet]] = asyncio.Queue(self._queue_size)
+        prompts: asyncio.Queue[Optional[Union[Packet, Awaitable[Optional[Packet]]]]] = asyncio.Queue(self._queue_size)
+        reader: asyncio.Task[None] = asyncio.create_task(self._read(inbound))
+        updater: asyncio.Task[None] = asyncio.create_task(self._update(inbound, prompts))
+        decider: asyncio.Task[None] = asyncio.create_task(self._decide(prompts))
+        try:
+            await asyncio.wait((updater, decider), return_when=asyncio.FIRST_EXCEPTION)
+            for task in (updater, decider):
+                if task.done():
+                    task.result()
+            await reader
+            await self._bus.join()
+        finally:
+            for task in (reader, updater, decider):
+                task.cancel()
+            self._bus.close()
 
         logger.debug('Connection has been closed.')
     
 
     def close(self) -> None:
+        self._closed = True
         self._connection.close()
 
 
@@ -86,162 +168,212 @@ class GameClient:
         await self._connection.send(packet)
 
 
-    async def _on_received(self, packet: Packet) -> None:
-        reply: Optional[Packet] = None
-        msg_id: int = packet.msg_id
-        if  msg_id == StocMessage.GAME_MSG:
-            id: int = packet.read_int(1)
-            if id == GameMessage.RETRY:
-                reply = self._gamemanager.on_retry(packet)
-            elif id == GameMessage.HINT:
-                reply = self._gamemanager.on_hint(packet)
-            elif id == GameMessage.START:
-                reply = self._gamemanager.on_start(packet)
-            elif id == GameMessage.WIN:
-                reply = self._gamemanager.on_win(packet)
-            elif id == GameMessage.NEW_TURN:
-                reply = self._gamemanager.on_new_turn(packet)
-            elif id == GameMessage.NEW_PHASE:
-                reply = self._gamemanager.on_new_phase(packet)
-            elif id == GameMessage.SELECT_IDLE_CMD:
-                reply = self._gamemanager.on_select_idle_cmd(packet)
-            elif id == GameMessage.SELECT_BATTLE_CMD:
-                reply = self._gamemanager.on_select_battle_cmd(packet)
-            elif id == GameMessage.SELECT_EFFECT_YN:
-                reply = self._gamemanager.on_select_effect_yn(packet)
-            elif id == GameMessage.SELECT_YESNO:
-                reply = self._gamemanager.on_select_yesno(packet)
-            elif id == GameMessage.SELECT_OPTION: 
-                reply = self._gamemanager.on_select_option(packet)
-            elif id == GameMessage.SELECT_CARD:
-                reply = self._gamemanager.on_select_card(packet)
-            elif id == GameMessage.SELECT_CHAIN:
-                reply = self._gamemanager.on_select_chain(packet)
-            elif id == GameMessage.SELECT_PLACE:
-                reply = self._gamemanager.on_select_place(packet)
-            elif id == GameMessage.SELECT_POSITION:
-                reply = self._gamemanager.on_select_position(packet)
-            elif id == GameMessage.SELECT_TRIBUTE:
-                reply = self._gamemanager.on_select_tribute(packet)
-            elif id == GameMessage.SELECT_COUNTER:
-                reply = self._gamemanager.on_select_counter(packet)
-            elif id == GameMessage.SELECT_SUM:
-                reply = self._gamemanager.on_select_sum(packet)
-            elif id == GameMessage.SELECT_DISFIELD:
-                reply = self._gamemanager.on_select_place(packet)
-            elif id == GameMessage.SELECT_UNSELECT:
-                reply = self._gamemanager.on_select_unselect(packet)
-            elif id == GameMessage.ANNOUNCE_RACE:
-                reply = self._gamemanager.on_announce_race(packet)
-            elif id == GameMessage.ANNOUNCE_ATTRIB:
-                reply = self._gamemanager.on_announce_attr(packet)
-            elif id == GameMessage.ANNOUNCE_CARD:
-                reply = self._gamemanager.on_announce_card(packet)
-            elif id == GameMessage.ANNOUNCE_NUNBER:
-                reply = self._gamemanager.on_announce_number(packet)
-            elif id == GameMessage.UPDATE_DATA:
-                reply = self._gamemanager.on_update_data(packet)
-            elif id == GameMessage.UPDATE_CARD:
-                reply = self._gamemanager.on_update_card(packet)
-            elif id == GameMessage.SHUFFLE_DECK:
-                reply = self._gamemanager.on_shuffle_deck(packet)
-            elif id == GameMessage.SHUFFLE_HAND:
-                reply = self._gamemanager.on_shuffle_hand(packet)
-            elif id == GameMessage.SHUFFLE_EXTRA:
-                reply = self._gamemanager.on_shuffle_extra(packet)
-            elif id == GameMessage.SHUFFLE_SETCARD:
-                reply = self._gamemanager. on_shuffle_setcard(packet)
-            elif id == GameMessage.SORT_CARD:
-                reply = self._gamemanager.on_sort_card(packet)
-            elif id == GameMessage.SORT_CHAIN:
-                reply = self._gamemanager.on_sort_chain(packet)
-            elif id == GameMessage.MOVE:
-                reply = self._gamemanager.on_move(packet)
-            elif id == GameMessage.POSCHANGE:
-                reply = self._gamemanager.on_poschange(packet)
-            elif id == GameMessage.SET:
-                reply = self._gamemanager.on_set(packet)
-            elif id == GameMessage.SWAP:
-                reply = self._gamemanager.on_swap(packet)
-            elif id == GameMessage.SUMMONING:
-                reply = self._gamemanager.on_summoning(packet)
-            elif id == GameMessage.SUMMONED:
-                reply = self._gamemanager.on_summoned(packet)
-            elif id == GameMessage.SPSUMMONING:
-                reply = self._gamemanager.on_spsummoning(packet)
-            elif id == GameMessage.SPSUMMONED:
-                reply = self._gamemanager.on_spsummoned(packet)
-            elif id == GameMessage.FLIPSUMMONING:
-                reply = self._gamemanager.on_summoning(packet)
-            elif id == GameMessage.FLIPSUMMONED:
-                reply = self._gamemanager.on_summoned(packet)
-            elif id == GameMessage.CHAINING:
-                reply = self._gamemanager.on_chaining(packet)
-            elif id == GameMessage.CHAIN_END:
-                reply = self._gamemanager.on_chain_end(packet)
-            elif id == GameMessage.BECOME_TARGET:
-                reply = self._gamemanager.on_become_target(packet)
-            elif id == GameMessage.DRAW:
-                reply = self._gamemanager.on_draw(packet)
-            elif id == GameMessage.DAMAGE:
-                reply = self._gamemanager.on_damage(packet)
-            elif id == GameMessage.RECOVER:
-                reply = self._gamemanager.on_recover(packet)
-            elif id == GameMessage.EQUIP:
-                reply = self._gamemanager.on_equip(packet)
-            elif id == GameMessage.UNEQUIP:
-                reply = self._gamemanager.on_unequip(packet)
-            elif id == GameMessage.LP_UPDATE:
-                reply = self._gamemanager.on_lp_update(packet)
-            elif id == GameMessage.CARD_TARGET:
-                reply = self._gamemanager.on_card_target(packet)
-            elif id == GameMessage.CANCEL_TARGET:
-                reply = self._gamemanager.on_cancel_target(packet)
-            elif id == GameMessage.PAY_LPCOST:
-                reply = self._gamemanager.on_damage(packet)
-            elif id == GameMessage.ATTACK:
-                reply = self._gamemanager.on_attack(packet)
-            elif id == GameMessage.BATTLE:
-                reply = self._gamemanager.on_battle(packet)
-            elif id == GameMessage.ATTACK_DISABLED:
-                reply = self._gamemanager.on_attack_disabled(packet)
-            elif id == GameMessage.ROCK_PAPER_SCISSORS:
-                reply = self._gamemanager.on_rock_paper_scissors(packet)
-            elif id == GameMessage.TAG_SWAP:
-                reply = self._gamemanager.on_tag_swap(packet)
-
-        elif msg_id == StocMessage.ERROR_MSG:
-            reply = self._gamemanager.on_error_msg(packet)
-            self.close()
-        elif msg_id == StocMessage.SELECT_HAND:
-            reply = self._gamemanager.on_select_hand(packet)
-        elif msg_id == StocMessage.SELECT_TP:
-            reply = self._gamemanager.on_select_tp(packet)
-        elif msg_id == StocMessage.CHANGE_SIDE:
-            reply = self._gamemanager.on_change_side(packet)
-        elif msg_id == StocMessage.JOIN_GAME:
-            reply = self._gamemanager.on_joined_game(packet)
-        elif msg_id == StocMessage.TYPE_CHANGE:
-            reply = self._gamemanager.on_type_changed(packet)
-        elif msg_id == StocMessage.DUEL_START:
-            reply = self._gamemanager.on_duel_start(packet)
-        elif msg_id == StocMessage.DUEL_END:
-            reply = self._gamemanager.on_duel_end(packet)
-            self.close()
-        elif msg_id == StocMessage.REPLAY:
-            reply = self._gamemanager.on_replay(packet)
-        elif msg_id == StocMessage.TIMELIMIT:
-            reply = self._gamemanager.on_timelimit(packet)
-        elif msg_id == StocMessage.CHAT:
-            reply = self._gamemanager.on_chat(packet)
-        elif msg_id == StocMessage.PLAYER_ENTER:
-            reply = self._gamemanager.on_player_enter(packet)
-        elif msg_id == StocMessage.PLAYER_CHANGE:
-            reply = self._gamemanager.on_player_change(packet)
-        elif msg_id == StocMessage.WATCH_CHANGE:
-            reply = self._gamemanager.on_watch_change(packet)
-        elif msg_id == StocMessage.REMATCH:
-            reply = self._gamemanager.on_rematch(packet)
+    def register_handler(self, msg_id: MessageID, handler: Handler, message: Optional[type[Message]]=None) -> None:
+        """ See EventBus.register_handler. """
+        self._bus.register_handler(msg_id, handler, message)
+
+
+    def subscribe(
+        self,
+        callback: Callable[[Event], Union[None, Awaitable[None]]],
+        types: Optional[Iterable[MessageID]]=None,
+        maxsize: int=DEFAULT_QUEUE_SIZE
+    ) -> Subscription:
+        """ See EventBus.subscribe. """
+        return self._bus.subscribe(callback, types, maxsize)
+
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._bus.unsubscribe(subscription)
+
+
+    def publish(self, packet: Packet) -> Union[Optional[Packet], Awaitable[Optional[Packet]]]:
+        """ See EventBus.publish; for packets not read by connect(), e.g. from a recording. """
+        return self._bus.publish(packet)
+
 
+    def _register_default_handlers(self) -> None:
+        manager: GameManager = self._gamemanager
+        handlers: list[tuple[MessageID, Handler]] = [
+            (StocMessage.ERROR_MSG, self._on_error_msg),
+            (StocMessage.SELECT_HAND, manager.on_select_hand),
+            (StocMessage.SELECT_TP, manager.on_select_tp),
+            (StocMessage.CHANGE_SIDE, manager.on_change_side),
+            (StocMessage.JOIN_GAME, manager.on_joined_game),
+            (StocMessage.TYPE_CHANGE, manager.on_type_changed),
+            (StocMessage.DUEL_START, manager.on_duel_start),
+            (StocMessage.DUEL_END, self._on_duel_end),
+            (StocMessage.REPLAY, manager.on_replay),
+            (StocMessage.NEW_REPLAY, manager.on_new_replay),
+            (StocMessage.TIMELIMIT, manager.on_timelimit),
+            (StocMessage.CHAT, manager.on_chat),
+            (StocMessage.PLAYER_ENTER, manager.on_player_enter),
+            (StocMessage.PLAYER_CHANGE, manager.on_player_change),
+            (StocMessage.WATCH_CHANGE, manager.on_watch_change),
+            (StocMessage.REMATCH, manager.on_rematch),
+
+            (GameMessage.RETRY, manager.on_retry),
+            (GameMessage.HINT, manager.on_hint),
+            (GameMessage.START, manager.on_start),
+            (GameMessage.WIN, manager.on_win),
+            (GameMessage.NEW_TURN, manager.on_new_turn),
+            (GameMessage.NEW_PHASE, manager.on_new_phase),
+            (GameMessage.SELECT_IDLE_CMD, manager.on_select_idle_cmd),
+            (GameMessage.SELECT_BATTLE_CMD, manager.on_select_battle_cmd),
+            (GameMessage.SELECT_EFFECT_YN, manager.on_select_effect_yn),
+            (GameMessage.SELECT_YESNO, manager.on_select_yesno),
+            (GameMessage.SELECT_OPTION, manager.on_select_option),
+            (GameMessage.SELECT_CARD, manager.on_select_card),
+            (GameMessage.SELECT_CHAIN, manager.on_select_chain),
+            (GameMessage.SELECT_PLACE, manager.on_select_place),
+            (GameMessage.SELECT_POSITION, manager.on_select_position),
+            (GameMessage.SELECT_TRIBUTE, manager.on_select_tribute),
+            (GameMessage.SELECT_COUNTER, manager.on_select_counter),
+            (GameMessage.SELECT_SUM, manager.on_select_sum),
+            (GameMessage.SELECT_DISFIELD, manager.on_select_place),
+            (GameMessage.SELECT_UNSELECT, manager.on_select_unselect),
+            (GameMessage.ANNOUNCE_RACE, manager.on_announce_race),
+            (GameMessage.ANNOUNCE_ATTRIB, manager.on_announce_attr),
+            (GameMessage.ANNOUNCE_CARD, manager.on_announce_card),
+            (GameMessage.ANNOUNCE_NUNBER, manager.on_announce_number),
+            (GameMessage.UPDATE_DATA, manager.on_update_data),
+            (GameMessage.UPDATE_CARD, manager.on_update_card),
+            (GameMessage.SHUFFLE_DECK, manager.on_shuffle_deck),
+            (GameMessage.SHUFFLE_HAND, manager.on_shuffle_hand),
+            (GameMessage.SHUFFLE_EXTRA, manager.on_shuffle_extra),
+            (GameMessage.SHUFFLE_SETCARD, manager.on_shuffle_setcard),
+            (GameMessage.SORT_CARD, manager.on_sort_card),
+            (GameMessage.SORT_CHAIN, manager.on_sort_chain),
+            (GameMessage.MOVE, manager.on_move),
+            (GameMessage.POSCHANGE, manager.on_poschange),
+            (GameMessage.SET, manager.on_set),
+            (GameMessage.SWAP, manager.on_swap),
+            (GameMessage.SUMMONING, manager.on_summoning),
+            (GameMessage.SUMMONED, manager.on_summoned),
+            (GameMessage.SPSUMMONING, manager.on_spsummoning),
+            (GameMessage.SPSUMMONED, manager.on_spsummoned),
+            (GameMessage.FLIPSUMMONING, manager.on_summoning),
+            (GameMessage.FLIPSUMMONED, manager.on_summoned),
+            (GameMessage.CHAINING, manager.on_chaining),
+            (GameMessage.CHAIN_SOLVING, manager.on_chain_solving),
+            (GameMessage.CHAIN_SOLVED, manager.on_chain_solved),
+            (GameMessage.CHAIN_END, manager.on_chain_end),
+            (GameMessage.CONFIRM_CARDS, manager.on_confirm_cards),
+            (GameMessage.BECOME_TARGET, manager.on_become_target),
+            (GameMessage.DRAW, manager.on_draw),
+            (GameMessage.DAMAGE, manager.on_damage),
+            (GameMessage.RECOVER, manager.on_recover),
+            (GameMessage.EQUIP, manager.on_equip),
+            (GameMessage.UNEQUIP, manager.on_unequip),
+            (GameMessage.LP_UPDATE, manager.on_lp_update),
+            (GameMessage.ADD_COUNTER, manager.on_add_counter),
+            (GameMessage.REMOVE_COUNTER, manager.on_remove_counter),
+            (GameMessage.CARD_TARGET, manager.on_card_target),
+            (GameMessage.CANCEL_TARGET, manager.on_cancel_target),
+            (GameMessage.PAY_LPCOST, manager.on_damage),
+            (GameMessage.ATTACK, manager.on_attack),
+            (GameMessage.BATTLE, manager.on_battle),
+            (GameMessage.ATTACK_DISABLED, manager.on_attack_disabled),
+            (GameMessage.ROCK_PAPER_SCISSORS, manager.on_rock_paper_scissors),
+            (GameMessage.TAG_SWAP, manager.on_tag_swap),
+        ]
+        for msg_id, handler in handlers:
+            self.register_handler(msg_id, handler)
+
+
+    def _on_error_msg(self, message: ErrorMsg) -> Optional[Packet]:
+        reply: Optional[Packet] = self._gamemanager.on_error_msg(message)
+        self.close()
+        return reply
+
+
+    def _on_duel_end(self, message: Empty) -> Optional[Packet]:
+        reply: Optional[Packet] = self._gamemanager.on_duel_end(message)
+        self.close()
+        return reply
+
+
+    def _close_on(self, message: Message) -> None:
+        self.close()
+
+
+    async def _read(self, inbound: asyncio.Queue[Optional[Packet]]) -> None:
+        stats: PipelineStats = self.stats
+        try:
+            while not self._closed:
+                try:
+                    packet: Packet = await self._connection.receive()
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    if self._closed:
+                        break # closed by a handler while waiting for data
+                    raise
+
+                if inbound.full():
+                    stats.reader_waits += 1
+                    start: float = time.perf_counter()
+                    await inbound.put(packet)
+                    stats.reader_wait_time += time.perf_counter() - start
+                else:
+                    inbound.put_nowait(packet)
+                if inbound.qsize() > stats.inbound_peak:
+                    stats.inbound_peak = inbound.qsize()
+        finally:
+            if inbound.full():
+                # the state task may be gone (cancelled or failed), leaving nobody to make room
+                while not inbound.empty():
+                    inbound.get_nowait()
+            inbound.put_nowait(None)
+
+
+    async def _update(self, inbound: asyncio.Queue[Optional[Packet]], prompts: asyncio.Queue[Optional[Union[Packet, Awaitable[Optional[Packet]]]]]) -> None:
+        """ Publish every message in the order received. The replies to prompts,
+        pending on a decision, are left to the decision task. """
+        bus: EventBus = self._bus
+        executor: AsyncDuelExecutor = self._gamemanager.executor
+        while True:
+            packet: Optional[Packet] = await inbound.get()
+            if packet is None:
+                break
+            route: Optional[Route] = bus.route(packet)
+            if route is None:
+                continue
+            if executor.lingering is not None:
+                await asyncio.wait((executor.lingering,))
+            result = bus.dispatch(route, packet)
+            if route.prompt:
+                if result is not None:
+                    await prompts.put(result)
+                    if prompts.qsize() > self.stats.prompt_peak:
+                        self.stats.prompt_peak = prompts.qsize()
+                continue
+            reply: Optional[Packet] = await result if isawaitable(result) else result
+            if reply:
+                await self._send(reply)
+        await prompts.put(None)
+
+
+    async def _decide(self, prompts: asyncio.Queue[Optional[Union[Packet, Awaitable[Optional[Packet]]]]]) -> None:
+        """ Wait for the decision of each prompt and send it, in the order of the prompts. """
+        while True:
+            result: Optional[Union[Packet, Awaitable[Optional[Packet]]]] = await prompts.get()
+            if result is None:
+                break
+            start: float = time.perf_counter()
+            reply: Optional[Packet] = await result if isawaitable(result) else result
+            self.stats.decision_time += time.perf_counter() - start
+            if reply:
+                await self._send(reply)
+
+
+    async def _send(self, reply: Packet) -> None:
+        if not self._connection.is_connected():
+            logger.debug('Connection has been closed before replying.')
+            return
+        await self._connection.send(reply)
+
+
+    async def _on_received(self, packet: Packet) -> None:
+        result = self._bus.publish(packet)
+        reply: Optional[Packet] = await result if isawaitable(result) else result
         if reply:
             await self._connection.send(reply)
@@ -1,8 +1,9 @@
-from .connect import YGOConnection
+from .connect import YGOConnection, BufferedYGOConnection
 from .packet import Packet
 
 
 __all__ = [
     'YGOConnection',
+    'BufferedYGOConnection',
     'Packet'
 ]
\ No newline at end of file
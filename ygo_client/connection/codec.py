@@ -0,0 +1,364 @@
+""" Declarative message layouts compiled into struct-based decoders and encoders.
+
+A layout is written once as a class whose annotations describe the wire format::
+
+    class LocInfo(Record):
+        controller: U8
+        location: U8
+        index: U32
+        position: U32
+
+    class Move(Message):
+        card_id: U32
+        previous: LocInfo
+        current: LocInfo
+        reason: U32
+
+When the class is created, consecutive fixed-width fields (including nested
+records) are merged into a single ``struct.Struct`` and counted arrays of records
+are read with ``struct.iter_unpack``, so ``Move.decode(packet)`` is one unpack
+call. The generated class is slotted and also gets ``encode(packet)``.
+"""
+import abc
+import itertools
+import struct
+from typing import TYPE_CHECKING, Any, Annotated, Callable, ClassVar, Optional, TypeVar, Union, get_args, get_origin
+
+from .packet import Packet
+
+
+U8  = Annotated[int, 'B']
+U16 = Annotated[int, 'H']
+U32 = Annotated[int, 'I']
+U64 = Annotated[int, 'Q']
+I32 = Annotated[int, 'i']
+Bool = Annotated[bool, '?']
+
+
+class Str:
+    """ Fixed-size UTF-16-LE string of ``size`` bytes. """
+    def __init__(self, size: int) -> None:
+        self.size = size
+
+
+class Raw:
+    """ Fixed-size opaque bytes, e.g. alignment padding. """
+    def __init__(self, size: int) -> None:
+        self.size = size
+
+
+class Array:
+    """ Repeated elements, prefixed by a count of format ``count``
+    or sized by the already decoded field named ``length``.\n
+    ``element`` is the struct format of scalar elements, or a Record whose
+    layout the elements follow while being kept as plain tuples. """
+    def __init__(self, count: Optional[str]=None, element: Union[str, type, None]=None, length: Optional[str]=None) -> None:
+        assert (count is None) != (length is None), 'Array needs exactly one of count or length'
+        self.count = count
+        self.element = element
+        self.length = length
+
+
+class Rest:
+    """ Everything left in the packet, as a memoryview. """
+
+
+def _decode_str(raw: bytes) -> str:
+    try:
+        return raw.decode(encoding='utf-16-le')
+    except UnicodeDecodeError:
+        return ''
+
+
+def _encode_str(content: str) -> bytes:
+    return content.encode(encoding='utf-16-le')
+
+
+_F = TypeVar('_F', bound=Callable[..., Any])
+
+if TYPE_CHECKING:
+    # mypy cannot see the methods _compile generates, so it would take every layout for abstract
+    def _compiled(method: _F) -> _F:
+        return method
+else:
+    _compiled = abc.abstractmethod
+
+
+class _Layout(abc.ABCMeta):
+    """ Metaclass turning annotations into __slots__ and compiled codec methods. """
+    def __new__(mcs, name: str, bases: tuple[type, ...], namespace: dict[str, Any], abstract: bool=False) -> '_Layout':
+        annotations: dict[str, Any] = {
+            key: value for key, value in namespace.get('__annotations__', {}).items()
+            if get_origin(value) is not ClassVar
+        }
+        namespace['__slots__'] = tuple(annotations)
+        cls = super().__new__(mcs, name, bases, namespace)
+        fields: list[tuple[str, Any]] = list(getattr(cls.__mro__[1], '_fields', [])) + list(annotations.items())
+        cls._fields = fields # type: ignore
+        if not abstract:
+            _compile(cls, fields)
+            cls.__abstractmethods__ = frozenset() # the compiled methods replace the abstract ones
+        return cls
+
+
+    def __init__(cls, name: str, bases: tuple[type, ...], namespace: dict[str, Any], abstract: bool=False) -> None:
+        super().__init__(name, bases, namespace)
+
+
+class Record(metaclass=_Layout, abstract=True):
+    """ Fixed-width group of fields, usable inside a Message or an Array. """
+    _fields: ClassVar[list[tuple[str, Any]]] = []
+    _struct: ClassVar[struct.Struct]
+    _width: ClassVar[int] # number of values the record takes in a flat tuple
+    _flat: ClassVar[bool] # True if the record can be built directly from its struct tuple
+
+    # implemented by the methods compiled from the fields of each layout
+    @_compiled
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        raise NotImplementedError()
+
+
+    @classmethod
+    @_compiled
+    def _from_values(cls, values: tuple[Any, ...]) -> Any:
+        raise NotImplementedError()
+
+
+    @_compiled
+    def _to_values(self) -> tuple[Any, ...]:
+        raise NotImplementedError()
+
+
+    @classmethod
+    def field_index(cls, name: str) -> int:
+        """ Position of field name in the flat tuples of the record, as kept by Array(..., cls). """
+        index: int = 0
+        for field, annotation in cls._fields:
+            if field == name:
+                return index
+            index += _width(annotation)
+        raise KeyError(f'{cls.__name__} has no field {name}.')
+
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name, _ in self._fields)
+
+
+    def __repr__(self) -> str:
+        fields: str = ', '.join(f'{name}={getattr(self, name)!r}' for name, _ in self._fields)
+        return f'{type(self).__name__}({fields})'
+
+
+class Message(Record, abstract=True):
+    """ Payload of one StocMessage or GameMessage. """
+
+    @classmethod
+    @_compiled
+    def decode(cls, packet: Packet) -> Any:
+        raise NotImplementedError()
+
+
+    @_compiled
+    def encode(self, packet: Packet) -> None:
+        raise NotImplementedError()
+
+
+
+def _unwrap(annotation: Any) -> tuple[Any, tuple[Any, ...]]:
+    if get_origin(annotation) is Annotated:
+        return annotation.__origin__, annotation.__metadata__
+    return annotation, ()
+
+
+def _width(annotation: Any) -> int:
+    typ, _ = _unwrap(annotation)
+    if isinstance(typ, type) and issubclass(typ, Record):
+        return typ._width
+    return 1
+
+
+def _fixed_format(annotation: Any) -> Optional[str]:
+    """ struct format of a fixed-width field, or None for variable-width ones. """
+    typ, metadata = _unwrap(annotation)
+    if isinstance(typ, type) and issubclass(typ, Record) and not issubclass(typ, Message):
+        return typ._struct.format.lstrip('<')
+    for meta in metadata:
+        if isinstance(meta, str):
+            return meta
+        if isinstance(meta, (Str, Raw)):
+            return f'{meta.size}s'
+    return None
+
+
+class _Compiler:
+    def __init__(self, cls: Any) -> None:
+        self.cls = cls
+        self.globals: dict[str, Any] = {'_starmap': itertools.starmap, '_decode_str': _decode_str, '_encode_str': _encode_str}
+        self.decode: list[str] = []
+        self.encode: list[str] = []
+        self.formats: list[str] = []
+        self.values: list[str] = [] # flat values of the pending segment, for encoding
+        self.counter = itertools.count()
+        self.arrays: set[str] = set()
+
+
+    def name(self, obj: Any, prefix: str) -> str:
+        key: str = f'_{prefix}{next(self.counter)}'
+        self.globals[key] = obj
+        return key
+
+
+    def value_expr(self, annotation: Any, source: str, index: int) -> str:
+        """ Expression building a field from the flat values source[index:]. """
+        typ, metadata = _unwrap(annotation)
+        if isinstance(typ, type) and issubclass(typ, Record):
+            args: list[str] = []
+            for _, sub in typ._fields:
+                args.append(self.value_expr(sub, source, index))
+                index += _width(sub)
+            return f'{self.name(typ, "r")}({", ".join(args)})'
+        if any(isinstance(meta, Str) for meta in metadata):
+            return f'_decode_str({source}[{index}])'
+        return f'{source}[{index}]'
+
+
+    def flat_exprs(self, annotation: Any, expr: str) -> list[str]:
+        """ Expressions of the flat struct values of a field held by expr. """
+        typ, metadata = _unwrap(annotation)
+        if isinstance(typ, type) and issubclass(typ, Record):
+            return [e for name, sub in typ._fields for e in self.flat_exprs(sub, f'{expr}.{name}')]
+        if any(isinstance(meta, Str) for meta in metadata):
+            return [f'_encode_str({expr})']
+        return [expr]
+
+
+    def flush(self) -> Optional[str]:
+        if not self.formats:
+            return None
+        fmt: str = self.name(struct.Struct('<' + ''.join(self.formats)), 's')
+        self.decode.append(f'    v = packet.read_struct({fmt})')
+        self.encode.append(f'    packet.write_struct({fmt}, {", ".join(self.values)})')
+        self.formats, self.values = [], []
+        return fmt
+
+
+    def compile_message(self, fields: list[tuple[str, Any]]) -> None:
+        pending: list[tuple[str, Any, int]] = [] # fields of the current segment and their index in it
+        width: int = 0
+
+        def emit() -> None:
+            nonlocal pending, width
+            if self.flush() is None:
+                return
+            for name, annotation, index in pending:
+                if annotation is None: # count of the following array
+                    self.decode.append(f'    n_{name} = v[{index}]')
+                else:
+                    self.decode.append(f'    f_{name} = {self.value_expr(annotation, "v", index)}')
+            pending, width = [], 0
+
+        for name, annotation in fields:
+            fmt: Optional[str] = _fixed_format(annotation)
+            if fmt is not None:
+                pending.append((name, annotation, width))
+                self.formats.append(fmt)
+                self.values += self.flat_exprs(annotation, f'self.{name}')
+                width += _width(annotation)
+                continue
+
+            typ, metadata = _unwrap(annotation)
+            if any(isinstance(meta, Rest) for meta in metadata):
+                emit()
+                self.decode.append(f'    f_{name} = packet.read_rest()')
+                self.encode.append(f'    packet.write_bytes(self.{name})')
+                continue
+
+            array: Array = next(meta for meta in metadata if isinstance(meta, Array))
+            if array.count is not None:
+                pending.append((name, None, width))
+                self.formats.append(array.count)
+                self.values.append(f'len(self.{name})')
+                width += 1
+                count: str = f'n_{name}'
+            else:
+                count = f'len(f_{array.length})' if array.length in self.arrays else f'f_{array.length}'
+            emit()
+            self.arrays.add(name)
+
+            element: Any = get_args(typ)[0]
+            fmt_name: str
+            if isinstance(array.element, type) and issubclass(array.element, Record):
+                fmt_name = self.name(array.element._struct, 's')
+                self.decode.append(f'    f_{name} = list(packet.read_structs({fmt_name}, {count}))')
+                self.encode.append(f'    for e in self.{name}:')
+                self.encode.append(f'        packet.write_struct({fmt_name}, *e)')
+            elif isinstance(element, type) and issubclass(element, Record):
+                fmt_name = self.name(element._struct, 's')
+                rec: str = self.name(element, 'r')
+                if element._flat:
+                    self.decode.append(f'    f_{name} = list(_starmap({rec}, packet.read_structs({fmt_name}, {count})))')
+                else:
+                    self.decode.append(f'    f_{name} = [{rec}._from_values(t) for t in packet.read_structs({fmt_name}, {count})]')
+                self.encode.append(f'    for e in self.{name}:')
+                self.encode.append(f'        packet.write_struct({fmt_name}, *e._to_values())')
+            else:
+                assert isinstance(array.element, str), f'{self.cls.__name__}.{name}: scalar Array needs an element format'
+                fmt_name = self.name(struct.Struct('<' + array.element), 's')
+                self.decode.append(f'    f_{name} = [t[0] for t in packet.read_structs({fmt_name}, {count})]')
+                self.encode.append(f'    for e in self.{name}:')
+                self.encode.append(f'        packet.write_struct({fmt_name}, e)')
+        emit()
+
+
+def _compile(cls: Any, fields: list[tuple[str, Any]]) -> None:
+    compiler: _Compiler = _Compiler(cls)
+    names: list[str] = [name for name, _ in fields]
+    params: str = ', '.join(names)
+
+    source: list[str] = [f'def __init__(self, {params}):' if names else 'def __init__(self):']
+    source += [f'    self.{name} = {name}' for name in names] or ['    pass']
+
+    is_message: bool = issubclass(cls, Message)
+    if is_message:
+        compiler.compile_message(fields)
+        source += ['def decode(cls, packet):'] + compiler.decode
+        source += [f'    return cls({", ".join(f"f_{name}" for name in names)})']
+        source += ['def encode(self, packet):'] + (compiler.encode or ['    pass'])
+    else:
+        formats: list[str] = []
+        for name, annotation in fields:
+            fmt: Optional[str] = _fixed_format(annotation)
+            assert fmt is not None, f'{cls.__name__}.{name}: Record fields must be fixed width'
+            formats.append(fmt)
+        cls._struct = struct.Struct('<' + ''.join(formats))
+        args: list[str] = []
+        width: int = 0
+        for _, annotation in fields:
+            args.append(compiler.value_expr(annotation, 't', width))
+            width += _width(annotation)
+        cls._width = width
+        cls._flat = width == len(fields) and all(expr == f't[{i}]' for i, expr in enumerate(args))
+        source += ['def _from_values(cls, t):', f'    return cls({", ".join(args)})']
+        values: list[str] = [e for name, annotation in fields for e in compiler.flat_exprs(annotation, f'self.{name}')]
+        source += ['def _to_values(self):', f'    return ({", ".join(values)}{"," if len(values) == 1 else ""})']
+
+    namespace: dict[str, Any] = {}
+    exec('\n'.join(source), compiler.globals, namespace)
+    cls.__init__ = namespace['__init__']
+    if is_message:
+        cls.decode = classmethod(namespace['decode'])
+        cls.encode = namespace['encode']
+    else:
+        cls._from_values = classmethod(namespace['_from_values'])
+        cls._to_values = namespace['_to_values']
+
+
+def encode(msg_id: int, message: Message, game_msg_id: Optional[int]=None) -> Packet:
+    """ Build the packet a server would send for message, e.g. to feed GameClient in tests. """
+    packet: Packet = Packet(msg_id)
+    if game_msg_id is not None:
+        packet.write_int(game_msg_id, byte_size=1)
+    message.encode(packet)
+    return Packet.from_bytes(packet.data)
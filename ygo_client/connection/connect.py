@@ -1,17 +1,29 @@
 import asyncio
 import asyncio.streams
+import collections
 import logging
+from typing import TYPE_CHECKING, Optional
 
-from .packet import Packet
+from .packet import Packet, HEADER_SIZE, MAX_PACKET_SIZE
 
+if TYPE_CHECKING:
+    from ygo_client.recorder import PacketRecorder
 
-HEADER_SIZE: int = 2
 
 logger = logging.getLogger(__name__)
 
 class YGOConnection:
     _reader: asyncio.StreamReader
     _writer: asyncio.StreamWriter
+    _outbox: list[memoryview] # frames waiting for the next flush
+    _outbox_size: int
+    _flush_handle: Optional[asyncio.Handle] = None
+    recorder: Optional['PacketRecorder'] = None # gets every frame sent and received
+
+    def __init__(self, recorder: Optional['PacketRecorder']=None) -> None:
+        self._outbox = []
+        self._outbox_size = 0
+        self.recorder = recorder
 
         
     def is_connected(self) -> bool:
@@ -41,9 +53,9 @@ class YGOConnection:
                 raise ConnectionResetError('Connection has been closed.')
             
             data: bytes = await self._reader.readexactly(data_size)
-            packet: Packet = Packet(int.from_bytes(data[0:1], 'little'))
-            packet.write_bytes(data[1:])
-            return packet
+            if self.recorder is not None:
+                self.recorder.received(data)
+            return Packet.from_bytes(data)
         except ConnectionAbortedError as e:
             self._writer.close()
             raise e
@@ -51,19 +63,220 @@ class YGOConnection:
 
 
     async def send(self, packet: Packet) -> None:
+        """ Queue packet to be written together with the other packets sent
+        in this loop iteration. Waits only if the queued and buffered bytes pass
+        the high-water mark of the transport. """
         if not self.is_connected():
             raise ConnectionError('No connection.')
         
-        header: bytes = packet.size.to_bytes(HEADER_SIZE, byteorder='little')
-        self._writer.write(header + packet.data)
+        frame: memoryview = packet.frame
+        if self.recorder is not None:
+            self.recorder.sent(frame[HEADER_SIZE:])
+        self._outbox.append(frame)
+        self._outbox_size += len(frame)
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_soon(self.flush)
+
+        transport: asyncio.WriteTransport = self._write_transport()
+        if self._outbox_size + transport.get_write_buffer_size() > transport.get_write_buffer_limits()[1]:
+            self.flush()
+            await self._drain()
+
+
+    def flush(self) -> None:
+        """ Write all queued packets with one vectored write. """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._outbox:
+            return
+        frames, self._outbox, self._outbox_size = self._outbox, [], 0
+        if self.is_connected():
+            self._write_transport().writelines(frames)
+
+
+    def _write_transport(self) -> asyncio.WriteTransport:
+        return self._writer.transport
+
+
+    async def _drain(self) -> None:
         await self._writer.drain()
             
 
     def close(self) -> None:
         if self.is_connected():
+            self.flush()
             self._writer.close()
 
 
+class FrameProtocol(asyncio.BufferedProtocol):
+    """ Receives into a large buffer and splits length-prefixed frames in place.\n
+    Received packets are views into the buffer rather than copies. The buffer is
+    replaced rather than reused once its end is reached, and an old one is freed
+    with the last packet viewing it.\n
+    Every frame completed by a socket read is queued at once, so receive()
+    returns without suspending while frames are pending. """
+    BUFFER_SIZE: int = 4 * (HEADER_SIZE + MAX_PACKET_SIZE)
+    MAX_PENDING: int = 256 # pause reading while this many frames wait to be received
+
+    _transport: Optional[asyncio.Transport] = None
+    _buffer: bytearray
+    _start: int # first unconsumed byte in _buffer
+    _end: int # end of the received bytes in _buffer
+    _frames: collections.deque[Packet]
+    _waiter: Optional[asyncio.Future[None]] = None
+    _drain_waiter: Optional[asyncio.Future[None]] = None
+    _exception: Optional[Exception] = None
+    _reading_paused: bool = False
+    _writing_paused: bool = False
+
+    def __init__(self) -> None:
+        self._buffer = bytearray(self.BUFFER_SIZE)
+        self._start = self._end = 0
+        self._frames = collections.deque()
+
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        assert isinstance(transport, asyncio.Transport)
+        self._transport = transport
+
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self._set_exception(exc or ConnectionResetError('Connection has been closed.'))
+        if self._drain_waiter is not None and not self._drain_waiter.done():
+            self._drain_waiter.set_result(None)
+
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        if len(self._buffer) - self._end < HEADER_SIZE + MAX_PACKET_SIZE:
+            # received packets are views into the buffer, so it is never written over:
+            # the incomplete frame moves to the front of a new one, where a whole frame fits
+            pending: int = self._end - self._start
+            buffer: bytearray = bytearray(self.BUFFER_SIZE)
+            buffer[:pending] = memoryview(self._buffer)[self._start:self._end]
+            self._buffer = buffer
+            self._start, self._end = 0, pending
+        return memoryview(self._buffer)[self._end:]
+
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self._end += nbytes
+        buffer: bytearray = self._buffer
+        view: memoryview = memoryview(buffer)
+        start: int = self._start
+        end: int = self._end
+        while end - start >= HEADER_SIZE:
+            size: int = buffer[start] | buffer[start+1] << 8
+            if size == 0:
+                self._set_exception(ConnectionResetError('Connection has been closed.'))
+                if self._transport is not None:
+                    self._transport.close()
+                break
+            if end - start - HEADER_SIZE < size:
+                break
+            start += HEADER_SIZE
+            self._frames.append(Packet.from_bytes(view[start:start+size]))
+            start += size
+        self._start = start
+
+        if len(self._frames) >= self.MAX_PENDING and self._transport is not None:
+            self._transport.pause_reading()
+            self._reading_paused = True
+        self._wakeup()
+
+
+    def eof_received(self) -> bool:
+        self._set_exception(ConnectionResetError('Connection has been closed.'))
+        return False
+
+
+    def pause_writing(self) -> None:
+        self._writing_paused = True
+
+
+    def resume_writing(self) -> None:
+        self._writing_paused = False
+        if self._drain_waiter is not None and not self._drain_waiter.done():
+            self._drain_waiter.set_result(None)
+
+
+    async def drain(self) -> None:
+        if self._exception is not None and self._transport is not None and self._transport.is_closing():
+            raise self._exception
+        if not self._writing_paused:
+            return
+        self._drain_waiter = asyncio.get_running_loop().create_future()
+        await self._drain_waiter
+
+
+    async def receive(self) -> Packet:
+        while not self._frames:
+            if self._exception is not None:
+                raise self._exception
+            self._waiter = asyncio.get_running_loop().create_future()
+            await self._waiter
+
+        if self._reading_paused and len(self._frames) <= self.MAX_PENDING // 2 and self._transport is not None:
+            self._transport.resume_reading()
+            self._reading_paused = False
+        return self._frames.popleft()
+
+
+    def _set_exception(self, exc: Exception) -> None:
+        if self._exception is None:
+            self._exception = exc
+        self._wakeup()
+
+
+    def _wakeup(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+        self._waiter = None
+
+
+
+class BufferedYGOConnection(YGOConnection):
+    """ YGOConnection built on FrameProtocol instead of asyncio streams. """
+    _transport: asyncio.Transport
+    _protocol: FrameProtocol
+
+
+    def is_connected(self) -> bool:
+        if not getattr(self, '_transport', None):
+            return False
+        return not self._transport.is_closing()
+
+
+    async def connect(self, host: str, port: int) -> None:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        transport, self._protocol = await loop.create_connection(FrameProtocol, host, port)
+        assert isinstance(transport, asyncio.Transport)
+        self._transport = transport
+
+
+    async def receive(self) -> Packet:
+        if not getattr(self, '_protocol', None):
+            raise ConnectionError('No connection')
+        packet: Packet = await self._protocol.receive()
+        if self.recorder is not None:
+            self.recorder.received(packet.data)
+        return packet
+
+
+    def _write_transport(self) -> asyncio.WriteTransport:
+        return self._transport
+
+
+    async def _drain(self) -> None:
+        await self._protocol.drain()
+
+
+    def close(self) -> None:
+        if self.is_connected():
+            self.flush()
+            self._transport.close()
+
+
 
 if __name__ == '__main__':
     pass
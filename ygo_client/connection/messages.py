@@ -0,0 +1,488 @@
+""" Wire layouts of the StocMessage and GameMessage payloads handled by the client.
+
+Card lists of the selection prompts are kept as plain tuples in the layout of
+their record (e.g. CardInfo order: card_id, controller, location, index, position),
+so a whole list is unpacked by one iter_unpack call without building an object per card.
+Fields are read from those tuples by index, given by Record.field_index.
+"""
+from typing import Annotated
+
+from .codec import Record, Message, Array, Str, Raw, Rest, U8, U16, U32, U64, Bool
+from .enums.stoc_message import StocMessage
+from .enums.game_message import GameMessage
+
+
+# --- records ---
+
+class LocInfo(Record):
+    controller: U8
+    location: U8
+    index: U32
+    position: U32
+
+
+class CardLocation(Record):
+    card_id: U32
+    controller: U8
+    location: U8
+    index: U32
+
+
+class CardInfo(Record):
+    card_id: U32
+    controller: U8
+    location: U8
+    index: U32
+    position: U32
+
+
+class RepositionableCard(Record):
+    card_id: U32
+    controller: U8
+    location: U8
+    index: U8
+
+
+class ActivatableCard(Record):
+    card_id: U32
+    controller: U8
+    location: U8
+    index: U32
+    description: U64
+    operation_type: U8
+
+
+class AttackableCard(Record):
+    card_id: U32
+    controller: U8
+    location: U8
+    index: U8
+    direct_attackable: Bool
+
+
+class ChainCard(Record):
+    card_id: U32
+    controller: U8
+    location: U8
+    index: U32
+    position: U32
+    description: U64
+    operation_type: U8
+
+
+class TributeCard(Record):
+    card_id: U32
+    controller: U8
+    location: U8
+    index: U32
+    release_param: U8
+
+
+class CounterCard(Record):
+    card_id: U32
+    controller: U8
+    location: U8
+    index: U8
+    count: U16
+
+
+class SumCard(Record):
+    card_id: U32
+    controller: U8
+    location: U8
+    index: U32
+    value1: U16
+    value2: U16
+
+
+# positions of fields in the tuples of the card lists kept as plain tuples
+CARD_INFO_POSITION: int = CardInfo.field_index('position')
+CHAIN_CARD_DESCRIPTION: int = ChainCard.field_index('description')
+SUM_CARD_VALUE1: int = SumCard.field_index('value1')
+SUM_CARD_VALUE2: int = SumCard.field_index('value2')
+
+
+class DeckCount(Record):
+    main: U16
+    extra: U16
+
+
+# --- StocMessage ---
+
+class Empty(Message):
+    """ Payload the client does not read. """
+
+
+class Payload(Message):
+    """ Undecoded payload, for messages without a layout. """
+    data: Annotated[memoryview, Rest()]
+
+
+class ErrorMsg(Message):
+    error_type: U8
+    align: Annotated[bytes, Raw(3)]
+    version: U32
+
+
+class JoinGame(Message):
+    lflist: U32
+    rule: U8
+    mode: U8
+    duel_rule: U8
+    nocheck_deck: Bool
+    noshuffle_deck: Bool
+    align: Annotated[bytes, Raw(3)]
+    start_lp: U32
+    start_hand: U8
+    draw_count: U8
+    time_limit: U16
+    align2: Annotated[bytes, Raw(4)]
+    handshake: U32
+    version: U32
+    team1: U32
+    team2: U32
+    best_of: U32
+    duel_flag: U32
+    forbidden_types: U32
+    extra_rules: U32
+
+
+class TypeChange(Message):
+    position: U8
+
+
+class TimeLimit(Message):
+    player: U8
+    left_time: U16
+
+
+class PlayerEnter(Message):
+    name: Annotated[str, Str(40)]
+
+
+# --- GameMessage ---
+
+class Hint(Message):
+    hint_type: U8
+    player: U8
+    data: U64
+
+
+class Start(Message):
+    player_type: U8
+    lp_0: U32
+    lp_1: U32
+    deck_0: DeckCount
+    deck_1: DeckCount
+
+
+class PlayerOnly(Message):
+    player: U8
+
+
+class NewPhase(Message):
+    phase: U16
+
+
+class SelectIdleCmd(Message):
+    player: U8
+    summonable: Annotated[list[CardLocation], Array('I')]
+    special_summonable: Annotated[list[CardLocation], Array('I')]
+    repositionable: Annotated[list[RepositionableCard], Array('I')]
+    monster_setable: Annotated[list[CardLocation], Array('I')]
+    spell_setable: Annotated[list[CardLocation], Array('I')]
+    activatable: Annotated[list[ActivatableCard], Array('I')]
+    can_battle: Bool
+    can_end: Bool
+    can_shuffle: Bool
+
+
+class SelectBattleCmd(Message):
+    player: U8
+    activatable: Annotated[list[ActivatableCard], Array('I')]
+    attackable: Annotated[list[AttackableCard], Array('I')]
+    can_main2: Bool
+    can_end: Bool
+
+
+class SelectEffectYn(Message):
+    player: U8
+    card: CardInfo
+    description: U64
+
+
+class SelectYesNo(Message):
+    player: U8
+    description: U64
+
+
+class SelectOption(Message):
+    player: U8
+    options: Annotated[list[int], Array('B', 'Q')]
+
+
+class SelectCard(Message):
+    player: U8
+    cancelable: Bool
+    min: U32
+    max: U32
+    choices: Annotated[list[tuple[int, ...]], Array('I', CardInfo)]
+
+
+class SelectChain(Message):
+    player: U8
+    specount: U8
+    forced: Bool
+    hint1: U32
+    hint2: U32
+    choices: Annotated[list[tuple[int, ...]], Array('I', ChainCard)]
+
+
+class SelectPlace(Message):
+    player: U8
+    min: U8
+    selectable: U32
+
+
+class SelectPosition(Message):
+    player: U8
+    card_id: U32
+    positions: U8
+
+
+class SelectTribute(Message):
+    player: U8
+    cancelable: Bool
+    min: U32
+    max: U32
+    choices: Annotated[list[tuple[int, ...]], Array('I', TributeCard)]
+
+
+class SelectCounter(Message):
+    player: U8
+    counter_type: U16
+    quantity: U32
+    cards: Annotated[list[CounterCard], Array('B')]
+
+
+class SelectSum(Message):
+    player: U8
+    select_mode: Bool
+    sum_value: U32
+    min: U32
+    max: U32
+    must_selected: Annotated[list[tuple[int, ...]], Array('I', SumCard)]
+    choices: Annotated[list[tuple[int, ...]], Array('I', SumCard)]
+
+
+class SelectUnselect(Message):
+    player: U8
+    finishable: Bool
+    cancelable: Bool
+    min: U32
+    max: U32
+    selectable: Annotated[list[tuple[int, ...]], Array('I', CardInfo)]
+    unselectable: Annotated[list[tuple[int, ...]], Array('I', CardInfo)]
+
+
+class Announce(Message):
+    player: U8
+    count: U8
+    available: U32
+
+
+class AnnounceNumber(Message):
+    player: U8
+    options: Annotated[list[int], Array('B', 'I')]
+
+
+class UpdateData(Message):
+    player: U8
+    location: U8
+    size: U32
+    queries: Annotated[memoryview, Rest()]
+
+
+class UpdateCard(Message):
+    player: U8
+    location: U8
+    index: U8
+    queries: Annotated[memoryview, Rest()]
+
+
+class ShuffleCards(Message):
+    player: U8
+    card_ids: Annotated[list[int], Array('I', 'I')]
+
+
+class ShuffleSetCard(Message):
+    location: U8
+    count: U8
+    previous: Annotated[list[LocInfo], Array(length='count')]
+    current: Annotated[list[LocInfo], Array(length='count')]
+
+
+class SortCard(Message):
+    player: U8
+    cards: Annotated[list[tuple[int, ...]], Array('I', CardLocation)]
+
+
+class Move(Message):
+    card_id: U32
+    previous: LocInfo
+    current: LocInfo
+    reason: U32
+
+
+class PosChange(Message):
+    card_id: U32
+    controller: U8
+    location: U8
+    index: U8
+    previous_position: U8
+    current_position: U8
+
+
+class Swap(Message):
+    first: CardInfo
+    second: CardInfo
+
+
+class Summoning(Message):
+    card: CardInfo
+
+
+class Chaining(Message):
+    card: CardInfo
+    chain_player: U8
+
+
+class BecomeTarget(Message):
+    cards: Annotated[list[tuple[int, ...]], Array('I', LocInfo)]
+
+
+class ChainIndex(Message):
+    index: U8
+
+
+class ConfirmCards(Message):
+    player: U8
+    cards: Annotated[list[tuple[int, ...]], Array('I', CardLocation)]
+
+
+class Counter(Message):
+    counter_type: U16
+    controller: U8
+    location: U8
+    index: U8
+    count: U16
+
+
+class Draw(Message):
+    player: U8
+    count: U32
+
+
+class LifePoints(Message):
+    player: U8
+    amount: U32
+
+
+class CardPair(Message):
+    first: LocInfo
+    second: LocInfo
+
+
+class Unequip(Message):
+    card: LocInfo
+
+
+
+STOC_MESSAGES: dict[int, type[Message]] = {
+    StocMessage.ERROR_MSG: ErrorMsg,
+    StocMessage.SELECT_HAND: Empty,
+    StocMessage.SELECT_TP: Empty,
+    StocMessage.CHANGE_SIDE: Empty,
+    StocMessage.JOIN_GAME: JoinGame,
+    StocMessage.TYPE_CHANGE: TypeChange,
+    StocMessage.DUEL_START: Empty,
+    StocMessage.DUEL_END: Empty,
+    StocMessage.REPLAY: Payload,
+    StocMessage.TIMELIMIT: TimeLimit,
+    StocMessage.CHAT: Empty,
+    StocMessage.PLAYER_ENTER: PlayerEnter,
+    StocMessage.PLAYER_CHANGE: Empty,
+    StocMessage.WATCH_CHANGE: Empty,
+    StocMessage.REMATCH: Empty,
+    StocMessage.NEW_REPLAY: Payload,
+}
+
+
+GAME_MESSAGES: dict[int, type[Message]] = {
+    GameMessage.RETRY: Empty,
+    GameMessage.HINT: Hint,
+    GameMessage.START: Start,
+    GameMessage.WIN: PlayerOnly,
+    GameMessage.NEW_TURN: PlayerOnly,
+    GameMessage.NEW_PHASE: NewPhase,
+    GameMessage.SELECT_IDLE_CMD: SelectIdleCmd,
+    GameMessage.SELECT_BATTLE_CMD: SelectBattleCmd,
+    GameMessage.SELECT_EFFECT_YN: SelectEffectYn,
+    GameMessage.SELECT_YESNO: SelectYesNo,
+    GameMessage.SELECT_OPTION: SelectOption,
+    GameMessage.SELECT_CARD: SelectCard,
+    GameMessage.SELECT_CHAIN: SelectChain,
+    GameMessage.SELECT_PLACE: SelectPlace,
+    GameMessage.SELECT_POSITION: SelectPosition,
+    GameMessage.SELECT_TRIBUTE: SelectTribute,
+    GameMessage.SELECT_COUNTER: SelectCounter,
+    GameMessage.SELECT_SUM: SelectSum,
+    GameMessage.SELECT_DISFIELD: SelectPlace,
+    GameMessage.SELECT_UNSELECT: SelectUnselect,
+    GameMessage.ANNOUNCE_RACE: Announce,
+    GameMessage.ANNOUNCE_ATTRIB: Announce,
+    GameMessage.ANNOUNCE_CARD: Empty,
+    GameMessage.ANNOUNCE_NUNBER: AnnounceNumber,
+    GameMessage.UPDATE_DATA: UpdateData,
+    GameMessage.UPDATE_CARD: UpdateCard,
+    GameMessage.CONFIRM_CARDS: ConfirmCards,
+    GameMessage.SHUFFLE_DECK: PlayerOnly,
+    GameMessage.SHUFFLE_HAND: ShuffleCards,
+    GameMessage.SHUFFLE_EXTRA: ShuffleCards,
+    GameMessage.SHUFFLE_SETCARD: ShuffleSetCard,
+    GameMessage.SORT_CARD: SortCard,
+    GameMessage.SORT_CHAIN: Empty,
+    GameMessage.MOVE: Move,
+    GameMessage.POSCHANGE: PosChange,
+    GameMessage.SET: Empty,
+    GameMessage.SWAP: Swap,
+    GameMessage.SUMMONING: Summoning,
+    GameMessage.SUMMONED: Empty,
+    GameMessage.SPSUMMONING: Summoning,
+    GameMessage.SPSUMMONED: Empty,
+    GameMessage.FLIPSUMMONING: Summoning,
+    GameMessage.FLIPSUMMONED: Empty,
+    GameMessage.CHAINING: Chaining,
+    GameMessage.CHAIN_SOLVING: ChainIndex,
+    GameMessage.CHAIN_SOLVED: ChainIndex,
+    GameMessage.CHAIN_END: Empty,
+    GameMessage.CHAIN_NEGATED: ChainIndex,
+    GameMessage.CHAIN_DISABLED: ChainIndex,
+    GameMessage.BECOME_TARGET: BecomeTarget,
+    GameMessage.DRAW: Draw,
+    GameMessage.DAMAGE: LifePoints,
+    GameMessage.RECOVER: LifePoints,
+    GameMessage.EQUIP: CardPair,
+    GameMessage.UNEQUIP: Unequip,
+    GameMessage.LP_UPDATE: LifePoints,
+    GameMessage.CARD_TARGET: CardPair,
+    GameMessage.CANCEL_TARGET: CardPair,
+    GameMessage.PAY_LPCOST: LifePoints,
+    GameMessage.ADD_COUNTER: Counter,
+    GameMessage.REMOVE_COUNTER: Counter,
+    GameMessage.ATTACK: CardPair,
+    GameMessage.BATTLE: Empty,
+    GameMessage.ATTACK_DISABLED: Empty,
+    GameMessage.ROCK_PAPER_SCISSORS: Empty,
+    GameMessage.TAG_SWAP: Empty,
+}
@@ -1,18 +1,51 @@
+import struct
+from typing import Any, Iterator, Optional, Union
 
 from ygo_core.enums import Phase
 from ygo_core.card import Location, Position
 
 MAX_PACKET_SIZE: int = 0xffff
+HEADER_SIZE: int = 2
+INITIAL_CAPACITY: int = 64
+
+_HEADER: struct.Struct = struct.Struct('<H')
+_UINT: dict[int, struct.Struct] = {
+    1: struct.Struct('<B'),
+    2: struct.Struct('<H'),
+    4: struct.Struct('<I'),
+    8: struct.Struct('<Q'),
+}
 
 class Packet:
     _msg_id: int
-    _content: bytes = b''
+    _buffer: Union[bytes, bytearray, memoryview]
+    _writable: bool
+    _view: Optional[memoryview] = None
+    _offset: int # index of the first content byte in _buffer
+    _length: int # index just past the last content byte in _buffer
     _position: int = 0
 
-    def __init__(self, msg_id: int):
+    def __init__(self, msg_id: int, capacity: int=INITIAL_CAPACITY):
         self._msg_id = msg_id
+        self._buffer = bytearray(HEADER_SIZE + 1 + capacity)
+        self._buffer[HEADER_SIZE] = msg_id
+        self._writable = True
+        self._offset = self._length = HEADER_SIZE + 1
+
+
+    @classmethod
+    def from_bytes(cls, data: Union[bytes, bytearray, memoryview], msg_id: Optional[int]=None) -> 'Packet':
+        """ Wrap a received frame (msg id followed by content) without copying it.\n
+        If msg_id is given, data is taken to be the content alone. """
+        packet: Packet = cls.__new__(cls)
+        packet._buffer = packet._view = memoryview(data)
+        packet._writable = False
+        packet._offset = 1 if msg_id is None else 0
+        packet._msg_id = packet._view[0] if msg_id is None else msg_id
+        packet._length = len(packet._view)
+        return packet
+
 
-    
     @property
     def msg_id(self) -> int:
         return self._msg_id
@@ -20,64 +53,156 @@ class Packet:
 
     @property
     def content(self) -> bytes:
-        return self._content
+        return memoryview(self._buffer)[self._offset:self._length].tobytes()
 
 
     @property
     def data(self) -> bytes:
-        _msg_id_bytes: bytes = self.msg_id.to_bytes(1, byteorder='little')
-        return _msg_id_bytes + self.content
+        if not self._writable and self._offset == 0:
+            return bytes((self._msg_id,)) + self.content
+        return memoryview(self._buffer)[self._offset-1:self._length].tobytes()
 
 
     @property
     def size(self) -> int:
-        return len(self.data)
+        return self._length - self._offset + 1
 
-    
-    def write_bytes(self, content: bytes) -> None:
-        if self.size + len(content) > MAX_PACKET_SIZE:
+
+    @property
+    def frame(self) -> memoryview:
+        """ The packet ready to be sent: 2-byte size header, msg id and content. """
+        if not self._writable:
+            self._own(0)
+        _HEADER.pack_into(self._buffer, 0, self.size)
+        return memoryview(self._buffer)[:self._length]
+
+
+    def _own(self, n: int) -> None:
+        """ Make room for n more bytes, copying into a larger buffer if needed. """
+        if self._writable and self._length + n <= len(self._buffer):
+            return
+        size: int = self.size
+        capacity: int = max(HEADER_SIZE + size + n, 2 * len(self._buffer), HEADER_SIZE + 1 + INITIAL_CAPACITY)
+        buffer: bytearray = bytearray(capacity)
+        buffer[HEADER_SIZE] = self._msg_id
+        buffer[HEADER_SIZE+1:HEADER_SIZE+size] = memoryview(self._buffer)[self._offset:self._length]
+        self._buffer = buffer
+        self._writable = True
+        self._view = None
+        self._offset = HEADER_SIZE + 1
+        self._length = HEADER_SIZE + size
+
+
+    def _reserve(self, n: int) -> int:
+        if self.size + n > MAX_PACKET_SIZE:
             raise ValueError(f"""
-                Cannot write content because becoming too large packet. 
-                Current Size: {self.size}. 
-                Content Size: {len(content)}.
+                Cannot write content because becoming too large packet.
+                Current Size: {self.size}.
+                Content Size: {n}.
                 Max Packet Size: {MAX_PACKET_SIZE}.
                 """
             )
-        self._content += content
+        self._own(n)
+        self._view = None
+        end: int = self._length
+        self._length += n
+        return end
+
+
+    def write_bytes(self, content: Union[bytes, bytearray, memoryview]) -> None:
+        n: int = len(content)
+        end: int = self._reserve(n)
+        self._buffer[end:end+n] = content # type: ignore
 
 
     def write_bytearray(self, content: bytearray) -> None:
-        self.write_bytes(bytes(content))
+        self.write_bytes(content)
+
 
-    
     def write_str(self, content: str, byte_size: int=4) -> None:
         encoded: bytes = content.encode(encoding='utf-16-le')
-        if len(encoded) <= byte_size:
-            self.write_bytes(encoded + bytes(byte_size-len(encoded)))
-        else:
-            self.write_bytes(encoded[:byte_size])
+        end: int = self._reserve(byte_size)
+        self._buffer[end:end+byte_size] = encoded[:byte_size].ljust(byte_size, b'\x00') # type: ignore
 
 
     def write_int(self, content: int, byte_size: int=4) -> None:
         if content < 0:
             content += 1 << (byte_size * 8)
-        self.write_bytes(content.to_bytes(byte_size, byteorder='little'))
+        packer: Optional[struct.Struct] = _UINT.get(byte_size)
+        if packer is None:
+            self.write_bytes(content.to_bytes(byte_size, byteorder='little'))
+            return
+        end: int = self._reserve(byte_size)
+        packer.pack_into(self._buffer, end, content)
+
 
-        
     def write_bool(self, content: bool) -> None:
-        self.write_bytes(int(content).to_bytes(1, byteorder='little'))
-    
+        self.write_int(int(content), byte_size=1)
+
+
+    def write_struct(self, fmt: struct.Struct, *values: Any) -> None:
+        end: int = self._reserve(fmt.size)
+        fmt.pack_into(self._buffer, end, *values)
+
+
+    def _reader(self) -> memoryview:
+        if self._view is None:
+            self._view = memoryview(self._buffer)[:self._length]
+        return self._view
+
 
     def read_bytes(self, n: int) -> bytes:
-        res: bytes = self._content[self._position:self._position+n]
+        view: memoryview = self._reader()
+        start: int = self._offset + self._position
         self._position += n
-        return res
+        return view[start:start+n].tobytes()
 
 
     def read_int(self, n: int) -> int:
+        unpacker: Optional[struct.Struct] = _UINT.get(n)
+        if unpacker is not None:
+            try:
+                value: int = unpacker.unpack_from(self._reader(), self._offset + self._position)[0]
+                self._position += n
+                return value
+            except struct.error:
+                pass # fewer than n bytes left; decode what remains
         return int.from_bytes(self.read_bytes(n), byteorder='little')
 
 
+    def read_struct(self, fmt: struct.Struct) -> tuple[Any, ...]:
+        """ Unpack fmt at the cursor. Like read_int, a short read decodes
+        what remains as if the missing bytes were zero. """
+        start: int = self._offset + self._position
+        self._position += fmt.size
+        try:
+            return fmt.unpack_from(self._reader(), start)
+        except struct.error:
+            return fmt.unpack(self._padded(start, fmt.size))
+
+
+    def read_structs(self, fmt: struct.Struct, count: int) -> Iterator[tuple[Any, ...]]:
+        """ Unpack count consecutive records of the same layout in one call. """
+        start: int = self._offset + self._position
+        size: int = fmt.size * count
+        self._position += size
+        if start + size > self._length:
+            return fmt.iter_unpack(self._padded(start, size))
+        return fmt.iter_unpack(self._reader()[start:start+size])
+
+
+    def _padded(self, start: int, n: int) -> bytes:
+        """ The n bytes from start, zero-filled past the end of the content. """
+        return self._reader()[start:start+n].tobytes().ljust(n, b'\x00')
+
+
+    def read_rest(self) -> memoryview:
+        """ Return the unread content as a view and move the cursor to the end. """
+        start: int = self._offset + self._position
+        self._position = self._length - self._offset
+        return self._reader()[start:]
+
+
     def read_bool(self) -> bool:
         return bool(self.read_int(1))
 
@@ -106,7 +231,7 @@ class Packet:
 
 
     def __repr__(self) -> str:
-        return f'<msg_id: {self.msg_id}>' + self._content.hex(' ')
+        return f'<msg_id: {self.msg_id}>' + self.content.hex(' ')
+
 
 
-    
@@ -0,0 +1,234 @@
+""" Training rows built from recorded games, one per decision, in parallel.
+
+Each PacketLog is replayed game by game in a worker of a ProcessPoolExecutor. Every
+prompt of the action space becomes a row: the observation before the prompt, its
+action mask, the index of the recorded answer (the first card of a card selection)
+and the outcome of the game. Answers outside the action space are left out.
+
+The rows of a log are written to a shard, a directory of .npy files meant to be
+opened memory-mapped with load_shard(). The rows of each game are appended to the
+files as the game ends, so a worker holds one game at a time. A shard is written
+under a temporary name and renamed when complete, so build() run again skips the
+shards already written.
+
+numpy is required: pip install ygo-client-python[numpy]
+Run ``python -m ygo_client.dataset OUT LOG... [--workers N]``.
+"""
+import json
+import logging
+import os
+import shutil
+import struct
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, BinaryIO, NamedTuple, Optional, Sequence
+
+from ygo_core.enums import Player
+
+from ygo_client.bus import Event
+from ygo_client.connection.enums.game_message import GameMessage
+from ygo_client.actions import ACTION_SIZE, ENCODERS, Actions, encode_prompt
+from ygo_client.observation import FEATURES, ROWS, SCALARS, SECTIONS, Observation, ObservationEncoder
+from ygo_client.recorder import PacketLog
+from ygo_client.replay import ReplayDriver
+
+try:
+    import numpy as np
+except ImportError:
+    np = None # type: ignore
+
+
+logger = logging.getLogger(__name__)
+
+# (name, dtype, shape of one row) of the files of a shard
+COLUMNS: tuple[tuple[str, str, tuple[int, ...]], ...] = (
+    ('cards', 'int32', (2, ROWS, len(FEATURES))),
+    ('scalars', 'int32', (len(SCALARS) + 2 * len(SECTIONS),)),
+    ('mask', 'bool', (ACTION_SIZE,)),
+    ('action', 'int16', ()),
+    ('prompt', 'uint8', ()), # GameMessage id
+    ('outcome', 'int8', ()), # 1 won, -1 lost, 0 draw or unknown
+)
+MANIFEST: str = 'manifest.jsonl'
+_NPY_HEADER_SIZE: int = 256 # fixed, so the header can be rewritten in place with the row count
+
+
+class Rows(NamedTuple):
+    cards: 'np.ndarray'
+    scalars: 'np.ndarray'
+    mask: 'np.ndarray'
+    action: 'np.ndarray'
+    prompt: 'np.ndarray'
+    outcome: 'np.ndarray'
+
+
+
+class _GameRows:
+    """ Collects the rows of one game while it is replayed, in the order of COLUMNS but the outcome. """
+    driver: ReplayDriver
+    encoder: ObservationEncoder
+    rows: list[tuple[Any, ...]]
+    skipped: int = 0 # answers outside the action space
+    outcome: int = 0
+    _pending: Optional[tuple[Observation, Actions]] = None
+
+    def __init__(self, log: PacketLog) -> None:
+        self.driver = ReplayDriver(log)
+        self.encoder = ObservationEncoder(self.driver.client.get_duel())
+        self.encoder.attach(self.driver.client)
+        self.driver.client.subscribe(self._on_prompt, types=ENCODERS.keys())
+        self.driver.client.subscribe(self._on_win, types=(GameMessage.WIN,))
+        self.driver.on_decision = self._on_decision
+        self.rows = []
+
+
+    def _on_prompt(self, event: Event) -> None:
+        actions: Optional[Actions] = encode_prompt(event.msg_id, event.message) # type: ignore
+        if actions is None:
+            self._pending = None
+            return
+        observation: Observation = Observation(self.encoder.cards.astype(np.int32), self.encoder.scalars.astype(np.int32))
+        self._pending = (observation, actions)
+
+
+    def _on_decision(self, recorded: memoryview) -> None:
+        if self._pending is None:
+            return
+        observation, actions = self._pending
+        self._pending = None
+        index: int = actions.index_of(recorded[1:])
+        if index < 0:
+            self.skipped += 1
+        else:
+            self.rows.append((observation.cards, observation.scalars, actions.mask, index, actions.msg_id))
+
+
+    def _on_win(self, event: Event) -> None:
+        player: int = event.message.player # type: ignore
+        if player in (0, 1):
+            self.outcome = 1 if self.driver.client.get_duel().players[player] == Player.ME else -1
+
+
+
+class _ShardWriter:
+    """ Appends rows to the .npy files of a shard directory, one per column of COLUMNS.
+    The headers give the number of rows written once close() has rewritten them. """
+    count: int = 0
+    _files: list[BinaryIO]
+
+    def __init__(self, directory: str) -> None:
+        self._files = []
+        for name, dtype, shape in COLUMNS:
+            file: BinaryIO = open(os.path.join(directory, name + '.npy'), 'wb')
+            file.write(_npy_header(dtype, (0, *shape)))
+            self._files.append(file)
+
+
+    def append(self, rows: list[tuple[Any, ...]], outcome: int) -> None:
+        """ Write the rows of a game, in the order of COLUMNS but the outcome. """
+        for column, (file, (name, dtype, _)) in enumerate(zip(self._files, COLUMNS)):
+            values: list[Any] = [outcome] * len(rows) if name == 'outcome' else [row[column] for row in rows]
+            file.write(np.asarray(values, dtype=dtype).tobytes())
+        self.count += len(rows)
+
+
+    def close(self) -> None:
+        for file, (_, dtype, shape) in zip(self._files, COLUMNS):
+            with file:
+                file.seek(0)
+                file.write(_npy_header(dtype, (self.count, *shape)))
+
+
+
+def _npy_header(dtype: str, shape: tuple[int, ...]) -> bytes:
+    """ A .npy (version 1.0) header of _NPY_HEADER_SIZE bytes, padded with spaces as the format allows. """
+    header: dict[str, Any] = {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False, 'shape': shape}
+    size: int = _NPY_HEADER_SIZE - len(np.lib.format.magic(1, 0)) - 2
+    return np.lib.format.magic(1, 0) + struct.pack('<H', size) + repr(header).encode('latin1').ljust(size - 1) + b'\n'
+
+
+
+def build_shard(path: str, directory: str) -> dict[str, Any]:
+    """ Replay every game of the log at path and write their rows to the shard directory. """
+    games: int = 0
+    skipped: int = 0
+    mismatches: int = 0
+    temporary: str = directory + '.tmp'
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+    writer: _ShardWriter = _ShardWriter(temporary)
+    try:
+        with PacketLog(path) as log:
+            for game in range(len(log.games)) if log.games else (None,): # a log without games is replayed whole
+                collector: _GameRows = _GameRows(log)
+                collector.driver.run(game)
+                writer.append(collector.rows, collector.outcome)
+                games += 1
+                skipped += collector.skipped
+                mismatches += collector.driver.stats.mismatches
+                del collector
+    finally:
+        writer.close()
+    os.replace(temporary, directory)
+    return {
+        'log': path,
+        'shard': os.path.basename(directory),
+        'games': games,
+        'rows': writer.count,
+        'skipped': skipped,
+        'mismatches': mismatches,
+    }
+
+
+def shard_name(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def build(logs: Sequence[str], out: str, workers: Optional[int]=None) -> list[dict[str, Any]]:
+    """ Write a shard into out for each log not done yet, with workers processes
+    (os.cpu_count() if None), and return the manifest entries of the new shards. """
+    if np is None:
+        raise ImportError('build requires numpy: pip install ygo-client-python[numpy]')
+    names: list[str] = [shard_name(path) for path in logs]
+    if len(set(names)) != len(names):
+        raise ValueError('Logs must have distinct file names, which name their shards.')
+    os.makedirs(out, exist_ok=True)
+    todo: list[tuple[str, str]] = [
+        (path, os.path.join(out, name)) for path, name in zip(logs, names)
+        if not os.path.isdir(os.path.join(out, name))
+    ]
+    logger.info('%d of %d logs left to process.', len(todo), len(logs))
+
+    entries: list[dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool, open(os.path.join(out, MANIFEST), 'a') as manifest:
+        futures = {pool.submit(build_shard, path, directory): path for path, directory in todo}
+        for future in as_completed(futures):
+            try:
+                entry: dict[str, Any] = future.result()
+            except Exception:
+                logger.exception('Failed to process %s.', futures[future])
+                continue
+            manifest.write(json.dumps(entry) + '\n')
+            manifest.flush()
+            entries.append(entry)
+            logger.info('%s: %d games, %d rows (%d/%d).', entry['shard'], entry['games'], entry['rows'], len(entries), len(todo))
+    return entries
+
+
+def load_shard(directory: str) -> Rows:
+    """ The rows of a shard, memory-mapped. """
+    return Rows(*(
+        np.load(os.path.join(directory, name + '.npy'), mmap_mode='r')
+        for name, _, _ in COLUMNS
+    ))
+
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Build training rows from recorded games.')
+    parser.add_argument('out', help='directory of the shards')
+    parser.add_argument('logs', nargs='+', help='packet logs written by PacketRecorder')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    build(args.logs, args.out, args.workers)
@@ -0,0 +1,197 @@
+""" Lazy iteration over the messages of a recording, a PacketLog or a .yrpX replay.
+
+iter_events() maps the file and reads it front to back, decoding only the messages
+of the requested types. The duel state is rebuilt only when an event asks for it:
+the first call to RecordedEvent.duel() starts a ReplayDriver on a second cursor of
+the file, and each call replays it up to that event, so a scan that never looks at
+the duel never runs GameManager.
+
+Run ``python -m ygo_client.events FILE [TYPE...]`` to print the events per second,
+TYPE being the name of a GameMessage.
+"""
+import mmap
+from typing import BinaryIO, Iterable, Iterator, Optional, Union, cast
+
+from ygo_core.duel import Duel
+
+from ygo_client.bus import MessageID
+from ygo_client.connection.packet import Packet
+from ygo_client.connection.codec import Message
+from ygo_client.connection.enums.stoc_message import StocMessage
+from ygo_client.connection.enums.game_message import GameMessage
+from ygo_client.connection.messages import STOC_MESSAGES, GAME_MESSAGES, Payload
+from ygo_client.recorder import PacketLog, RECEIVED
+from ygo_client.replay import ReplayDriver
+from ygo_client.yrp import Replay
+
+
+class RecordedEvent:
+    """ A message of a recording.\n
+    duel() returns the duel tracked by GameManager once this message has been handled.
+    It is the same Duel for every event of an iteration, updated in place, so it shows
+    this event only until a later event asks for it. timestamp (ns) is None in replays. """
+    __slots__ = ('msg_id', 'message', 'timestamp', '_position', '_tracker')
+    msg_id: Union[MessageID, int]
+    message: Message
+    timestamp: Optional[int]
+    _position: int
+    _tracker: '_Tracker'
+
+    def __init__(self, msg_id: Union[MessageID, int], message: Message, timestamp: Optional[int], position: int, tracker: '_Tracker') -> None:
+        self.msg_id = msg_id
+        self.message = message
+        self.timestamp = timestamp
+        self._position = position
+        self._tracker = tracker
+
+
+    def duel(self) -> Duel:
+        return self._tracker.advance(self._position)
+
+
+    def __repr__(self) -> str:
+        return f'RecordedEvent({getattr(self.msg_id, "name", self.msg_id)}, {self.message!r})'
+
+
+
+class _Tracker:
+    """ The state of a recording, replayed on demand up to a position of its frames. """
+    _path: str
+    _driver: Optional[ReplayDriver] = None
+    _frames: Iterator[tuple[int, Union[bytes, memoryview]]] # (position, received frame)
+    _position: int = -1 # of the last frame replayed
+    _close: Optional[Union[PacketLog, Replay]] = None # the reader of the second cursor
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+
+
+    def advance(self, position: int) -> Duel:
+        driver: ReplayDriver = self._driver or self._start()
+        while self._position < position:
+            item = next(self._frames, None)
+            if item is None:
+                break
+            self._position, data = item
+            try:
+                driver.feed(data)
+            except EOFError:
+                pass # no recorded answer left; the other messages still apply
+        return driver.client.get_duel()
+
+
+    def close(self) -> None:
+        if self._close is not None:
+            self._close.close()
+            self._close = None
+
+
+    def _start(self) -> ReplayDriver:
+        driver: ReplayDriver
+        if _is_packet_log(self._path):
+            log: PacketLog = PacketLog(self._path)
+            driver = ReplayDriver(log)
+            driver.executor.script = driver.replies()
+            self._frames = ((frame.offset, frame.data) for frame in log.frames() if frame.direction == RECEIVED)
+            self._close = log
+        else:
+            replay: Replay = _open_replay(self._path)
+            driver = ReplayDriver() # a replay holds no answers: prompts stop at the executor
+            self._frames = enumerate(replay.frames())
+            self._close = replay
+        self._driver = driver
+        return driver
+
+
+
+def iter_events(path: str, types: Optional[Iterable[Union[MessageID, int]]]=None) -> Iterator[RecordedEvent]:
+    """ The received messages of types (all if None) of the PacketLog or replay at path, in order.\n
+    types holds StocMessage and GameMessage members; plain ints are taken as GameMessage ids.
+    Messages of other types are skipped after reading their id. """
+    stoc_types: Optional[frozenset[int]] = None
+    game_types: Optional[frozenset[int]] = None
+    if types is not None:
+        types = list(types)
+        stoc_types = frozenset(int(t) for t in types if isinstance(t, StocMessage))
+        game_types = frozenset(int(t) for t in types if not isinstance(t, StocMessage))
+
+    tracker: _Tracker = _Tracker(path)
+    try:
+        if _is_packet_log(path):
+            yield from _log_events(path, stoc_types, game_types, tracker)
+        else:
+            yield from _replay_events(path, game_types, tracker)
+    finally:
+        tracker.close()
+
+
+def _log_events(path: str, stoc_types: Optional[frozenset[int]], game_types: Optional[frozenset[int]], tracker: _Tracker) -> Iterator[RecordedEvent]:
+    with PacketLog(path) as log:
+        for frame in log.frames():
+            data: memoryview = frame.data
+            if frame.direction != RECEIVED or not data:
+                continue
+            packet: Packet
+            if data[0] == StocMessage.GAME_MSG:
+                if len(data) < 2 or game_types is not None and data[1] not in game_types:
+                    continue
+                packet = Packet.from_bytes(data)
+                msg_id: Union[MessageID, int] = _member(GameMessage, packet.read_int(1))
+                layout: type[Message] = GAME_MESSAGES.get(msg_id, Payload)
+            else:
+                if stoc_types is not None and data[0] not in stoc_types:
+                    continue
+                packet = Packet.from_bytes(data)
+                msg_id = _member(StocMessage, data[0])
+                layout = STOC_MESSAGES.get(msg_id, Payload)
+            yield RecordedEvent(msg_id, layout.decode(packet), frame.timestamp, frame.offset, tracker)
+
+
+def _replay_events(path: str, game_types: Optional[frozenset[int]], tracker: _Tracker) -> Iterator[RecordedEvent]:
+    with _open_replay(path) as replay:
+        for position, (msg_id, body) in enumerate(replay.packets()):
+            if game_types is not None and msg_id not in game_types:
+                continue
+            layout: type[Message] = GAME_MESSAGES.get(msg_id, Payload)
+            message: Message = layout.decode(Packet.from_bytes(body, msg_id=msg_id))
+            yield RecordedEvent(_member(GameMessage, msg_id), message, None, position, tracker)
+
+
+def _member(enum: type, value: int) -> Union[MessageID, int]:
+    try:
+        member: MessageID = enum(value)
+    except ValueError:
+        return value
+    return member
+
+
+def _is_packet_log(path: str) -> bool:
+    with open(path, 'rb') as file:
+        return file.read(4) == b'YGOL'
+
+
+def _open_replay(path: str) -> Replay:
+    with open(path, 'rb') as file:
+        mapping: mmap.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return Replay(cast(BinaryIO, mapping)) # an mmap reads like a file
+    except BaseException:
+        mapping.close()
+        raise
+
+
+
+def benchmark(path: str, types: Optional[list[str]]=None) -> None:
+    """ Iterate the events of the GameMessage types named in types and print the events per second. """
+    import time
+    wanted: Optional[list[GameMessage]] = None if not types else [GameMessage[name] for name in types]
+    start: float = time.perf_counter()
+    events: int = sum(1 for _ in iter_events(path, wanted))
+    elapsed: float = time.perf_counter() - start
+    print(f'{events} events in {elapsed:.3f}s: {events/elapsed:.0f}/s')
+
+
+
+if __name__ == '__main__':
+    import sys
+    benchmark(sys.argv[1], sys.argv[2:])
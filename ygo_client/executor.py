@@ -1,5 +1,6 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Tuple
+from typing import Any, List, Optional, Tuple, Union, cast
 
 from ygo_core import Deck, Card
 from ygo_core.enums import Player
@@ -141,4 +142,386 @@ class DuelExecutor(ABC):
 
     @abstractmethod
     def change_side(self, deck: Deck) -> None:
-        pass
\ No newline at end of file
+        pass
+
+
+
+class AsyncDuelExecutor(ABC):
+    """ DuelExecutor whose methods are coroutines, e.g. to wait for a remote model
+    without blocking the other duels of the event loop. """
+    lingering: Optional[asyncio.Future[Any]] = None # decision still reading the duel after it was answered; GameClient publishes nothing until it is done
+
+    async def on_timelimit(self, left_time: int) -> None:
+        """ Called with the seconds left to answer when the server reports them. """
+        pass
+
+
+    @abstractmethod
+    async def on_start(self) -> None:
+        """ Called when a new game starts. """
+        raise NotImplementedError()
+
+
+    @abstractmethod
+    async def on_new_turn(self) -> None:
+        """ Called when a new turn starts. """
+        raise NotImplementedError()
+
+
+    @abstractmethod
+    async def on_new_phase(self) -> None:
+        """ Called when a new phase starts. """
+        raise NotImplementedError()
+
+
+    @abstractmethod
+    async def on_win(self, win: bool) -> None:
+        """ Called when a game ends. """
+        raise NotImplementedError()
+
+    
+    @abstractmethod
+    async def rematch(self, win_on_match: bool) -> bool:
+        """ Called when a match ends.\n
+        Return True if you want to rematch. """
+        raise NotImplementedError()
+
+
+    @abstractmethod
+    async def select_hand(self) -> int:
+        raise NotImplementedError()
+
+
+    @abstractmethod
+    async def select_tp(self) -> bool:
+        """ Return True if you go first """
+        pass
+
+    @abstractmethod
+    async def select_mainphase_action(self, main: MainPhase) -> int:
+        pass
+
+
+    @abstractmethod
+    async def select_battle_action(self, battle: BattlePhase) -> int:
+        pass
+
+
+    @abstractmethod
+    async def select_effect_yn(self, card: Card, description: int) -> bool:
+        pass
+
+
+    @abstractmethod
+    async def select_yn(self) -> bool:
+        pass
+
+
+    @abstractmethod
+    async def select_battle_replay(self) -> bool:
+        pass
+
+    
+    @abstractmethod
+    async def select_option(self, options: List[int]) -> int:
+        pass
+
+
+    @abstractmethod
+    async def select_card(self, choices: List[Card], min_: int, max_: int, cancelable: bool, select_hint: int) -> List[int]:
+        pass
+
+    
+    @abstractmethod
+    async def select_tribute(self, choices: List[Card], min_: int, max_: int, cancelable: bool, select_hint: int) -> List[int]:
+        pass
+    
+
+    @abstractmethod
+    async def select_chain(self, choices: List[Card], descriptions: List[int], forced: bool) -> int:
+        pass
+
+
+    @abstractmethod
+    async def select_place(self, player: Player, choices: List[int]) -> int:
+        pass
+
+
+    @abstractmethod
+    async def select_position(self, card_id: int, choices: List[int]) -> int:
+        pass
+
+
+    @abstractmethod
+    async def select_sum(self, choices: List[Tuple[Card, int, int]], sum_value: int, min_: int, max_: int, must_just: bool, select_hint: int) -> List[int]:
+        pass
+
+
+    @abstractmethod
+    async def select_unselect(self, choices: List[Card], min_: int, max_: int, cancelable: bool, hint: int) -> list[int]:
+        pass
+
+
+    @abstractmethod
+    async def select_counter(self, counter_type: int, quantity: int, cards: List[Card], counters: List[int]) -> List[int]:
+        pass
+
+
+    @abstractmethod
+    async def select_number(self, choices: List[int]) -> int:
+        pass
+
+
+    @abstractmethod
+    async def sort_card(self, cards: List[Card]) -> List[int]:
+        pass
+
+
+    @abstractmethod
+    async def announce_attr(self, choices: List[int], count: int) -> List[int]:
+        pass
+
+
+    @abstractmethod
+    async def announce_race(self, choices: List[int], count: int) -> List[int]:
+        pass
+
+
+    @abstractmethod
+    async def change_side(self, deck: Deck) -> None:
+        pass
+
+
+
+class SyncExecutorAdapter(AsyncDuelExecutor):
+    """ Runs a DuelExecutor as an AsyncDuelExecutor; each method returns at once. """
+    executor: DuelExecutor
+
+    def __init__(self, executor: DuelExecutor) -> None:
+        self.executor = executor
+
+
+    async def on_start(self) -> None:
+        return self.executor.on_start()
+
+
+    async def on_new_turn(self) -> None:
+        return self.executor.on_new_turn()
+
+
+    async def on_new_phase(self) -> None:
+        return self.executor.on_new_phase()
+
+
+    async def on_win(self, win: bool) -> None:
+        return self.executor.on_win(win)
+
+
+    async def rematch(self, win_on_match: bool) -> bool:
+        return self.executor.rematch(win_on_match)
+
+
+    async def select_hand(self) -> int:
+        return self.executor.select_hand()
+
+
+    async def select_tp(self) -> bool:
+        return self.executor.select_tp()
+
+
+    async def select_mainphase_action(self, main: MainPhase) -> int:
+        return self.executor.select_mainphase_action(main)
+
+
+    async def select_battle_action(self, battle: BattlePhase) -> int:
+        return self.executor.select_battle_action(battle)
+
+
+    async def select_effect_yn(self, card: Card, description: int) -> bool:
+        return self.executor.select_effect_yn(card, description)
+
+
+    async def select_yn(self) -> bool:
+        return self.executor.select_yn()
+
+
+    async def select_battle_replay(self) -> bool:
+        return self.executor.select_battle_replay()
+
+
+    async def select_option(self, options: List[int]) -> int:
+        return self.executor.select_option(options)
+
+
+    async def select_card(self, choices: List[Card], min_: int, max_: int, cancelable: bool, select_hint: int) -> List[int]:
+        return self.executor.select_card(choices, min_, max_, cancelable, select_hint)
+
+
+    async def select_tribute(self, choices: List[Card], min_: int, max_: int, cancelable: bool, select_hint: int) -> List[int]:
+        return self.executor.select_tribute(choices, min_, max_, cancelable, select_hint)
+
+
+    async def select_chain(self, choices: List[Card], descriptions: List[int], forced: bool) -> int:
+        return self.executor.select_chain(choices, descriptions, forced)
+
+
+    async def select_place(self, player: Player, choices: List[int]) -> int:
+        return self.executor.select_place(player, choices)
+
+
+    async def select_position(self, card_id: int, choices: List[int]) -> int:
+        return self.executor.select_position(card_id, choices)
+
+
+    async def select_sum(self, choices: List[Tuple[Card, int, int]], sum_value: int, min_: int, max_: int, must_just: bool, select_hint: int) -> List[int]:
+        return self.executor.select_sum(choices, sum_value, min_, max_, must_just, select_hint)
+
+
+    async def select_unselect(self, choices: List[Card], min_: int, max_: int, cancelable: bool, hint: int) -> list[int]:
+        return self.executor.select_unselect(choices, min_, max_, cancelable, hint)
+
+
+    async def select_counter(self, counter_type: int, quantity: int, cards: List[Card], counters: List[int]) -> List[int]:
+        return self.executor.select_counter(counter_type, quantity, cards, counters)
+
+
+    async def select_number(self, choices: List[int]) -> int:
+        return self.executor.select_number(choices)
+
+
+    async def sort_card(self, cards: List[Card]) -> List[int]:
+        return self.executor.sort_card(cards)
+
+
+    async def announce_attr(self, choices: List[int], count: int) -> List[int]:
+        return self.executor.announce_attr(choices, count)
+
+
+    async def announce_race(self, choices: List[int], count: int) -> List[int]:
+        return self.executor.announce_race(choices, count)
+
+
+    async def change_side(self, deck: Deck) -> None:
+        return self.executor.change_side(deck)
+
+
+
+class DelegatingExecutor(AsyncDuelExecutor):
+    """ AsyncDuelExecutor passing every decision to _decide with the method name and its
+    arguments, e.g. to run it elsewhere. The notifications do nothing unless overridden. """
+
+    @abstractmethod
+    async def _decide(self, method: str, *args: Any) -> Any:
+        raise NotImplementedError()
+
+
+    async def on_start(self) -> None:
+        pass
+
+
+    async def on_new_turn(self) -> None:
+        pass
+
+
+    async def on_new_phase(self) -> None:
+        pass
+
+
+    async def on_win(self, win: bool) -> None:
+        pass
+
+
+    async def change_side(self, deck: Deck) -> None:
+        pass
+
+
+    async def rematch(self, win_on_match: bool) -> bool:
+        return cast(bool, await self._decide('rematch', win_on_match))
+
+
+    async def select_hand(self) -> int:
+        return cast(int, await self._decide('select_hand'))
+
+
+    async def select_tp(self) -> bool:
+        return cast(bool, await self._decide('select_tp'))
+
+
+    async def select_mainphase_action(self, main: MainPhase) -> int:
+        return cast(int, await self._decide('select_mainphase_action', main))
+
+
+    async def select_battle_action(self, battle: BattlePhase) -> int:
+        return cast(int, await self._decide('select_battle_action', battle))
+
+
+    async def select_effect_yn(self, card: Card, description: int) -> bool:
+        return cast(bool, await self._decide('select_effect_yn', card, description))
+
+
+    async def select_yn(self) -> bool:
+        return cast(bool, await self._decide('select_yn'))
+
+
+    async def select_battle_replay(self) -> bool:
+        return cast(bool, await self._decide('select_battle_replay'))
+
+
+    async def select_option(self, options: List[int]) -> int:
+        return cast(int, await self._decide('select_option', options))
+
+
+    async def select_card(self, choices: List[Card], min_: int, max_: int, cancelable: bool, select_hint: int) -> List[int]:
+        return cast(List[int], await self._decide('select_card', choices, min_, max_, cancelable, select_hint))
+
+
+    async def select_tribute(self, choices: List[Card], min_: int, max_: int, cancelable: bool, select_hint: int) -> List[int]:
+        return cast(List[int], await self._decide('select_tribute', choices, min_, max_, cancelable, select_hint))
+
+
+    async def select_chain(self, choices: List[Card], descriptions: List[int], forced: bool) -> int:
+        return cast(int, await self._decide('select_chain', choices, descriptions, forced))
+
+
+    async def select_place(self, player: Player, choices: List[int]) -> int:
+        return cast(int, await self._decide('select_place', player, choices))
+
+
+    async def select_position(self, card_id: int, choices: List[int]) -> int:
+        return cast(int, await self._decide('select_position', card_id, choices))
+
+
+    async def select_sum(self, choices: List[Tuple[Card, int, int]], sum_value: int, min_: int, max_: int, must_just: bool, select_hint: int) -> List[int]:
+        return cast(List[int], await self._decide('select_sum', choices, sum_value, min_, max_, must_just, select_hint))
+
+
+    async def select_unselect(self, choices: List[Card], min_: int, max_: int, cancelable: bool, hint: int) -> list[int]:
+        return cast(list[int], await self._decide('select_unselect', choices, min_, max_, cancelable, hint))
+
+
+    async def select_counter(self, counter_type: int, quantity: int, cards: List[Card], counters: List[int]) -> List[int]:
+        return cast(List[int], await self._decide('select_counter', counter_type, quantity, cards, counters))
+
+
+    async def select_number(self, choices: List[int]) -> int:
+        return cast(int, await self._decide('select_number', choices))
+
+
+    async def sort_card(self, cards: List[Card]) -> List[int]:
+        return cast(List[int], await self._decide('sort_card', cards))
+
+
+    async def announce_attr(self, choices: List[int], count: int) -> List[int]:
+        return cast(List[int], await self._decide('announce_attr', choices, count))
+
+
+    async def announce_race(self, choices: List[int], count: int) -> List[int]:
+        return cast(List[int], await self._decide('announce_race', choices, count))
+
+
+
+def as_async(executor: Union[DuelExecutor, AsyncDuelExecutor]) -> AsyncDuelExecutor:
+    """ Return executor as an AsyncDuelExecutor, adapting a DuelExecutor. """
+    if isinstance(executor, AsyncDuelExecutor):
+        return executor
+    return SyncExecutorAdapter(executor)
@@ -0,0 +1,422 @@
+""" Stand-in EDOPro host, to run GameClient end to end on localhost.
+
+StandInHost accepts clients with asyncio and goes through the room handshake of a
+host: PLAYER_INFO and JOIN_GAME from the client, JOIN_GAME (carrying SERVER_HANDSHAKE)
+and TYPE_CHANGE in answer, UPDATE_DECK and READY back, then DUEL_START. It then plays
+a script of server messages, taken from a PacketLog or a .yrpX replay, and at each
+prompt waits for the decision of the client before going on. Decisions are checked
+by check_response() and against the recorded ones, and the time from each prompt to
+its decision is kept: the latency of the whole client, socket, decoding, GameManager
+and executor included.
+
+There is no duel engine behind the host: the script goes on whatever the client
+answers, so a decision other than the recorded one is only counted.
+
+Run ``python -m ygo_client.host LOG [--clients N]`` to play LOG to N scripted clients
+and print the decision latency.
+"""
+import asyncio
+import logging
+import struct
+import time
+from typing import Any, Callable, Iterator, NamedTuple, Optional, Sequence, Union
+
+from ygo_core.deck import Deck
+
+from ygo_client.client import GameClient
+from ygo_client.bus import Event, PROMPT_PREFIXES
+from ygo_client.manager import SERVER_HANDSHAKE
+from ygo_client.actions import Actions, encode_prompt
+from ygo_client.recorder import PacketLog, RECEIVED
+from ygo_client.replay import DECISIONS, ScriptedExecutor
+from ygo_client.yrp import Replay
+from ygo_client.connection.packet import Packet, HEADER_SIZE
+from ygo_client.connection.codec import Message
+from ygo_client.connection.enums.ctos_message import CtosMessage
+from ygo_client.connection.enums.stoc_message import StocMessage
+from ygo_client.connection.enums.game_message import GameMessage
+from ygo_client.connection.enums.error_type import ErrorType
+from ygo_client.connection.messages import (
+    GAME_MESSAGES, ErrorMsg, JoinGame, TypeChange, SelectCard, SelectTribute, SelectChain
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None # type: ignore
+
+
+logger = logging.getLogger(__name__)
+
+# server messages answered with a decision other than RESPONSE, and that decision
+STOC_PROMPTS: dict[int, int] = {
+    StocMessage.SELECT_HAND: CtosMessage.HAND_RESULT,
+    StocMessage.SELECT_TP: CtosMessage.TP_RESULT,
+    StocMessage.REMATCH: CtosMessage.REMATCH_RESPONSE,
+}
+GAME_PROMPTS: frozenset[int] = frozenset(msg_id for msg_id in GameMessage if msg_id.name.startswith(PROMPT_PREFIXES))
+# messages of the handshake, sent by the host itself rather than from a script
+HANDSHAKE: frozenset[int] = frozenset((StocMessage.JOIN_GAME, StocMessage.TYPE_CHANGE, StocMessage.DUEL_START))
+
+_HEADER: struct.Struct = struct.Struct('<H')
+_DECK_COUNTS: struct.Struct = struct.Struct('<II') # main and extra, side
+_JOIN_VERSION: slice = slice(49, 53) # in JOIN_GAME: version (u16), 6 bytes, password (40 bytes), version (u32)
+
+
+class Step(NamedTuple):
+    """ One server message of a script. """
+    frame: bytes # msg id followed by content
+    prompt: bool = False # answered by a decision of the client
+    expected: Optional[bytes] = None # the decision recorded in answer, msg id followed by content
+
+
+
+class HostStats:
+    """ Counters of the clients served by a StandInHost. """
+    clients: int = 0 # through the handshake
+    messages: int = 0 # of the script, sent
+    decisions: int = 0 # received in answer to prompts
+    invalid: int = 0 # refused by the check of the host
+    mismatches: int = 0 # differing from the recorded decision
+    timeouts: int = 0 # prompts left unanswered, ending the script of their client
+    latencies: list[float] # seconds from each prompt sent to its decision received
+
+    def __init__(self) -> None:
+        self.latencies = []
+
+
+    def percentile(self, q: float) -> float:
+        """ The latency q percent of the decisions came within, in seconds. """
+        if not self.latencies:
+            return 0.0
+        ordered: list[float] = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+
+class StandInHost:
+    """ Plays script to every client connecting, after the room handshake.\n
+    The messages of the script are sent as they are; at a prompt the host waits for the
+    decision of the client, skipping TIME_CONFIRM, CHAT and the like, before going on.
+    Decisions refused by check (check_response unless given) or differing from the
+    recorded one are counted in stats. DUEL_END is sent after the script unless it ends with one. """
+    script: Sequence[Step]
+    check: Callable[[bytes, bytes], bool] # (prompt, decision) -> legal
+    version: Optional[int] # the only client version let in, any if None
+    timeout: float # seconds to wait for a decision
+    stats: HostStats
+    _server: Optional[asyncio.AbstractServer] = None
+
+    def __init__(
+        self,
+        script: Sequence[Step],
+        check: Optional[Callable[[bytes, bytes], bool]]=None,
+        version: Optional[int]=None,
+        timeout: float=10.0
+    ) -> None:
+        self.script = script
+        self.check = check or check_response
+        self.version = version
+        self.timeout = timeout
+        self.stats = HostStats()
+
+
+    async def start(self, host: str='127.0.0.1', port: int=0) -> int:
+        """ Listen on host:port and return the port, chosen by the system if 0. """
+        self._server = await asyncio.start_server(self._serve, host, port)
+        return self._server.sockets[0].getsockname()[1] # type: ignore
+
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            if await self._handshake(reader, writer):
+                await self._play(reader, writer)
+        except Exception:
+            logger.exception('Serving a client failed.')
+        finally:
+            writer.close()
+
+
+    async def _handshake(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        """ Let the client in the room and start the duel; False if it did not follow the protocol. """
+        if await _expect(reader, CtosMessage.PLAYER_INFO) is None:
+            return False
+        join: Optional[bytes] = await _expect(reader, CtosMessage.JOIN_GAME)
+        if join is None or len(join) < _JOIN_VERSION.stop:
+            return False
+        version: int = int.from_bytes(join[_JOIN_VERSION], 'little')
+        if self.version is not None and version != self.version:
+            logger.warning('Client version %#x refused.', version)
+            _write(writer, StocMessage.ERROR_MSG, ErrorMsg(ErrorType.VERSIONERROR2, b'\0' * 3, self.version))
+            return False
+
+        _write(writer, StocMessage.JOIN_GAME, JoinGame(
+            lflist=0, rule=0, mode=0, duel_rule=5, nocheck_deck=False, noshuffle_deck=False, align=b'\0' * 3,
+            start_lp=8000, start_hand=5, draw_count=1, time_limit=180, align2=b'\0' * 4,
+            handshake=SERVER_HANDSHAKE, version=version, team1=1, team2=1, best_of=1,
+            duel_flag=0, forbidden_types=0, extra_rules=0
+        ))
+        _write(writer, StocMessage.TYPE_CHANGE, TypeChange(position=0))
+        deck: Optional[bytes] = await _expect(reader, CtosMessage.UPDATE_DECK)
+        if deck is None or len(deck) < 1 + _DECK_COUNTS.size:
+            return False
+        main_extra, side = _DECK_COUNTS.unpack_from(deck, 1)
+        if len(deck) != 1 + _DECK_COUNTS.size + 4 * (main_extra + side):
+            logger.warning('UPDATE_DECK of %d bytes for %d cards.', len(deck), main_extra + side)
+            return False
+        if await _expect(reader, CtosMessage.READY) is None:
+            return False
+        _write(writer, StocMessage.DUEL_START)
+        self.stats.clients += 1
+        return True
+
+
+    async def _play(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        stats: HostStats = self.stats
+        decisions: asyncio.Queue[Optional[bytes]] = asyncio.Queue()
+        receiver: asyncio.Task[None] = asyncio.create_task(_receive_decisions(reader, decisions))
+        try:
+            last: bytes = b''
+            for step in self.script:
+                last = step.frame
+                writer.write(_HEADER.pack(len(last)) + last)
+                stats.messages += 1
+                await writer.drain()
+                if not step.prompt:
+                    continue
+                start: float = time.perf_counter()
+                try:
+                    decision: Optional[bytes] = await asyncio.wait_for(decisions.get(), self.timeout)
+                except asyncio.TimeoutError:
+                    stats.timeouts += 1
+                    logger.warning('No decision to %s within %.1fs.', _name(last), self.timeout)
+                    return
+                if decision is None:
+                    return # the client left
+                stats.latencies.append(time.perf_counter() - start)
+                stats.decisions += 1
+                if not self.check(last, decision):
+                    stats.invalid += 1
+                    logger.warning('Illegal decision to %s: %s', _name(last), decision.hex(' '))
+                if step.expected is not None and decision != step.expected:
+                    stats.mismatches += 1
+
+            if last[:1] != bytes((StocMessage.DUEL_END,)):
+                _write(writer, StocMessage.DUEL_END)
+                await writer.drain()
+            try:
+                await asyncio.wait_for(asyncio.shield(receiver), self.timeout) # until the client closes
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            receiver.cancel()
+
+
+
+def is_prompt(frame: Union[bytes, memoryview]) -> bool:
+    """ Whether the client answers the server message frame (msg id followed by content) with a decision. """
+    if frame[0] == StocMessage.GAME_MSG:
+        return len(frame) > 1 and frame[1] in GAME_PROMPTS
+    return frame[0] in STOC_PROMPTS
+
+
+def script_from_log(log: PacketLog, game: Optional[int]=None) -> list[Step]:
+    """ The messages received in game (the whole log if None) with the decisions sent in answer,
+    but those of the handshake, which the host sends itself. """
+    steps: list[Step] = []
+    pending: list[int] = [] # prompts waiting for their recorded decision
+    for frame in log.frames() if game is None else log.game(game):
+        data: memoryview = frame.data
+        if frame.direction == RECEIVED:
+            if data[0] in HANDSHAKE:
+                continue
+            prompt: bool = is_prompt(data)
+            if prompt:
+                pending.append(len(steps))
+            steps.append(Step(data.tobytes(), prompt))
+        elif data[0] in DECISIONS and pending:
+            index: int = pending.pop(0)
+            steps[index] = steps[index]._replace(expected=data.tobytes())
+    return steps
+
+
+def script_from_replay(replay: Replay) -> list[Step]:
+    """ The messages of a .yrpX, with no decision to compare with. """
+    return [Step(frame, is_prompt(frame)) for frame in replay.frames()]
+
+
+def check_response(prompt: bytes, decision: bytes) -> bool:
+    """ Whether decision (msg id followed by content) is a legal answer to prompt.\n
+    The kind of the decision is checked for every prompt, and its value for SELECT_HAND,
+    the card selections, SELECT_CHAIN and, with numpy, the other prompts of the action
+    space of ygo_client.actions, whose answers beyond its ranges are then refused. """
+    if prompt[0] != StocMessage.GAME_MSG:
+        if decision[0] != STOC_PROMPTS.get(prompt[0]):
+            return False
+        return prompt[0] != StocMessage.SELECT_HAND or decision[1:2] in (b'\x01', b'\x02', b'\x03')
+    if decision[0] != CtosMessage.RESPONSE:
+        return False
+    check: Optional[Callable[[GameMessage, Any, memoryview], bool]] = _CHECKS.get(prompt[1])
+    if check is None:
+        return True
+    packet: Packet = Packet.from_bytes(prompt)
+    msg_id: GameMessage = GameMessage(packet.read_int(1))
+    return check(msg_id, GAME_MESSAGES[msg_id].decode(packet), memoryview(decision)[1:])
+
+
+def _check_cards(msg_id: GameMessage, message: Union[SelectCard, SelectTribute], content: memoryview) -> bool:
+    values: list[int] = [int.from_bytes(content[i:i+4], 'little', signed=True) for i in range(0, len(content) - 3, 4)]
+    if len(values) < 2 or len(values) != 2 + values[1]:
+        return False
+    selected: list[int] = values[2:]
+    if not selected:
+        return message.cancelable
+    return (
+        message.min <= len(selected) <= message.max
+        and len(set(selected)) == len(selected)
+        and all(0 <= i < len(message.choices) for i in selected)
+    )
+
+
+def _check_chain(msg_id: GameMessage, message: SelectChain, content: memoryview) -> bool:
+    value: int = int.from_bytes(content[:4], 'little', signed=True)
+    if value == -1:
+        return not message.forced or not message.choices
+    return 0 <= value < len(message.choices)
+
+
+def _check_actions(msg_id: GameMessage, message: Message, content: memoryview) -> bool:
+    actions: Optional[Actions] = encode_prompt(msg_id, message)
+    return actions is not None and actions.index_of(content) >= 0
+
+
+# each check takes the message class GAME_MESSAGES decodes its id to
+_CHECKS: dict[int, Callable[[GameMessage, Any, memoryview], bool]] = {
+    GameMessage.SELECT_CARD: _check_cards,
+    GameMessage.SELECT_TRIBUTE: _check_cards,
+    GameMessage.SELECT_CHAIN: _check_chain,
+}
+if np is not None:
+    for _msg_id in (GameMessage.SELECT_IDLE_CMD, GameMessage.SELECT_BATTLE_CMD, GameMessage.SELECT_PLACE, GameMessage.SELECT_DISFIELD):
+        _CHECKS[_msg_id] = _check_actions
+
+
+def _write(writer: asyncio.StreamWriter, msg_id: int, message: Optional[Message]=None) -> None:
+    packet: Packet = Packet(msg_id)
+    if message is not None:
+        message.encode(packet)
+    writer.write(packet.frame)
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> Optional[bytes]:
+    """ The next frame of the client (msg id followed by content), None once it has left. """
+    try:
+        size: int = _HEADER.unpack(await reader.readexactly(HEADER_SIZE))[0]
+        return await reader.readexactly(size) if size else None
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+
+
+async def _expect(reader: asyncio.StreamReader, msg_id: CtosMessage) -> Optional[bytes]:
+    frame: Optional[bytes] = await _read_frame(reader)
+    if frame is None or frame[0] != msg_id:
+        logger.warning('Expected %s from the client, got %s.', msg_id.name, None if frame is None else frame[0])
+        return None
+    return frame
+
+
+async def _receive_decisions(reader: asyncio.StreamReader, decisions: 'asyncio.Queue[Optional[bytes]]') -> None:
+    """ Queue the decisions of the client until it leaves, then None. """
+    while True:
+        frame: Optional[bytes] = await _read_frame(reader)
+        if frame is None:
+            break
+        if frame[0] in DECISIONS:
+            decisions.put_nowait(frame)
+    decisions.put_nowait(None)
+
+
+def _name(frame: bytes) -> str:
+    if frame[0] == StocMessage.GAME_MSG:
+        return GameMessage(frame[1]).name
+    return StocMessage(frame[0]).name
+
+
+
+class _RecordedDecisions:
+    """ Script of a ScriptedExecutor holding the recorded decision to the prompt being answered.\n
+    on_prompt, subscribed to every prompt, moves to the next decision, so the prompts
+    GameManager answers by itself do not shift the others. """
+    _decisions: Iterator[Optional[bytes]]
+    _current: Optional[bytes] = None
+
+    def __init__(self, script: Sequence[Step]) -> None:
+        self._decisions = iter([step.expected for step in script if step.prompt])
+
+
+    def on_prompt(self, event: Event) -> None:
+        self._current = next(self._decisions, None)
+
+
+    def __iter__(self) -> '_RecordedDecisions':
+        return self
+
+
+    def __next__(self) -> memoryview:
+        if self._current is None:
+            raise StopIteration
+        decision, self._current = self._current, None
+        return memoryview(decision)
+
+
+
+def scripted_client(script: Sequence[Step], deck: Optional[Deck]=None) -> GameClient:
+    """ A GameClient answering each prompt of script with the decision recorded for it. """
+    decisions: _RecordedDecisions = _RecordedDecisions(script)
+    executor: ScriptedExecutor = ScriptedExecutor(decisions)
+    client: GameClient = GameClient(executor, deck or Deck([], [], []))
+    client.subscribe(decisions.on_prompt, types=[*(StocMessage(i) for i in STOC_PROMPTS), *(GameMessage(i) for i in GAME_PROMPTS)])
+    client.subscribe(executor.on_select_sum, types=(GameMessage.SELECT_SUM,))
+    return client
+
+
+async def benchmark(path: str, clients: int=1, game: Optional[int]=None) -> HostStats:
+    """ Play the log at path to clients scripted clients at once and print the decision latency. """
+    with PacketLog(path) as log:
+        script: list[Step] = script_from_log(log, game)
+    host: StandInHost = StandInHost(script)
+    port: int = await host.start()
+    start: float = time.perf_counter()
+    try:
+        await asyncio.gather(*(
+            scripted_client(script).connect('127.0.0.1', port, f'client{i}', 0) for i in range(clients)
+        ))
+    finally:
+        await host.close()
+    elapsed: float = time.perf_counter() - start
+    stats: HostStats = host.stats
+    print(
+        f'{stats.clients} clients, {stats.messages} messages in {elapsed:.3f}s: {stats.messages/elapsed:.0f}/s, '
+        f'{stats.decisions} decisions, p50 {stats.percentile(50)*1e3:.3f}ms, p99 {stats.percentile(99)*1e3:.3f}ms, '
+        f'{stats.mismatches} mismatches, {stats.invalid} invalid, {stats.timeouts} timeouts'
+    )
+    return stats
+
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Play a recorded game to scripted clients on localhost.')
+    parser.add_argument('log', help='packet log written by PacketRecorder')
+    parser.add_argument('--clients', type=int, default=1, help='clients connecting at once')
+    parser.add_argument('--game', type=int, default=None, help='game of the log to play (default: all)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    asyncio.run(benchmark(args.log, args.clients, args.game))
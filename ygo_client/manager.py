@@ -1,5 +1,6 @@
 import logging
-from typing import Optional
+import struct
+from typing import Callable, ClassVar, Iterable, Optional, Sequence, Union
 
 from ygo_core.deck import Deck
 from ygo_core.duel import Duel, Card
@@ -8,47 +9,161 @@ from ygo_core.phase import MainPhase, BattlePhase
 from ygo_core.card import Location, Position, Race, Attribute, Type
 from ygo_core.enums import Player, Phase, Query
 
-from ygo_client.executor import DuelExecutor
+from ygo_client.executor import DuelExecutor, AsyncDuelExecutor, as_async
+from ygo_client.tracking import LOCATIONS, DuelListener, StateHash, index_of, removed_index
 from ygo_client.connection.packet import Packet
 from ygo_client.connection.enums.ctos_message import CtosMessage
+from ygo_client.connection.enums.game_message import GameMessage
 from ygo_client.connection.enums.error_type import ErrorType
+from ygo_client.connection.messages import (
+    Empty, Payload, ErrorMsg, JoinGame, TypeChange, TimeLimit, PlayerEnter,
+    Hint, Start, PlayerOnly, NewPhase,
+    SelectIdleCmd, SelectBattleCmd, SelectEffectYn, SelectYesNo, SelectOption, SelectCard,
+    SelectChain, SelectPlace, SelectPosition, SelectTribute, SelectCounter, SelectSum,
+    SelectUnselect, Announce, AnnounceNumber,
+    UpdateData, UpdateCard, ShuffleCards, ShuffleSetCard, SortCard,
+    Move, PosChange, Swap, Summoning, Chaining, ChainIndex, BecomeTarget, ConfirmCards, Draw, LifePoints, CardPair, Unequip, Counter,
+    LocInfo, CardLocation, RepositionableCard, ActivatableCard, CARD_INFO_POSITION, CHAIN_CARD_DESCRIPTION, SUM_CARD_VALUE1, SUM_CARD_VALUE2
+)
 
 
 logger = logging.getLogger(__name__)
 
 SERVER_HANDSHAKE: int = 4043399681
 
+_U32: struct.Struct = struct.Struct('<I')
+_LINK: struct.Struct = struct.Struct('<II')
+_LOC_INFO: struct.Struct = LocInfo._struct
+
+_DECK, _HAND, _EXTRA = 0x01, 0x02, 0x40
+
+
+# queries holding one uint32 stored as is (or through the given type) in a Card attribute
+_SIMPLE_QUERIES: dict[int, tuple[str, Optional[type]]] = {
+    Query.ID: ('id', None),
+    Query.POSITION: ('position', Position),
+    Query.ALIAS: ('arias', None),
+    Query.TYPE: ('type', Type),
+    Query.LEVEL: ('level', None),
+    Query.RANK: ('rank', None),
+    Query.ATTRIBUTE: ('attribute', Attribute),
+    Query.RACE: ('race', Race),
+    Query.ATTACK: ('attack', None),
+    Query.DEFENCE: ('defence', None),
+    Query.BASE_ATTACK: ('base_attack', None),
+    Query.BASE_DEFENCE: ('base_defence', None),
+    Query.REASON: ('reason', None),
+    Query.STATUS: ('status', None),
+    Query.LSCALE: ('lscale', None),
+    Query.RSCALE: ('rscale', None),
+}
+
 class GameManager:
+    """ Tracks the duel and asks the executor for decisions.\n
+    Handlers calling the executor are coroutines; a DuelExecutor is adapted to
+    AsyncDuelExecutor so both kinds are awaited the same way. The listeners are told
+    of every change the handlers make to the cards, LP, turn and phase of duel. """
     deck: Deck
-    executor: DuelExecutor
+    executor: AsyncDuelExecutor
     duel: Duel
+    listeners: list[DuelListener]
     _select_hint: int = 0
+    chain_solving: Optional[int] = None # index of the chain link being solved
+    _hash: Optional[StateHash] = None # kept from the first read of state_hash on
+    replay: Optional[bytes] = None # the last REPLAY payload: a .yrp file
+    new_replay: Optional[bytes] = None # the last NEW_REPLAY payload: a .yrpX file
 
 
-    def __init__(self, deck: Deck, executor: DuelExecutor) -> None:
+    def __init__(self, deck: Deck, executor: Union[DuelExecutor, AsyncDuelExecutor]) -> None:
         self.deck = deck
-        self.executor = executor
+        self.executor = as_async(executor)
         self.duel = Duel()
+        self.listeners = []
+
+
+    @property
+    def state_hash(self) -> int:
+        """ 64-bit Zobrist hash of the observable state: the id and position of the cards
+        in each location, LP, phase and turn player (see StateHash).\n
+        The first read hashes all of duel and adds a StateHash to the listeners, which
+        updates the hash with each change from then on. """
+        if self._hash is None or self._hash.duel is not self.duel:
+            if self._hash is not None:
+                self.remove_listener(self._hash)
+            self._hash = StateHash(self.duel)
+            self.add_listener(self._hash)
+        return self._hash.value
+
+
+    def add_listener(self, listener: DuelListener) -> None:
+        """ Tell listener of the changes made to duel from now on. """
+        self.listeners.append(listener)
+
+
+    def remove_listener(self, listener: DuelListener) -> None:
+        self.listeners.remove(listener)
+
+
+    def _index(self, card: Card, player: Player, location: int, hint: int) -> int:
+        """ The index of card in the cards of player at location, or -1 if they are not tracked. """
+        if not self.listeners or location not in LOCATIONS:
+            return -1
+        return index_of(self.duel.get_cards(player, Location(location)), card, hint)
+
+
+    def _reveal(self, card: Card, player: Player, location: int, index: int, card_id: int) -> None:
+        """ Set the id of card, found at index of location. """
+        if card.id != card_id:
+            card.id = card_id
+            self._changed(card, player, location, index)
+
 
+    def _changed(self, card: Card, player: Player, location: int, hint: int) -> None:
+        index: int = self._index(card, player, location, hint)
+        if index >= 0:
+            for listener in self.listeners:
+                listener.on_card_changed(player, location, index, card)
+        else: # an overlay unit, which is not tracked
+            self._duel_changed((card,))
 
-    def on_error_msg(self, packet: Packet) -> Optional[Packet]:
-        error_type: int = packet.read_int(1)
-        if error_type is ErrorType.JOINERROR:
+
+    def _added(self, card: Card, player: Player, location: int, hint: int) -> None:
+        index: int = self._index(card, player, location, hint)
+        if index >= 0:
+            for listener in self.listeners:
+                listener.on_card_added(player, location, index, card)
+
+
+    def _removed(self, card: Card, player: Player, location: int, index: int) -> None:
+        """ index is that of card before its removal, as given by _index. """
+        if index >= 0:
+            for listener in self.listeners:
+                listener.on_card_removed(player, location, index, card)
+
+
+    def _duel_changed(self, cards: Optional[Sequence[Card]]=()) -> None:
+        """ Tell of a change not told otherwise, to cards (None: to any card). """
+        for listener in self.listeners:
+            listener.on_duel_changed(cards)
+
+
+    def on_error_msg(self, message: ErrorMsg) -> Optional[Packet]:
+        error_type: int = message.error_type
+        if error_type == ErrorType.JOINERROR:
             logger.error('Join Error')
 
-        elif error_type is ErrorType.DECKERROR:
+        elif error_type == ErrorType.DECKERROR:
             logger.error('Deck Error')
 
-        elif error_type is ErrorType.SIDEERROR:
+        elif error_type == ErrorType.SIDEERROR:
             logger.error('Side Error')
         
-        elif error_type is ErrorType.VERSIONERROR:
+        elif error_type == ErrorType.VERSIONERROR:
             logger.error('Version Error')
 
-        elif error_type is ErrorType.VERSIONERROR2:
+        elif error_type == ErrorType.VERSIONERROR2:
             logger.critical('Version Error')
-            unknown = packet.read_int(3)
-            version = packet.read_int(4)
+            version = message.version
             logger.critical(f'Host Version: {version & 0xff}.{(version >> 8) & 0xff}.{(version >> 16) & 0xff}.{(version >> 24) & 0xff}')
         
         else:
@@ -56,321 +171,258 @@ class GameManager:
         return None
 
 
-    def on_select_hand(self, packet: Packet) -> Optional[Packet]:
-        hand: int = self.executor.select_hand()
+    async def on_select_hand(self, message: Empty) -> Optional[Packet]:
+        hand: int = await self.executor.select_hand()
         assert hand in {1, 2, 3}
         reply: Packet = Packet(CtosMessage.HAND_RESULT)
         reply.write_int(hand, byte_size=1)
         return reply
 
 
-    def on_select_tp(self, packet: Packet) -> Optional[Packet]:
-        has_selected_first: bool = self.executor.select_tp()
+    async def on_select_tp(self, message: Empty) -> Optional[Packet]:
+        has_selected_first: bool = await self.executor.select_tp()
         reply: Packet = Packet(CtosMessage.TP_RESULT)
         reply.write_bool(has_selected_first)
         return reply
 
 
-    def on_change_side(self, packet: Packet) -> Optional[Packet]:
-        self.executor.change_side(self.deck)
-        reply: Packet = Packet(CtosMessage.UPDATE_DECK)
+    async def on_change_side(self, message: Empty) -> Optional[Packet]:
+        await self.executor.change_side(self.deck)
+        cards: list[int] = self.deck.main + self.deck.extra + self.deck.side
+        reply: Packet = Packet(CtosMessage.UPDATE_DECK, capacity=4*(2+len(cards)))
         reply.write_int(self.deck.count_main + self.deck.count_extra)
         reply.write_int(self.deck.count_side)
-        for card in self.deck.main + self.deck.extra + self.deck.side:
+        for card in cards:
             reply.write_int(card)
         return reply
 
 
-    def on_joined_game(self, packet: Packet) -> Optional[Packet]:
-        lflist: int = packet.read_int(4)
-        rule: int = packet.read_int(1)
-        mode: int = packet.read_int(1)
-        duel_rule: int = packet.read_int(1)
-        nocheck_deck: bool = packet.read_bool()
-        noshuffle_deck: bool = packet.read_bool()
-        align: bytes = packet.read_bytes(3)
-        start_lp = packet.read_int(4)
-        start_hand: int = packet.read_int(1)
-        draw_count: int = packet.read_int(1)
-        time_limit: int = packet.read_int(2)
-        align = packet.read_bytes(4)
-        handshake: int = packet.read_int(4)
-        version: int = packet.read_int(4)
-        team1: int = packet.read_int(4)
-        team2: int = packet.read_int(4)
-        best_of: int = packet.read_int(4)
-        duel_flag: int = packet.read_int(4)
-        forbidden_types: int = packet.read_int(4)
-        extra_rules: int = packet.read_int(4)
-
-        if handshake != SERVER_HANDSHAKE:
+    def on_joined_game(self, message: JoinGame) -> Optional[Packet]:
+        if message.handshake != SERVER_HANDSHAKE:
             logger.error('handshake error')
             raise ConnectionRefusedError('Handshake is failed')
         
-        reply: Packet = Packet(CtosMessage.UPDATE_DECK)
+        cards: list[int] = self.deck.main + self.deck.extra + self.deck.side
+        reply: Packet = Packet(CtosMessage.UPDATE_DECK, capacity=4*(2+len(cards)))
         reply.write_int(self.deck.count_main + self.deck.count_extra)
         reply.write_int(self.deck.count_side)
-        for card in self.deck.main + self.deck.extra + self.deck.side:
+        for card in cards:
             reply.write_int(card)
         return reply
 
 
-    def on_type_changed(self, packet: Packet) -> Optional[Packet]:
+    def on_type_changed(self, message: TypeChange) -> Optional[Packet]:
         is_spectator: int = 7
-        position = packet.read_int(1)
+        position = message.position
         if position < 0 or position >= is_spectator:
             return None
 
         return Packet(CtosMessage.READY)
 
 
-    def on_duel_start(self, packet: Packet) -> Optional[Packet]:
+    def on_duel_start(self, message: Empty) -> Optional[Packet]:
+        return None
+
+
+    def on_duel_end(self, message: Empty) -> Optional[Packet]:
         return None
 
 
-    def on_duel_end(self, packet: Packet) -> Optional[Packet]:
+    def on_replay(self, message: Payload) -> Optional[Packet]:
+        self.replay = message.data.tobytes()
         return None
 
 
-    def on_replay(self, packet: Packet) -> Optional[Packet]:
+    def on_new_replay(self, message: Payload) -> Optional[Packet]:
+        self.new_replay = message.data.tobytes()
         return None
 
 
-    def on_timelimit(self, packet: Packet) -> Optional[Packet]:
-        player: Player = self.duel.players[packet.read_int(1)]
+    async def on_timelimit(self, message: TimeLimit) -> Optional[Packet]:
+        player: Player = self.duel.players[message.player]
         if player == Player.ME:  
+            await self.executor.on_timelimit(message.left_time)
             return Packet(CtosMessage.TIME_CONFIRM)
         return None
 
-    def on_chat(self, packet: Packet) -> Optional[Packet]:
+    def on_chat(self, message: Empty) -> Optional[Packet]:
         return None
 
 
-    def on_player_enter(self, packet: Packet) -> Optional[Packet]:
-        name: str = packet.read_str(40)
+    def on_player_enter(self, message: PlayerEnter) -> Optional[Packet]:
         return None
 
 
-    def on_player_change(self, packet: Packet) -> Optional[Packet]:
+    def on_player_change(self, message: Empty) -> Optional[Packet]:
         return None
 
 
-    def on_watch_change(self, packet: Packet) -> Optional[Packet]:
+    def on_watch_change(self, message: Empty) -> Optional[Packet]:
         return None
 
 
-    def on_rematch(self, packet: Packet) -> Optional[Packet]:
+    async def on_rematch(self, message: Empty) -> Optional[Packet]:
         win = False
-        ans: bool = self.executor.rematch(win) 
+        ans: bool = await self.executor.rematch(win) 
         reply: Packet = Packet(CtosMessage.REMATCH_RESPONSE)
         reply.write_bool(ans)
         return reply
 
 
 
-    def on_retry(self, packet: Packet) -> Optional[Packet]:
+    def on_retry(self, message: Empty) -> Optional[Packet]:
         raise NotImplementedError()
 
 
-    def on_hint(self, packet: Packet) -> Optional[Packet]:
+    def on_hint(self, message: Hint) -> Optional[Packet]:
         HINT_EVENT = 1
         HINT_MESSAGE = 2
         HINT_SELECT = 3
         MAINPHASE_END = 23
         BATTLEING = 24
-        hint_type: int = packet.read_int(1)
-        player_msg_sent_to: Player = self.duel.players[packet.read_int(1)]
-        data: int = packet.read_int(8)
+        hint_type: int = message.hint_type
+        data: int = message.data
         if hint_type == HINT_EVENT:
             if data == MAINPHASE_END:
                 self.duel.at_mainphase_end()
+                self._duel_changed(None)
                 
             elif data == BATTLEING:
                 self.duel.field[0].under_attack = False
                 self.duel.field[1].under_attack = False
+                self._duel_changed()
 
         if hint_type == HINT_SELECT:
             self._select_hint = data
         return None
 
 
-    def on_start(self, packet: Packet) -> Optional[Packet]:
-        is_first = not packet.read_bool()
+    async def on_start(self, message: Start) -> Optional[Packet]:
+        is_first = not message.player_type
         first_player: Player = Player.ME if is_first else Player.OPPONENT
         self.duel.on_start(first_player)
 
-        for player in self.duel.players:
-            self.duel.on_lp_update(player, packet.read_int(4))
+        for player, lp in zip(self.duel.players, (message.lp_0, message.lp_1)):
+            self.duel.on_lp_update(player, lp)
         
-        for player in self.duel.players:
-            num_of_main: int = packet.read_int(2)
-            num_of_extra: int = packet.read_int(2)
-            self.duel.set_deck(player, num_of_main, num_of_extra)
+        for player, deck in zip(self.duel.players, (message.deck_0, message.deck_1)):
+            self.duel.set_deck(player, deck.main, deck.extra)
+        for listener in self.listeners:
+            listener.on_reset()
 
-        self.executor.on_start()
+        await self.executor.on_start()
         return None
 
 
-    def on_win(self, packet: Packet) -> Optional[Packet]:
-        win: bool = self.duel.players[packet.read_int(1)] == Player.ME
-        self.executor.on_win(win)
+    async def on_win(self, message: PlayerOnly) -> Optional[Packet]:
+        win: bool = self.duel.players[message.player] == Player.ME
+        await self.executor.on_win(win)
         return None
 
 
-    def on_new_turn(self, packet: Packet) -> Optional[Packet]:
-        turn_player: Player = self.duel.players[packet.read_int(1)]
+    async def on_new_turn(self, message: PlayerOnly) -> Optional[Packet]:
+        turn_player: Player = self.duel.players[message.player]
         self.duel.on_new_turn(turn_player)
-        self.executor.on_new_turn()
+        for listener in self.listeners:
+            listener.on_new_turn()
+        self._duel_changed(None) # the flags of the turn are reset
+        await self.executor.on_new_turn()
         return None
 
     
-    def on_new_phase(self, packet: Packet) -> Optional[Packet]:
-        phase: Phase = packet.read_phase()
+    async def on_new_phase(self, message: NewPhase) -> Optional[Packet]:
+        phase: Phase = Phase(message.phase)
         self.duel.on_new_phase(phase)
-        self.executor.on_new_phase()
+        for listener in self.listeners:
+            listener.on_new_phase()
+        await self.executor.on_new_phase()
         return None
 
 
-    def on_select_idle_cmd(self, packet: Packet) -> Packet:
-        player_msg_sent_to: Player = self.duel.players[packet.read_int(1)] 
+    async def on_select_idle_cmd(self, message: SelectIdleCmd) -> Packet:
         main: MainPhase = MainPhase()
-        for card_list in main:
-            if card_list is main.activatable: 
-                for _ in range(packet.read_int(4)):
-                    card_id: int = packet.read_id()
-                    controller: Player = self.duel.players[packet.read_int(1)]
-                    location: Location = packet.read_location()
-                    index: int = packet.read_int(4)
-                    description: int = packet.read_int(8)
-                    operation_type: int = packet.read_int(1)
-
-                    card: Card = self.duel.get_card(controller, location, index)
-                    card.id = card_id
-                    main.activatable.append(card)
-                    main.activation_descs.append(description)
-
-            else:
-                for _ in range(packet.read_int(4)):
-                    card_id = packet.read_id()
-                    controller = self.duel.players[packet.read_int(1)]
-                    location = packet.read_location()
-                    index = packet.read_int(4) if card_list is not main.repositionable else packet.read_int(1)
-
-                    card = self.duel.get_card(controller, location, index)
-                    card.id = card_id
-                    card_list.append(card)
-
-        main.can_battle = packet.read_bool()
-        main.can_end = packet.read_bool()
-        can_shuffle = packet.read_bool()
+        records: tuple[Sequence[Union[CardLocation, RepositionableCard, ActivatableCard]], ...] = (
+            message.summonable, message.special_summonable, message.repositionable,
+            message.monster_setable, message.spell_setable, message.activatable
+        )
+        for card_list, cards in zip(main, records):
+            for record in cards:
+                player: Player = self.duel.players[record.controller]
+                card: Card = self.duel.get_card(player, Location(record.location), record.index)
+                self._reveal(card, player, record.location, record.index, record.card_id)
+                card_list.append(card)
+        main.activation_descs.extend(record.description for record in message.activatable)
+
+        main.can_battle = message.can_battle
+        main.can_end = message.can_end
         
-        selected: int = self.executor.select_mainphase_action(main)
+        selected: int = await self.executor.select_mainphase_action(main)
         reply: Packet = Packet(CtosMessage.RESPONSE)
         reply.write_int(selected)
         return reply
 
 
-    def on_select_battle_cmd(self, packet: Packet) -> Optional[Packet]:
-        player_msg_sent_to: Player = self.duel.players[packet.read_int(1)]
+    async def on_select_battle_cmd(self, message: SelectBattleCmd) -> Optional[Packet]:
         battle: BattlePhase = BattlePhase()
 
         # activatable cards
-        for _ in range(packet.read_int(4)):
-            card_id: int = packet.read_id()
-            controller: Player = self.duel.players[packet.read_int(1)]
-            location: Location = packet.read_location()
-            index: int = packet.read_int(4)
-            description: int = packet.read_int(8)
-            operation_type: bytes = packet.read_bytes(1)
-
-            card: Card = self.duel.get_card(controller, location, index)
-            card.id = card_id
+        for activatable in message.activatable:
+            card: Card = self.duel.get_card(self.duel.players[activatable.controller], Location(activatable.location), activatable.index)
+            self._reveal(card, self.duel.players[activatable.controller], activatable.location, activatable.index, activatable.card_id)
             battle.activatable.append(card)
-            battle.activation_descs.append(description)
+            battle.activation_descs.append(activatable.description)
 
         # attackable cards
-        for _ in range(packet.read_int(4)):
-            card_id = packet.read_id()
-            controller = self.duel.players[packet.read_int(1)]
-            location = packet.read_location()
-            index = packet.read_int(1)
-            direct_attackable: bool = packet.read_bool()
-
-            card = self.duel.get_card(controller, location, index)
-            card.id = card_id
-            card.can_direct_attack = direct_attackable
+        for attackable in message.attackable:
+            card = self.duel.get_card(self.duel.players[attackable.controller], Location(attackable.location), attackable.index)
+            self._reveal(card, self.duel.players[attackable.controller], attackable.location, attackable.index, attackable.card_id)
+            card.can_direct_attack = attackable.direct_attackable
             card.attacked = False
             battle.attackable.append(card)
 
-        battle.can_main2 = packet.read_bool()
-        battle.can_end = packet.read_bool()
+        self._duel_changed(battle.attackable)
+        battle.can_main2 = message.can_main2
+        battle.can_end = message.can_end
 
-        selected: int = self.executor.select_battle_action(battle)
+        selected: int = await self.executor.select_battle_action(battle)
         reply: Packet = Packet(CtosMessage.RESPONSE)
         reply.write_int(selected)
         return reply
 
 
-    def on_select_effect_yn(self, packet: Packet) -> Optional[Packet]:
-        player_msg_sent_to: Player = self.duel.players[packet.read_int(1)]
-        card_id: int = packet.read_id()
-        controller: Player = self.duel.players[packet.read_int(1)]
-        location: Location = packet.read_location()
-        index: int = packet.read_int(4)
-        position: Position = packet.read_position()
-        description: int = packet.read_int(8)
-
-        card: Card = self.duel.get_card(controller, location, index)
-        card.id = card_id
-        ans: bool = self.executor.select_effect_yn(card, description)
+    async def on_select_effect_yn(self, message: SelectEffectYn) -> Optional[Packet]:
+        info = message.card
+        card: Card = self.duel.get_card(self.duel.players[info.controller], Location(info.location), info.index)
+        self._reveal(card, self.duel.players[info.controller], info.location, info.index, info.card_id)
+        ans: bool = await self.executor.select_effect_yn(card, message.description)
 
         reply: Packet = Packet(CtosMessage.RESPONSE)
         reply.write_int(ans)
         return reply
 
 
-    def on_select_yesno(self, packet: Packet) -> Optional[Packet]:
+    async def on_select_yesno(self, message: SelectYesNo) -> Optional[Packet]:
         REPLAY_BATTLE = 30
-        player_msg_sent_to: int = self.duel.players[packet.read_int(1)]
-        desc: int = packet.read_int(8)
-        if desc == REPLAY_BATTLE:
-            ans: bool = self.executor.select_battle_replay()
+        if message.description == REPLAY_BATTLE:
+            ans: bool = await self.executor.select_battle_replay()
         else:
-            ans = self.executor.select_yn()
+            ans = await self.executor.select_yn()
         reply: Packet = Packet(CtosMessage.RESPONSE)
         reply.write_bool(ans)
         return reply
 
 
-    def on_select_option(self, packet: Packet) -> Optional[Packet]:
-        player_msg_sent_to: int = packet.read_int(1)
-        num_of_options: int = packet.read_int(1)
-        options: list[int] = [packet.read_int(8) for _ in range(num_of_options)]
-        ans: int = self.executor.select_option(options)
+    async def on_select_option(self, message: SelectOption) -> Optional[Packet]:
+        ans: int = await self.executor.select_option(message.options)
 
         reply: Packet = Packet(CtosMessage.RESPONSE)
         reply.write_int(ans)
         return reply
 
 
-    def on_select_card(self, packet: Packet) -> Optional[Packet]:
-        player_msg_sent_to: Player = self.duel.players[packet.read_int(1)]
-        cancelable: bool = packet.read_bool()
-        min_: int = packet.read_int(4) # min number of cards to select
-        max_: int = packet.read_int(4) # max number of cards to select
-
-        choices: list[Card] = []
-        for _ in range(packet.read_int(4)):
-            card_id: int = packet.read_id()
-            controller: Player = self.duel.players[packet.read_int(1)]
-            location: Location = packet.read_location()
-            index: int = packet.read_int(4)
-            position: Position = packet.read_position()
-            card: Card = self.duel.get_card(controller, location, index)
-            card.id = card_id
-            choices.append(card)
-
-        selected: list[int] = self.executor.select_card(choices, min_, max_, cancelable, self._select_hint)
+    async def on_select_card(self, message: SelectCard) -> Optional[Packet]:
+        choices: list[Card] = self._get_cards(message.choices)
+        selected: list[int] = await self.executor.select_card(choices, message.min, message.max, message.cancelable, self._select_hint)
 
         reply: Packet = Packet(CtosMessage.RESPONSE)
         reply.write_int(0)
@@ -380,42 +432,21 @@ class GameManager:
         return reply
 
 
-    def on_select_chain(self, packet: Packet) -> Optional[Packet]:
-        player_msg_sent_to: Player = self.duel.players[packet.read_int(1)]
-        specount: int = packet.read_int(1)
-        forced: bool = packet.read_bool()
-        hint1: int = packet.read_int(4)
-        hint2: int = packet.read_int(4)
-
-        choices: list[Card] = []
-        descriptions: list[int] = []
-
-        for _ in range(packet.read_int(4)):
-            card_id = packet.read_int(4)
-            controller: Player = self.duel.players[packet.read_int(1)]
-            location: Location = packet.read_location()
-            index: int = packet.read_int(4)
-            position: Position = packet.read_position()
-            description: int = packet.read_int(8)
-            card: Card = self.duel.get_card(controller, location, index)
-            card.id = card_id
-            choices.append(card)
-            descriptions.append(description)
-            operation_type: bytes = packet.read_bytes(1)
+    async def on_select_chain(self, message: SelectChain) -> Optional[Packet]:
+        choices: list[Card] = self._get_cards(message.choices)
+        descriptions: list[int] = [record[CHAIN_CARD_DESCRIPTION] for record in message.choices]
 
         reply: Packet = Packet(CtosMessage.RESPONSE)
         if len(choices) == 0:
             reply.write_int(-1)
         else:
-            selected: int = self.executor.select_chain(choices, descriptions, forced)
+            selected: int = await self.executor.select_chain(choices, descriptions, message.forced)
             reply.write_int(selected)
         return reply
 
 
-    def on_select_position(self, packet: Packet) -> Optional[Packet]:
-        player_msg_sent_to: Player = self.duel.players[packet.read_int(1)]
-        card_id: int = packet.read_id()
-        selectable_position: int = packet.read_int(1)
+    async def on_select_position(self, message: SelectPosition) -> Optional[Packet]:
+        selectable_position: int = message.positions
 
         POSITION: list[Position.enum] = [
             Position.enum.FASEUP_ATTACK, 
@@ -425,31 +456,16 @@ class GameManager:
         ]
         
         choices: list[int] = [int(pos) for pos in POSITION if selectable_position & pos]
-        selected: int = self.executor.select_position(card_id, choices)
+        selected: int = await self.executor.select_position(message.card_id, choices)
 
         reply: Packet = Packet(CtosMessage.RESPONSE)
         reply.write_int(selected)
         return reply
 
 
-    def on_select_tribute(self, packet: Packet) -> Packet:
-        player_msg_sent_to: Player = self.duel.players[packet.read_int(1)]
-        cancelable: bool = packet.read_bool()
-        min_: int = packet.read_int(4) # min number of cards to select
-        max_: int = packet.read_int(4) # max number of cards to select
-
-        choices: list[Card] = []
-        for _ in range(packet.read_int(4)):
-            card_id: int = packet.read_id()
-            controller: Player = self.duel.players[packet.read_int(1)]
-            location: Location = packet.read_location()
-            index: int = packet.read_int(4)
-            packet.read_bytes(1)
-            card: Card = self.duel.get_card(controller, location, index)
-            card.id = card_id
-            choices.append(card)
-
-        selected: list[int] = self.executor.select_tribute(choices, min_, max_, cancelable, self._select_hint)
+    async def on_select_tribute(self, message: SelectTribute) -> Packet:
+        choices: list[Card] = self._get_cards(message.choices)
+        selected: list[int] = await self.executor.select_tribute(choices, message.min, message.max, message.cancelable, self._select_hint)
 
         reply: Packet = Packet(CtosMessage.RESPONSE)
         reply.write_int(0)
@@ -459,27 +475,17 @@ class GameManager:
         return reply
 
 
-    def on_select_counter(self, packet: Packet) -> Optional[Packet]:
-        player_msg_sent_to: Player = self.duel.players[packet.read_int(1)]
-        counter_type: int = packet.read_int(2)
-        quantity: int = packet.read_int(4)
-
+    async def on_select_counter(self, message: SelectCounter) -> Optional[Packet]:
         cards: list[Card] = []
         counters: list[int] = []
 
-        for _ in range(packet.read_int(1)):
-            card_id: int = packet.read_id()
-            controller: Player = self.duel.players[packet.read_int(1)]
-            location: Location = packet.read_location()
-            index: int = packet.read_int(1)
-            num_of_counter: int = packet.read_int(2)
-
-            card: Card = self.duel.get_card(controller, location, index)
-            card.id = card_id
+        for info in message.cards:
+            card: Card = self.duel.get_card(self.duel.players[info.controller], Location(info.location), info.index)
+            self._reveal(card, self.duel.players[info.controller], info.location, info.index, info.card_id)
             cards.append(card)
-            counters.append(num_of_counter)
+            counters.append(info.count)
 
-        used: list[int] = self.executor.select_counter(counter_type, quantity, cards, counters)
+        used: list[int] = await self.executor.select_counter(message.counter_type, message.quantity, cards, counters)
 
         reply: Packet = Packet(CtosMessage.RESPONSE)
         for i in used:
@@ -487,53 +493,31 @@ class GameManager:
         return reply
 
 
-    def on_select_sum(self, packet: Packet) -> Optional[Packet]:
-        player_msg_sent_to: Player = self.duel.players[packet.read_int(1)]
-        must_just: bool = not packet.read_bool()
-        sum_value: int = packet.read_int(4)
-        min_: int = packet.read_int(4)
-        max_: int = packet.read_int(4)
+    async def on_select_sum(self, message: SelectSum) -> Optional[Packet]:
+        must_just: bool = not message.select_mode
+        sum_value: int = message.sum_value
 
-        must_selected: list[Card] = []
-        choices: list[tuple[Card, int, int]] = []
+        must_selected: list[Card] = self._get_cards(message.must_selected)
+        sum_value -= sum(max(record[SUM_CARD_VALUE1], record[SUM_CARD_VALUE2]) for record in message.must_selected)
 
-        for _ in range(packet.read_int(4)):
-            card_id: int = packet.read_id()
-            controller: Player = self.duel.players[packet.read_int(1)]
-            location: Location = packet.read_location()
-            index: int = packet.read_int(4)
-            card: Card = self.duel.get_card(controller, location, index)
-            card.id = card_id
-            values: tuple[int, int] = (packet.read_int(2), packet.read_int(2))
-            must_selected.append(card)
-            sum_value -= max(values)
-
-        for _ in range(packet.read_int(4)):
-            card_id = packet.read_id()
-            controller = self.duel.players[packet.read_int(1)]
-            location = packet.read_location()
-            index = packet.read_int(4)
-            card = self.duel.get_card(controller, location, index)
-            card.id = card_id
-            values = (packet.read_int(2), packet.read_int(2))
-            choices.append((card, *values))
+        choices: list[tuple[Card, int, int]] = [
+            (card, record[SUM_CARD_VALUE1], record[SUM_CARD_VALUE2]) for card, record in zip(self._get_cards(message.choices), message.choices)
+        ]
 
-        selected: list[int] = self.executor.select_sum(choices, sum_value, min_, max_, must_just, self._select_hint)
+        selected: list[int] = await self.executor.select_sum(choices, sum_value, message.min, message.max, must_just, self._select_hint)
 
         reply: Packet = Packet(CtosMessage.RESPONSE)
         reply.write_bytes(b'\x00\x01\x00\x00')
         reply.write_int(len(must_selected)+len(selected), byte_size=4)
         for _ in must_selected:
-            packet.write_int(0, byte_size=1)
+            reply.write_int(0, byte_size=1)
         for i in selected:
-            packet.write_int(i, byte_size=1)
+            reply.write_int(i, byte_size=1)
         return reply
 
 
-    def on_select_place(self, packet: Packet) -> Optional[Packet]:
-        player_msg_sent_to: Player = self.duel.players[packet.read_int(1)]
-        min_: int = packet.read_int(1)
-        selectable: int = 0xffffffff - packet.read_int(4)
+    async def on_select_place(self, message: SelectPlace) -> Optional[Packet]:
+        selectable: int = 0xffffffff - message.selectable
 
         is_pzone: bool = bool(selectable & (ZoneID.PZONE | (ZoneID.PZONE << ZoneID.OPPONENT)))
         if selectable & ZoneID.MONSTER_ZONE:
@@ -555,7 +539,7 @@ class GameManager:
 
         zones: list[Zone] = self.duel.field[player].where_zones(location)
         choices: list[int] = [i for i, zone in enumerate(zones) if bool(selectable & zone.id)]
-        selected: int = self.executor.select_place(player, choices)
+        selected: int = await self.executor.select_place(player, choices)
 
         reply: Packet = Packet(CtosMessage.RESPONSE)
         reply.write_int(self.duel.players.index(player), byte_size=1)
@@ -564,37 +548,20 @@ class GameManager:
         return reply
 
 
-    def on_select_unselect(self, packet: Packet) -> Optional[Packet]:
-        player_msg_snt_to: Player = self.duel.players[packet.read_int(1)]
-        finishable: bool = packet.read_bool()
-        cancelable: bool = packet.read_bool() or finishable
-        min: int = packet.read_int(4)
-        max: int = packet.read_int(4)
-
-        cards: list[Card] = []
-
-        for _ in range(packet.read_int(4)):
-            card_id: int = packet.read_id()
-            controller: Player = self.duel.players[packet.read_int(1)]
-            location: Location = packet.read_location()
-            index: int = packet.read_int(4)
-            position: Position = packet.read_position()
-
-            card: Card = self.duel.get_card(controller, location, index)
-            card.id = card_id
-            card.position = position
-            cards.append(card)
+    async def on_select_unselect(self, message: SelectUnselect) -> Optional[Packet]:
+        finishable: bool = message.finishable
+        cancelable: bool = message.cancelable or finishable
 
-        # unknown  
-        for _ in range(packet.read_int(4)):
-            card_id = packet.read_id()
-            controller = self.duel.players[packet.read_int(1)]
-            location = packet.read_location()
-            index = packet.read_int(4)
-            position = packet.read_position()
+        cards: list[Card] = self._get_cards(message.selectable)
+        for card, record in zip(cards, message.selectable):
+            position: Position = Position(record[CARD_INFO_POSITION])
+            if card.position != position:
+                card.position = position
+                _, controller, location, index = record[:CARD_INFO_POSITION]
+                self._changed(card, self.duel.players[controller], location, index)
 
         max = 1
-        selected: list[int] = self.executor.select_unselect(cards, int(not finishable), max, cancelable, self._select_hint)
+        selected: list[int] = await self.executor.select_unselect(cards, int(not finishable), max, cancelable, self._select_hint)
 
         reply: Packet = Packet(CtosMessage.RESPONSE)
         if len(selected) == 0:
@@ -606,247 +573,226 @@ class GameManager:
         return reply
 
 
-    def on_announce_race(self, packet: Packet) -> Optional[Packet]:
-        player_msg_sent_to: Player = self.duel.players[packet.read_int(1)]
-        count: int = packet.read_int(1)
-        available: int = packet.read_int(4)
-        choices: list[int] = [int(race) for race in Race.enum if available & race]
+    async def on_announce_race(self, message: Announce) -> Optional[Packet]:
+        choices: list[int] = [int(race) for race in Race.enum if message.available & race]
 
-        selected: list[int] = self.executor.announce_race(choices, count)
+        selected: list[int] = await self.executor.announce_race(choices, message.count)
 
         reply: Packet = Packet(CtosMessage.RESPONSE)
         reply.write_int(sum(selected))
         return reply
 
 
-    def on_announce_card(self, packet: Packet) -> Optional[Packet]:
+    def on_announce_card(self, message: Empty) -> Optional[Packet]:
         raise NotImplementedError()
 
 
-    def on_announce_attr(self, packet: Packet) -> Optional[Packet]:
-        player_msg_sent_to: Player = self.duel.players[packet.read_int(1)]
-        count: int = packet.read_int(1)
-        available: int = packet.read_int(4)
-        choices: list[int] = [int(attr) for attr in Attribute.enum if available & attr]
+    async def on_announce_attr(self, message: Announce) -> Optional[Packet]:
+        choices: list[int] = [int(attr) for attr in Attribute.enum if message.available & attr]
 
-        selected: list[int] = self.executor.announce_attr(choices, count)
+        selected: list[int] = await self.executor.announce_attr(choices, message.count)
 
         reply: Packet = Packet(CtosMessage.RESPONSE)
         reply.write_int(sum(selected))
         return reply
 
 
-    def on_announce_number(self, packet: Packet) -> Optional[Packet]:
-        player_msg_sent_to: Player = self.duel.players[packet.read_int(1)]
-        count: int = packet.read_int(1)
-        choices: list[int] = [packet.read_int(4) for _ in range(count)]
-        selected: int = self.executor.select_number(choices)
+    async def on_announce_number(self, message: AnnounceNumber) -> Optional[Packet]:
+        selected: int = await self.executor.select_number(message.options)
 
         reply: Packet = Packet(CtosMessage.RESPONSE)
         reply.write_int(selected)
         return reply
 
 
-    def on_update_data(self, packet: Packet) -> Optional[Packet]:
-        player: Player = self.duel.players[packet.read_int(1)]
-        location: Location = packet.read_location()
-        size: int = packet.read_int(4)
+    def _get_cards(self, records: Iterable[tuple[int, ...]], has_id: bool=True) -> list[Card]:
+        """ Resolve card records in one pass and set the ids they carry.\n
+        Records are laid out as (card_id, controller, location, index, ...),
+        or (controller, location, index, ...) if has_id is False. """
+        players: list[Player] = self.duel.players
+        get_card = self.duel.get_card
+        locations: dict[int, Location] = {}
+        start: int = 1 if has_id else 0
+        cards: list[Card] = []
+        for record in records:
+            controller, location, index = record[start:start+3]
+            loc: Optional[Location] = locations.get(location)
+            if loc is None:
+                loc = locations[location] = Location(location)
+            card: Card = get_card(players[controller], loc, index)
+            if has_id:
+                self._reveal(card, players[controller], location, index, record[0])
+            cards.append(card)
+        return cards
+
+
+    def on_update_data(self, message: UpdateData) -> Optional[Packet]:
+        player: Player = self.duel.players[message.player]
+        location: Location = Location(message.location)
+        data: memoryview = message.queries
+        offset: int = 0
+        tracked: bool = bool(self.listeners) and message.location in LOCATIONS
         cards: list[Optional[Card]] = self.duel.get_cards(player, location)
-        for card in cards:
+        for index, card in enumerate(cards):
             if card:
-                self._update_card(card, packet)
+                offset = self._update_card(card, data, offset)
+                if tracked:
+                    for listener in self.listeners:
+                        listener.on_card_changed(player, message.location, index, card)
             else:
-                packet.read_bytes(2) # read \x00\x00, which means no card
+                offset += 2 # \x00\x00, which means no card
+        if not tracked and self.listeners:
+            self._duel_changed([card for card in cards if card])
         return None
         
 
-    def on_update_card(self, packet: Packet) -> Optional[Packet]:
-        player: Player = self.duel.players[packet.read_int(1)]
-        location: Location = packet.read_location()
-        index: int = packet.read_int(1)
+    def on_update_card(self, message: UpdateCard) -> Optional[Packet]:
+        player: Player = self.duel.players[message.player]
+        location: Location = Location(message.location)
 
-        card: Card = self.duel.get_card(player, location, index)
-        self._update_card(card, packet)
+        card: Card = self.duel.get_card(player, location, message.index)
+        self._update_card(card, message.queries)
+        self._changed(card, player, message.location, message.index)
         return None
 
 
-    def _update_card(self, card: Card, packet: Packet) -> None:
-        while True:
-            size: int = packet.read_int(2)
+    def _update_card(self, card: Card, data: memoryview, offset: int=0) -> int:
+        """ Apply the query blocks of card found at data[offset:] and return the offset past them. """
+        simple_queries = _SIMPLE_QUERIES
+        handlers = self._QUERY_HANDLERS
+        end: int = len(data)
+        while offset + 2 <= end:
+            size: int = data[offset] | data[offset+1] << 8
             if size == 0:
-                return
-
-            query: int = packet.read_int(4)
-
-            if query == Query.ID:
-                card.id = packet.read_int(4)
-
-            elif query == Query.POSITION:
-                card.position = Position(packet.read_int(4))
-
-            elif query == Query.ALIAS:
-                card.arias = packet.read_int(4)
-
-            elif query == Query.TYPE:
-                card.type = Type(packet.read_int(4))
-
-            elif query == Query.LEVEL:
-                card.level = packet.read_int(4)
-
-            elif query == Query.RANK:
-                card.rank = packet.read_int(4)
-
-            elif query == Query.ATTRIBUTE:
-                card.attribute = Attribute(packet.read_int(4))
-
-            elif query == Query.RACE:
-                card.race = Race(packet.read_int(4))
-
-            elif query == Query.ATTACK:
-                card.attack = packet.read_int(4)
-
-            elif query == Query.DEFENCE:
-                card.defence = packet.read_int(4)
-
-            elif query == Query.BASE_ATTACK:
-                card.base_attack = packet.read_int(4)
-
-            elif query == Query.BASE_DEFENCE:
-                card.base_defence = packet.read_int(4)
-
-            elif query == Query.REASON:
-                card.reason = packet.read_int(4)
-
-            elif query == Query.REASON_CARD:
-                controller = self.duel.players[packet.read_int(1)]
-                location = packet.read_location()
-                index = packet.read_int(4)
-                position = packet.read_position()
-                card.reason_card = self.duel.get_card(controller, location, index)
-
-            elif query == Query.EQUIP_CARD:
-                controller = self.duel.players[packet.read_int(1)]
-                location = packet.read_location()
-                index = packet.read_int(4)
-                position = packet.read_position()
-                ecard: Card = self.duel.get_card(controller, location, index)
-                card.equip_target = ecard
-                ecard.equip_cards.append(card)
-
-            elif query == Query.TARGET_CARD:
-                card.target_cards.clear()
-                for _ in range(packet.read_int(4)):
-                    controller = self.duel.players[packet.read_int(1)]
-                    location = packet.read_location()
-                    index = packet.read_int(4)
-                    position = packet.read_position()
-                    tcard = self.duel.get_card(controller, location, index)
-                    card.target_cards.append(tcard)
-                    tcard.targeted_by.append(card)
-
-            elif query == Query.OVERLAY_CARD:
-                card.overlays.clear()
-                for _ in range(packet.read_int(4)):
-                    card.overlays.append(packet.read_id())
-
-            elif query == Query.COUNTERS:
-                card.counters.clear()
-                for _ in range(packet.read_int(4)):
-                    counter_info: int = packet.read_int(4)
-                    counter_type: int = counter_info & 0xffff
-                    counter_count: int = counter_info >> 16
-                    card.counters[counter_type] = counter_count
-            
-            elif query == Query.CONTROLLER:
-                card.controller = self.duel.players[packet.read_int(1)]
-
-            elif query == Query.STATUS:
-                card.status = packet.read_int(4)
-
-            elif query == Query.IS_PUBLIC:
-                is_public: bool = packet.read_bool()
-
-            elif query == Query.LSCALE:
-                card.lscale = packet.read_int(4)
-
-            elif query == Query.RSCALE:
-                card.rscale = packet.read_int(4)
-
-            elif query == Query.LINK:
-                card.link = packet.read_int(4)
-                card.linkmarker = packet.read_int(4)
-            
-            elif query == Query.IS_HIDDEN:
-                pass
-
-            elif query == Query.COVER:
-                pass
-
+                return offset + 2
+            query: int = _U32.unpack_from(data, offset + 2)[0]
+            start: int = offset + 6
+            offset += 2 + size # size includes the 4 bytes of query
+
+            simple: Optional[tuple[str, Optional[type]]] = simple_queries.get(query)
+            if simple is not None:
+                name, convert = simple
+                value: int = _U32.unpack_from(data, start)[0]
+                current: object = getattr(card, name, None)
+                if getattr(current, 'value', current) != value: # wrappers hold the flag in value
+                    setattr(card, name, value if convert is None else convert(value))
             elif query == Query.END:
-                return
-
+                return offset
             else:
-                packet.read_bytes(size - 4) # 4 is bytesize of 'query'
+                handler = handlers.get(query)
+                if handler is not None:
+                    handler(self, card, data, start)
+        return offset
 
 
-    def on_shuffle_deck(self, packet: Packet) -> Optional[Packet]:
-        player: Player = self.duel.players[packet.read_int(1)]
-        for card in self.duel.field[player].deck:
-            card.id = 0
-        return None
+    def _query_card(self, data: memoryview, offset: int) -> Card:
+        controller, location, index, _ = _LOC_INFO.unpack_from(data, offset)
+        return self.duel.get_card(self.duel.players[controller], Location(location), index)
+
+
+    def _query_reason_card(self, card: Card, data: memoryview, offset: int) -> None:
+        card.reason_card = self._query_card(data, offset)
+
+
+    def _query_equip_card(self, card: Card, data: memoryview, offset: int) -> None:
+        ecard: Card = self._query_card(data, offset)
+        card.equip_target = ecard
+        ecard.equip_cards.append(card)
+        self._duel_changed((ecard,))
+
+
+    def _query_target_card(self, card: Card, data: memoryview, offset: int) -> None:
+        card.target_cards.clear()
+        count: int = _U32.unpack_from(data, offset)[0]
+        for i in range(count):
+            tcard: Card = self._query_card(data, offset + 4 + i * _LOC_INFO.size)
+            card.target_cards.append(tcard)
+            tcard.targeted_by.append(card)
+        self._duel_changed(card.target_cards)
+
 
+    def _query_overlay_card(self, card: Card, data: memoryview, offset: int) -> None:
+        count: int = _U32.unpack_from(data, offset)[0]
+        card.overlays.clear()
+        card.overlays.extend(t[0] for t in _U32.iter_unpack(data[offset+4:offset+4+4*count]))
 
-    def on_shuffle_hand(self, packet: Packet) -> Optional[Packet]:
-        player: Player = self.duel.players[packet.read_int(1)]
-        num_of_hand: int = packet.read_int(4)
-        for card in self.duel.field[player].hand:
-            card.id = packet.read_int(4)
+
+    def _query_counters(self, card: Card, data: memoryview, offset: int) -> None:
+        count: int = _U32.unpack_from(data, offset)[0]
+        card.counters.clear()
+        for counter_info, in _U32.iter_unpack(data[offset+4:offset+4+4*count]):
+            card.counters[counter_info & 0xffff] = counter_info >> 16
+
+
+    def _query_controller(self, card: Card, data: memoryview, offset: int) -> None:
+        controller: Player = self.duel.players[data[offset]]
+        if card.controller is not controller:
+            card.controller = controller
+
+
+    def _query_link(self, card: Card, data: memoryview, offset: int) -> None:
+        card.link, card.linkmarker = _LINK.unpack_from(data, offset)
+
+
+    # IS_PUBLIC, IS_HIDDEN and COVER are not tracked and are skipped by their size
+    _QUERY_HANDLERS: ClassVar[dict[int, Callable[['GameManager', Card, memoryview, int], None]]] = {
+        Query.REASON_CARD: _query_reason_card,
+        Query.EQUIP_CARD: _query_equip_card,
+        Query.TARGET_CARD: _query_target_card,
+        Query.OVERLAY_CARD: _query_overlay_card,
+        Query.COUNTERS: _query_counters,
+        Query.CONTROLLER: _query_controller,
+        Query.LINK: _query_link,
+    }
+
+
+    def on_shuffle_deck(self, message: PlayerOnly) -> Optional[Packet]:
+        player: Player = self.duel.players[message.player]
+        for index, card in enumerate(self.duel.field[player].deck):
+            self._reveal(card, player, _DECK, index, 0)
         return None
 
 
-    def on_shuffle_extra(self, packet: Packet) -> Optional[Packet]:
-        player: Player = self.duel.players[packet.read_int(1)]
-        num_of_extra: int = packet.read_int(4)
-        for card in self.duel.field[player].extradeck:
-            if not card.is_faceup:
-                card.id = packet.read_int(4)
+    def on_shuffle_hand(self, message: ShuffleCards) -> Optional[Packet]:
+        player: Player = self.duel.players[message.player]
+        for index, (card, card_id) in enumerate(zip(self.duel.field[player].hand, message.card_ids)):
+            self._reveal(card, player, _HAND, index, card_id)
         return None
 
-    def on_shuffle_setcard(self, packet: Packet) -> Optional[Packet]:
-        location: Location = packet.read_location()
-        count: int = packet.read_int(1)
 
+    def on_shuffle_extra(self, message: ShuffleCards) -> Optional[Packet]:
+        player: Player = self.duel.players[message.player]
+        facedown: list[Card] = [card for card in self.duel.field[player].extradeck if not card.is_faceup]
+        for card, card_id in zip(facedown, message.card_ids):
+            self._reveal(card, player, _EXTRA, -1, card_id)
+        return None
+
+    def on_shuffle_setcard(self, message: ShuffleSetCard) -> Optional[Packet]:
         old: list[Card] = []
-        for _ in range(count):
-            controller: Player = self.duel.players[packet.read_int(1)]
-            location = packet.read_location()
-            index: int = packet.read_int(4)
-            position: Position = packet.read_position()
-            card: Card = self.duel.get_card(controller, location, index)
+        for info in message.previous:
+            card: Card = self.duel.get_card(self.duel.players[info.controller], Location(info.location), info.index)
             card.id = 0
             old.append(card)
 
-        for i in range(count):
-            controller = self.duel.players[packet.read_int(1)]
-            location = packet.read_location()
-            index = packet.read_int(4)
-            position = packet.read_position()
-            self.duel.add_card(old[i], controller, location, index)
+        for card, info in zip(old, message.current):
+            self.duel.add_card(card, self.duel.players[info.controller], Location(info.location), info.index)
+
+        if self.listeners:
+            # the set cards changed zones in place: tell of the card each zone holds now
+            zones: set[tuple[int, int, int]] = {(info.controller, info.location, info.index) for info in (*message.previous, *message.current)}
+            for controller, location, index in zones:
+                player: Player = self.duel.players[controller]
+                cards: list[Optional[Card]] = self.duel.get_cards(player, Location(location))
+                held: Optional[Card] = cards[index] if location in LOCATIONS and index < len(cards) else None
+                if held is not None:
+                    for listener in self.listeners:
+                        listener.on_card_changed(player, location, index, held)
         return None
 
-    def on_sort_card(self, packet: Packet) -> Optional[Packet]:
-        player_msg_sent_to: Player = self.duel.players[packet.read_int(1)]
-        cards: list[Card] = []
-        for _ in range(packet.read_int(4)):
-            card_id = packet.read_id()
-            controller: Player = self.duel.players[packet.read_int(1)]
-            location: Location = packet.read_location()
-            index: int = packet.read_int(4)
-            card: Card = self.duel.get_card(controller, location, index)
-            card.id = card_id
-            cards.append(card)
+    async def on_sort_card(self, message: SortCard) -> Optional[Packet]:
+        cards: list[Card] = self._get_cards(message.cards)
         
-        selected: list[int] = self.executor.sort_card(cards)
+        selected: list[int] = await self.executor.sort_card(cards)
         
         reply: Packet = Packet(CtosMessage.RESPONSE)
         for integer in selected:
@@ -854,258 +800,293 @@ class GameManager:
         return reply
 
 
-    def on_sort_chain(self, packet: Packet) -> Optional[Packet]:
+    def on_sort_chain(self, message: Empty) -> Optional[Packet]:
         reply: Packet = Packet(CtosMessage.RESPONSE)
         reply.write_int(-1)
         return reply
 
 
-    def on_move(self, packet: Packet) -> Optional[Packet]:
-        card_id: int = packet.read_id()
+    def on_move(self, message: Move) -> Optional[Packet]:
         # p means previous, c means current
-        p_controller: Player = self.duel.players[packet.read_int(1)]
-        p_location: Location = packet.read_location()
-        p_index: int = packet.read_int(4)
-        p_position: Position = packet.read_position()
-        c_controller: Player = self.duel.players[packet.read_int(1)]
-        c_location: Location = packet.read_location()
-        c_index: int = packet.read_int(4)
-        c_position: Position = packet.read_position()
-        reason: int = packet.read_int(4)
+        p_controller: Player = self.duel.players[message.previous.controller]
+        p_location: Location = Location(message.previous.location)
+        p_index: int = message.previous.index
+        c_controller: Player = self.duel.players[message.current.controller]
+        c_location: Location = Location(message.current.location)
+        c_index: int = message.current.index
 
         card: Card = self.duel.get_card(p_controller, p_location, p_index)
-        card.id = card_id
+        index: int = self._index(card, p_controller, message.previous.location, p_index)
+        card.id = message.card_id
         self.duel.remove_card(card, p_controller, p_location, p_index)
+        self._removed(card, p_controller, message.previous.location, index)
         self.duel.add_card(card, c_controller, c_location, c_index)
+        self._added(card, c_controller, message.current.location, c_index)
+        if message.previous.location not in LOCATIONS or message.current.location not in LOCATIONS:
+            self._duel_changed(None) # an overlay unit: the card holding it changed too
         return None
 
 
-    def on_poschange(self, packet: Packet) -> Optional[Packet]:
-        card_id: int = packet.read_id()
-        # p means previous, c means current
-        p_controller: Player = self.duel.players[packet.read_int(1)]
-        p_location: Location = packet.read_location()
-        p_index: int = packet.read_int(1)
-        p_position: Position = Position(packet.read_int(1))
-        c_position: Position = Position(packet.read_int(1))
-
-        card: Card = self.duel.get_card(p_controller, p_location, p_index)
-        card.position = c_position
+    def on_poschange(self, message: PosChange) -> Optional[Packet]:
+        card: Card = self.duel.get_card(self.duel.players[message.controller], Location(message.location), message.index)
+        card.position = Position(message.current_position)
+        self._changed(card, self.duel.players[message.controller], message.location, message.index)
         return None
 
 
-    def on_set(self, packet: Packet) -> Optional[Packet]:
+    def on_set(self, message: Empty) -> Optional[Packet]:
         return None
 
 
-    def on_swap(self, packet: Packet) -> Optional[Packet]:
-        # p means previous, c means current
-        card_id_1: int = packet.read_id()
-        controller_1: Player = self.duel.players[packet.read_int(1)]
-        location_1: Location = packet.read_location()
-        index_1: int = packet.read_int(4)
-        position_1: Position = packet.read_position()
-        card_id_2: int = packet.read_id()
-        controller_2: Player = self.duel.players[packet.read_int(1)]
-        location_2: Location = packet.read_location()
-        index_2: int = packet.read_int(4)
-        position_2: Position = packet.read_position()
+    def on_swap(self, message: Swap) -> Optional[Packet]:
+        controller_1: Player = self.duel.players[message.first.controller]
+        location_1: Location = Location(message.first.location)
+        index_1: int = message.first.index
+        controller_2: Player = self.duel.players[message.second.controller]
+        location_2: Location = Location(message.second.location)
+        index_2: int = message.second.index
 
         card_1: Card = self.duel.get_card(controller_1, location_1, index_1)
-        card_1.id = card_id_1
+        card_1.id = message.first.card_id
         card_2: Card = self.duel.get_card(controller_2, location_2, index_2)
-        card_2.id = card_id_2
+        card_2.id = message.second.card_id
 
+        index: int = self._index(card_1, controller_1, message.first.location, index_1)
         self.duel.remove_card(card_1, controller_1, location_1, index_1)
+        self._removed(card_1, controller_1, message.first.location, index)
+        index = self._index(card_2, controller_2, message.second.location, index_2)
         self.duel.remove_card(card_2, controller_2, location_2, index_2)
+        self._removed(card_2, controller_2, message.second.location, index)
         self.duel.add_card(card_1, controller_2, location_2, index_2)
+        self._added(card_1, controller_2, message.second.location, index_2)
         self.duel.add_card(card_2, controller_1, location_1, index_1)
+        self._added(card_2, controller_1, message.first.location, index_1)
         return None
 
 
-    def on_summoning(self, packet: Packet) -> Optional[Packet]:
-        card_id: int = packet.read_id()
-        controller: Player = self.duel.players[packet.read_int(1)]
-        location: Location = packet.read_location()
-        index: int = packet.read_int(4)
-        position: Position = packet.read_position()
-        card: Card = self.duel.get_card(controller, location, index)
-        card.id = card_id
+    def on_summoning(self, message: Summoning) -> Optional[Packet]:
+        controller: Player = self.duel.players[message.card.controller]
+        card: Card = self.duel.get_card(controller, Location(message.card.location), message.card.index)
+        self._reveal(card, controller, message.card.location, message.card.index, message.card.card_id)
         self.duel.on_summoning(controller, card)
+        self._duel_changed((card,))
         return None
 
 
-    def on_summoned(self, packet: Packet) -> Optional[Packet]:
+    def on_summoned(self, message: Empty) -> Optional[Packet]:
         self.duel.on_summoned()
+        self._duel_changed(None)
         return None
 
 
-    def on_spsummoning(self, packet: Packet) -> Optional[Packet]:
-        card_id: int = packet.read_id()
-        controller: Player = self.duel.players[packet.read_int(1)]
-        location: Location = packet.read_location()
-        index: int = packet.read_int(4)
-        position: Position = packet.read_position()
-        card: Card = self.duel.get_card(controller, location, index)
-        card.id = card_id
+    def on_spsummoning(self, message: Summoning) -> Optional[Packet]:
+        controller: Player = self.duel.players[message.card.controller]
+        card: Card = self.duel.get_card(controller, Location(message.card.location), message.card.index)
+        self._reveal(card, controller, message.card.location, message.card.index, message.card.card_id)
         self.duel.on_summoning(controller, card)
+        self._duel_changed((card,))
         return None
 
 
-    def on_spsummoned(self, packet: Packet) -> Optional[Packet]:
+    def on_spsummoned(self, message: Empty) -> Optional[Packet]:
         self.duel.on_spsummoned()
+        self._duel_changed(None)
         return None
 
 
-    def on_chaining(self, packet: Packet) -> Optional[Packet]:
-        card_id: int = packet.read_id()
-        controller: Player = self.duel.players[packet.read_int(1)]
-        location: Location = packet.read_location()
-        index: int = packet.read_int(4)
-        position: Position = packet.read_position()
-        card: Card = self.duel.get_card(controller, location, index)
-        card.id = card_id
-        last_chain_player: Player = self.duel.players[packet.read_int(1)]
+    def on_chaining(self, message: Chaining) -> Optional[Packet]:
+        info = message.card
+        card: Card = self.duel.get_card(self.duel.players[info.controller], Location(info.location), info.index)
+        self._reveal(card, self.duel.players[info.controller], info.location, info.index, info.card_id)
+        last_chain_player: Player = self.duel.players[message.chain_player]
         self.duel.on_chaining(last_chain_player, card)
+        self._duel_changed((card,))
+        return None
+
+
+    def on_chain_solving(self, message: ChainIndex) -> Optional[Packet]:
+        self.chain_solving = message.index
+        return None
+
+
+    def on_chain_solved(self, message: ChainIndex) -> Optional[Packet]:
+        self.chain_solving = None
         return None
 
 
-    def on_chain_end(self, packet: Packet) -> Optional[Packet]:
+    def on_chain_end(self, message: Empty) -> Optional[Packet]:
+        self.chain_solving = None
         self.duel.on_chain_end()
+        self._duel_changed(None)
         return None
 
 
-    def on_become_target(self, packet: Packet) -> Optional[Packet]:
-        for _ in range(packet.read_int(4)):
-            controller: Player = self.duel.players[packet.read_int(1)]
-            location: Location = packet.read_location()
-            index: int = packet.read_int(4)
-            position: Position = packet.read_position()
-            card: Card = self.duel.get_card(controller, location, index)
+    def on_confirm_cards(self, message: ConfirmCards) -> Optional[Packet]:
+        self._get_cards(message.cards) # sets the ids of the revealed cards
+        return None
+
+
+    def on_become_target(self, message: BecomeTarget) -> Optional[Packet]:
+        cards: list[Card] = self._get_cards(message.cards, has_id=False)
+        for card in cards:
             self.duel.on_become_target(card)
+        self._duel_changed(cards)
         return None
 
 
-    def on_draw(self, packet: Packet) -> Optional[Packet]:
-        player: Player = self.duel.players[packet.read_int(1)]
-        for _ in range(packet.read_int(4)):
+    def on_draw(self, message: Draw) -> Optional[Packet]:
+        player: Player = self.duel.players[message.player]
+        for _ in range(message.count):
+            if not self.listeners:
+                self.duel.on_draw(player)
+                continue
+            deck: list[Optional[Card]] = list(self.duel.get_cards(player, Location(_DECK)))
             self.duel.on_draw(player)
+            if len(self.duel.get_cards(player, Location(_DECK))) < len(deck):
+                index: int = removed_index(deck, self.duel.get_cards(player, Location(_DECK)))
+                card: Optional[Card] = deck[index]
+                if card is not None:
+                    self._removed(card, player, _DECK, index)
+                    self._added(card, player, _HAND, len(self.duel.get_cards(player, Location(_HAND))) - 1)
         return None
 
 
-    def on_damage(self, packet: Packet) -> Optional[Packet]:
-        player: Player = self.duel.players[packet.read_int(1)]
-        damage: int = packet.read_int(4)
+    def on_damage(self, message: LifePoints) -> Optional[Packet]:
+        player: Player = self.duel.players[message.player]
+        damage: int = message.amount
         self.duel.on_damage(player, damage)
+        for listener in self.listeners:
+            listener.on_lp_changed(player)
         return None
 
 
-    def on_recover(self, packet: Packet) -> Optional[Packet]:
-        player: Player = self.duel.players[packet.read_int(1)]
-        recover: int = packet.read_int(4)
+    def on_recover(self, message: LifePoints) -> Optional[Packet]:
+        player: Player = self.duel.players[message.player]
+        recover: int = message.amount
         self.duel.on_recover(player, recover)
+        for listener in self.listeners:
+            listener.on_lp_changed(player)
         return None
 
 
-    def on_equip(self, packet: Packet) -> Optional[Packet]:
-        controller_1: Player = self.duel.players[packet.read_int(1)]
-        location_1: Location = packet.read_location()
-        index_1: int = packet.read_int(4)
-        position_1: Position = packet.read_position()
-        controller_2: Player = self.duel.players[packet.read_int(1)]
-        location_2: Location = packet.read_location()
-        index_2: int = packet.read_int(4)
-        position_2: Position = packet.read_position()
+    def on_equip(self, message: CardPair) -> Optional[Packet]:
+        controller_1: Player = self.duel.players[message.first.controller]
+        location_1: Location = Location(message.first.location)
+        index_1: int = message.first.index
+        controller_2: Player = self.duel.players[message.second.controller]
+        location_2: Location = Location(message.second.location)
+        index_2: int = message.second.index
 
         equip: Card = self.duel.get_card(controller_1, location_1, index_1)
         equipped: Card = self.duel.get_card(controller_2, location_2, index_2)
 
-        if equip.equip_target is not None:
-            equip.equip_target.equip_cards.remove(equip)
+        previous: Optional[Card] = equip.equip_target
+        if previous is not None:
+            previous.equip_cards.remove(equip)
         equip.equip_target = equipped
         equipped.equip_cards.append(equip)
+        self._duel_changed((equip, equipped) if previous is None else (equip, equipped, previous))
         return None
 
 
-    def on_unequip(self, packet: Packet) -> Optional[Packet]:
-        controller: Player = self.duel.players[packet.read_int(1)]
-        location: Location = packet.read_location()
-        index: int = packet.read_int(4)
-        position: Position = packet.read_position()
-        equip: Card = self.duel.get_card(controller, location, index)
-        if equip.equip_target:
-            equip.equip_target.equip_cards.remove(equip)
+    def on_unequip(self, message: Unequip) -> Optional[Packet]:
+        controller: Player = self.duel.players[message.card.controller]
+        equip: Card = self.duel.get_card(controller, Location(message.card.location), message.card.index)
+        previous: Optional[Card] = equip.equip_target
+        if previous:
+            previous.equip_cards.remove(equip)
         equip.equip_target = None
+        self._duel_changed((equip,) if previous is None else (equip, previous))
+        return None
+
+
+    def on_add_counter(self, message: Counter) -> Optional[Packet]:
+        card: Card = self.duel.get_card(self.duel.players[message.controller], Location(message.location), message.index)
+        card.counters[message.counter_type] = card.counters.get(message.counter_type, 0) + message.count
+        self._duel_changed((card,))
+        return None
+
+
+    def on_remove_counter(self, message: Counter) -> Optional[Packet]:
+        card: Card = self.duel.get_card(self.duel.players[message.controller], Location(message.location), message.index)
+        count: int = card.counters.get(message.counter_type, 0) - message.count
+        if count > 0:
+            card.counters[message.counter_type] = count
+        else:
+            card.counters.pop(message.counter_type, None)
+        self._duel_changed((card,))
         return None
 
 
-    def on_lp_update(self, packet: Packet) -> Optional[Packet]:
-        player: Player = self.duel.players[packet.read_int(1)]
-        lp: int = packet.read_int(4)
+    def on_lp_update(self, message: LifePoints) -> Optional[Packet]:
+        player: Player = self.duel.players[message.player]
+        lp: int = message.amount
         self.duel.on_lp_update(player, lp)
+        for listener in self.listeners:
+            listener.on_lp_changed(player)
         return None
 
 
-    def on_card_target(self, packet: Packet) -> Optional[Packet]:
-        controller_1: Player = self.duel.players[packet.read_int(1)]
-        location_1: Location = packet.read_location()
-        index_1: int = packet.read_int(4)
-        position_1: Position = packet.read_position()
-        controller_2: Player = self.duel.players[packet.read_int(1)]
-        location_2: Location = packet.read_location()
-        index_2: int = packet.read_int(4)
-        position_2: Position = packet.read_position()
+    def on_card_target(self, message: CardPair) -> Optional[Packet]:
+        controller_1: Player = self.duel.players[message.first.controller]
+        location_1: Location = Location(message.first.location)
+        index_1: int = message.first.index
+        controller_2: Player = self.duel.players[message.second.controller]
+        location_2: Location = Location(message.second.location)
+        index_2: int = message.second.index
         targeting: Card = self.duel.get_card(controller_1, location_1, index_1)
         targeted: Card = self.duel.get_card(controller_2, location_2, index_2)
         targeting.target_cards.append(targeted)
         targeted.targeted_by.append(targeting)
+        self._duel_changed((targeting, targeted))
         return None
 
 
-    def on_cancel_target(self, packet: Packet) -> Optional[Packet]:
-        controller_1: Player = self.duel.players[packet.read_int(1)]
-        location_1: Location = packet.read_location()
-        index_1: int = packet.read_int(4)
-        position_1: Position = packet.read_position()
-        controller_2: Player = self.duel.players[packet.read_int(1)]
-        location_2: Location = packet.read_location()
-        index_2: int = packet.read_int(4)
-        position_2: Position = packet.read_position()
+    def on_cancel_target(self, message: CardPair) -> Optional[Packet]:
+        controller_1: Player = self.duel.players[message.first.controller]
+        location_1: Location = Location(message.first.location)
+        index_1: int = message.first.index
+        controller_2: Player = self.duel.players[message.second.controller]
+        location_2: Location = Location(message.second.location)
+        index_2: int = message.second.index
         targeting: Card = self.duel.get_card(controller_1, location_1, index_1)
         targeted: Card = self.duel.get_card(controller_2, location_2, index_2)
         targeting.target_cards.remove(targeted)
         targeted.targeted_by.remove(targeting)
+        self._duel_changed((targeting, targeted))
         return None
 
 
-    def on_attack(self, packet: Packet) -> Optional[Packet]:
-        controller_1: Player = self.duel.players[packet.read_int(1)]
-        location_1: Location = packet.read_location()
-        index_1: int = packet.read_int(4)
-        position_1: Position = packet.read_position()
-        controller_2: Player = self.duel.players[packet.read_int(1)]
-        location_2: Location = packet.read_location()
-        index_2: int = packet.read_int(4)
-        position_2: Position = packet.read_position()
+    def on_attack(self, message: CardPair) -> Optional[Packet]:
+        controller_1: Player = self.duel.players[message.first.controller]
+        location_1: Location = Location(message.first.location)
+        index_1: int = message.first.index
+        controller_2: Player = self.duel.players[message.second.controller]
+        location_2: Location = Location(message.second.location)
+        index_2: int = message.second.index
         attacking: Card = self.duel.get_card(controller_1, location_1, index_1)
         attacked: Card = self.duel.get_card(controller_2, location_2, index_2)
         self.duel.on_attack(attacking, attacked)
+        self._duel_changed((attacking, attacked))
         return None
         
 
-    def on_battle(self, packet: Packet) -> Optional[Packet]:
+    def on_battle(self, message: Empty) -> Optional[Packet]:
         self.duel.on_battle()
+        self._duel_changed(None) # the cards of the attack
         return None
 
 
-    def on_attack_disabled(self, packet: Packet) -> Optional[Packet]:
+    def on_attack_disabled(self, message: Empty) -> Optional[Packet]:
         self.duel.on_battle()
+        self._duel_changed(None)
         return None
 
 
-    def on_rock_paper_scissors(self, packet: Packet) -> Optional[Packet]:
+    def on_rock_paper_scissors(self, message: Empty) -> Optional[Packet]:
         return None
 
 
-    def on_tag_swap(self, packet: Packet) -> Optional[Packet]:
+    def on_tag_swap(self, message: Empty) -> Optional[Packet]:
         raise NotImplementedError()
+
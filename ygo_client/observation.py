@@ -0,0 +1,195 @@
+""" Fixed-layout NumPy encoding of the duel, kept up to date as GameManager changes it.
+
+numpy is optional: pip install ygo-client-python[numpy]
+"""
+from typing import TYPE_CHECKING, Any, NamedTuple, Optional
+
+from ygo_core.duel import Duel, Card
+from ygo_core.card import Location
+from ygo_core.enums import Player
+
+from ygo_client.tracking import DECK, HAND, MONSTER_ZONE, SPELL_ZONE, GRAVE, BANISHED, EXTRA, ZONE_LOCATIONS, DuelListener
+
+try:
+    import numpy as np
+except ImportError:
+    np = None # type: ignore
+
+if TYPE_CHECKING:
+    from ygo_client.client import GameClient
+
+
+# columns of a card row; every value is 0 when unknown
+FEATURES: tuple[str, ...] = (
+    'present', 'id', 'position', 'level', 'rank', 'attack', 'defence', 'attribute', 'race', 'type'
+)
+# (location, rows) of the sections of a player's rows, in order
+SECTIONS: tuple[tuple[int, int], ...] = (
+    (DECK, 60),
+    (HAND, 16),
+    (MONSTER_ZONE, 7), # extra monster zones included
+    (SPELL_ZONE, 8), # field and pendulum zones included
+    (GRAVE, 60),
+    (BANISHED, 60),
+    (EXTRA, 15),
+)
+# entries of the scalar vector, followed by the card count of each section of each player
+SCALARS: tuple[str, ...] = ('my_lp', 'opponent_lp', 'phase', 'turn', 'my_turn')
+ROWS: int = sum(rows for _, rows in SECTIONS)
+
+_MY_LP, _OPPONENT_LP, _PHASE, _TURN, _MY_TURN = range(len(SCALARS))
+
+_OFFSETS: dict[int, tuple[int, int, int]] = {} # location -> (section, first row, rows)
+_row: int = 0
+for _section, (_location, _rows) in enumerate(SECTIONS):
+    _OFFSETS[_location] = (_section, _row, _rows)
+    _row += _rows
+
+
+class Observation(NamedTuple):
+    cards: 'np.ndarray' # (2, ROWS, len(FEATURES)), my rows first
+    scalars: 'np.ndarray' # (len(SCALARS) + 2 * len(SECTIONS),)
+
+
+
+class ObservationEncoder(DuelListener):
+    """ Keeps an Observation of duel in place as GameManager changes it.\n
+    Added to the listeners of GameManager (see attach), it re-encodes the row of each
+    card added, removed or changed when the change is made, shifting the rows after
+    it in the sections kept in order, so observe() only copies the arrays. Sections
+    longer than their rows are truncated; the counts in scalars are exact. """
+    duel: Duel
+    cards: 'np.ndarray'
+    scalars: 'np.ndarray'
+
+    def __init__(self, duel: Duel) -> None:
+        if np is None:
+            raise ImportError('ObservationEncoder requires numpy: pip install ygo-client-python[numpy]')
+        self.duel = duel
+        self.cards = np.zeros((2, ROWS, len(FEATURES)), dtype=np.int64)
+        self.scalars = np.zeros(len(SCALARS) + 2 * len(SECTIONS), dtype=np.int64)
+
+
+    def attach(self, client: 'GameClient') -> None:
+        """ Encode the changes client makes to its duel from now on. """
+        client.add_listener(self)
+        self.refresh()
+
+
+    def observe(self) -> Observation:
+        """ A copy of the arrays. """
+        return Observation(self.cards.copy(), self.scalars.copy())
+
+
+    def refresh(self) -> None:
+        """ Re-encode all of duel. The turn count is kept. """
+        for player in self.duel.players:
+            for location in _OFFSETS:
+                self._encode(player, location)
+            self.on_lp_changed(player)
+        self.scalars[_MY_TURN] = self.duel.turn_player == Player.ME
+        self.on_new_phase()
+
+
+    def on_reset(self) -> None:
+        self.scalars[:] = 0
+        self.refresh()
+
+
+    def on_restore(self) -> None:
+        self.refresh()
+
+
+    def on_card_added(self, player: Player, location: int, index: int, card: Card) -> None:
+        block, count = self._section(player, location)
+        rows: int = len(block)
+        if location in ZONE_LOCATIONS:
+            if index < rows:
+                block[index] = _encode_card(card)
+            self.scalars[count] = np.count_nonzero(block[:, 0])
+            return
+        if index < rows:
+            block[index+1:] = block[index:-1]
+            block[index] = _encode_card(card)
+        self.scalars[count] += 1
+
+
+    def on_card_removed(self, player: Player, location: int, index: int, card: Card) -> None:
+        block, count = self._section(player, location)
+        rows: int = len(block)
+        if location in ZONE_LOCATIONS:
+            if index < rows:
+                block[index] = 0
+            self.scalars[count] = np.count_nonzero(block[:, 0])
+            return
+        n: int = int(self.scalars[count])
+        if index < rows:
+            used: int = min(n, rows)
+            block[index:used-1] = block[index+1:used]
+            if n > rows: # the first card past the rows moves into the last one
+                block[-1] = _encode_card(self.duel.get_cards(player, Location(location))[rows-1])
+            else:
+                block[used-1] = 0
+        self.scalars[count] = n - 1
+
+
+    def on_card_changed(self, player: Player, location: int, index: int, card: Card) -> None:
+        block, count = self._section(player, location)
+        if index < len(block):
+            block[index] = _encode_card(card)
+            if location in ZONE_LOCATIONS:
+                self.scalars[count] = np.count_nonzero(block[:, 0])
+
+
+    def on_lp_changed(self, player: Player) -> None:
+        self.scalars[_MY_LP if player == Player.ME else _OPPONENT_LP] = self.duel.field[player].life_point
+
+
+    def on_new_turn(self) -> None:
+        self.scalars[_TURN] += 1
+        self.scalars[_MY_TURN] = self.duel.turn_player == Player.ME
+
+
+    def on_new_phase(self) -> None:
+        self.scalars[_PHASE] = _value(self.duel.phase)
+
+
+    def _section(self, player: Player, location: int) -> tuple['np.ndarray', int]:
+        """ The rows of the section of player at location, and the index of its count in scalars. """
+        section, start, rows = _OFFSETS[location]
+        side: int = 0 if player == Player.ME else 1
+        return self.cards[side, start:start+rows], len(SCALARS) + side * len(SECTIONS) + section
+
+
+    def _encode(self, player: Player, location: int) -> None:
+        block, count = self._section(player, location)
+        cards: list[Optional[Card]] = self.duel.get_cards(player, Location(location))
+        encoded: list[tuple[int, ...]] = [_encode_card(card) if card else _EMPTY for card in cards[:len(block)]]
+        if encoded:
+            block[:len(encoded)] = encoded
+        block[len(encoded):] = 0
+        self.scalars[count] = sum(1 for card in cards if card)
+
+
+
+_EMPTY: tuple[int, ...] = (0,) * len(FEATURES)
+
+
+def _encode_card(card: Card) -> tuple[int, ...]:
+    return (
+        1,
+        card.id or 0,
+        _value(card.position),
+        getattr(card, 'level', 0) or 0,
+        getattr(card, 'rank', 0) or 0,
+        getattr(card, 'attack', 0) or 0,
+        getattr(card, 'defence', 0) or 0,
+        _value(getattr(card, 'attribute', None)),
+        _value(getattr(card, 'race', None)),
+        _value(getattr(card, 'type', None)),
+    )
+
+
+def _value(flag: Any) -> int:
+    """ The int of a Position, Attribute, Race or Type (wrapping an enum in .value), or 0. """
+    return getattr(flag, 'value', flag) or 0
@@ -0,0 +1,263 @@
+import asyncio
+import concurrent.futures
+import logging
+import time
+from typing import Any, List, Optional, Tuple
+
+from ygo_core import Deck, Card
+from ygo_core.enums import Player
+from ygo_core.phase import MainPhase, BattlePhase
+
+from ygo_client.executor import DuelExecutor, DelegatingExecutor
+
+
+logger = logging.getLogger(__name__)
+
+# response values of the idle and battle commands
+MAIN_TO_BATTLE: int = 6
+MAIN_TO_END: int = 7
+BATTLE_TO_MAIN2: int = 2
+BATTLE_TO_END: int = 3
+
+_shared_pool: Optional[concurrent.futures.ThreadPoolExecutor] = None # default pool of every OffloadExecutor
+
+
+def shared_pool() -> concurrent.futures.ThreadPoolExecutor:
+    """ The thread pool used by the OffloadExecutors created without one, started on first use.
+    Its threads are joined when the interpreter exits. """
+    global _shared_pool
+    if _shared_pool is None:
+        _shared_pool = concurrent.futures.ThreadPoolExecutor(thread_name_prefix='ygo-offload')
+    return _shared_pool
+
+
+class FallbackExecutor(DuelExecutor):
+    """ Answers every prompt at once with the least committal legal choice. """
+
+    def on_start(self) -> None:
+        pass
+
+
+    def on_new_turn(self) -> None:
+        pass
+
+
+    def on_new_phase(self) -> None:
+        pass
+
+
+    def on_win(self, win: bool) -> None:
+        pass
+
+
+    def rematch(self, win_on_match: bool) -> bool:
+        return False
+
+
+    def select_hand(self) -> int:
+        return 1
+
+
+    def select_tp(self) -> bool:
+        return True
+
+
+    def select_mainphase_action(self, main: MainPhase) -> int:
+        return MAIN_TO_BATTLE if main.can_battle else MAIN_TO_END
+
+
+    def select_battle_action(self, battle: BattlePhase) -> int:
+        return BATTLE_TO_MAIN2 if battle.can_main2 else BATTLE_TO_END
+
+
+    def select_effect_yn(self, card: Card, description: int) -> bool:
+        return False
+
+
+    def select_yn(self) -> bool:
+        return False
+
+
+    def select_battle_replay(self) -> bool:
+        return False
+
+
+    def select_option(self, options: List[int]) -> int:
+        return 0
+
+
+    def select_card(self, choices: List[Card], min_: int, max_: int, cancelable: bool, select_hint: int) -> List[int]:
+        return list(range(min_))
+
+
+    def select_tribute(self, choices: List[Card], min_: int, max_: int, cancelable: bool, select_hint: int) -> List[int]:
+        return list(range(min_))
+
+
+    def select_chain(self, choices: List[Card], descriptions: List[int], forced: bool) -> int:
+        return 0 if forced else -1
+
+
+    def select_place(self, player: Player, choices: List[int]) -> int:
+        return choices[0]
+
+
+    def select_position(self, card_id: int, choices: List[int]) -> int:
+        return choices[0]
+
+
+    def select_sum(self, choices: List[Tuple[Card, int, int]], sum_value: int, min_: int, max_: int, must_just: bool, select_hint: int) -> List[int]:
+        selected: list[int] = []
+        for i, (_, value, _) in enumerate(choices):
+            if sum_value <= 0 and len(selected) >= min_:
+                break
+            selected.append(i)
+            sum_value -= value
+        return selected
+
+
+    def select_unselect(self, choices: List[Card], min_: int, max_: int, cancelable: bool, hint: int) -> list[int]:
+        return [] if cancelable and min_ == 0 else [0]
+
+
+    def select_counter(self, counter_type: int, quantity: int, cards: List[Card], counters: List[int]) -> List[int]:
+        used: list[int] = []
+        for count in counters:
+            n: int = min(count, quantity)
+            used.append(n)
+            quantity -= n
+        return used
+
+
+    def select_number(self, choices: List[int]) -> int:
+        return 0
+
+
+    def sort_card(self, cards: List[Card]) -> List[int]:
+        return list(range(len(cards)))
+
+
+    def announce_attr(self, choices: List[int], count: int) -> List[int]:
+        return choices[:count]
+
+
+    def announce_race(self, choices: List[int], count: int) -> List[int]:
+        return choices[:count]
+
+
+    def change_side(self, deck: Deck) -> None:
+        pass
+
+
+
+class OffloadExecutor(DelegatingExecutor):
+    """ Runs the decisions of a DuelExecutor in a thread or process pool so a slow search
+    does not stall the event loop, and answers with a fallback once the deadline passes.\n
+    The deadline is the time the server reported as left (see on_timelimit) minus margin,
+    capped by timeout. Notifications (on_start, on_new_turn, ...) run inline.
+    Without a pool the decisions run in shared_pool(); a pool passed in is left to the
+    caller to shut down.
+    A ProcessPoolExecutor receives a pickled copy of executor for every decision, so
+    decisions must not rely on state they change. A decision that timed out keeps its
+    worker busy until it returns; use more than one worker to avoid queueing behind it.\n
+    In a thread pool, a decision that timed out still reads the live Duel after the fallback
+    has answered. Rather than copying the duel for every decision, OffloadExecutor holds
+    it in lingering until it returns, and GameClient holds state updates back meanwhile.
+    A process pool works on its own copy, so it does not hold the duel back. """
+    executor: DuelExecutor
+    pool: concurrent.futures.Executor
+    fallback: DuelExecutor
+    margin: float # seconds kept for sending the reply
+    timeout: Optional[float] # longest decision, whatever the time limit
+    decisions: int = 0
+    fallbacks: int = 0 # decisions answered by fallback
+    _left_time: Optional[float] = None # seconds left on our clock, None if unknown
+
+    def __init__(
+        self,
+        executor: DuelExecutor,
+        pool: Optional[concurrent.futures.Executor]=None,
+        fallback: Optional[DuelExecutor]=None,
+        margin: float=1.0,
+        timeout: Optional[float]=None
+    ) -> None:
+        self.executor = executor
+        self.pool = pool or shared_pool()
+        self.fallback = fallback or FallbackExecutor()
+        self.margin = margin
+        self.timeout = timeout
+
+
+    @property
+    def fallback_rate(self) -> float:
+        return self.fallbacks / self.decisions if self.decisions else 0.0
+
+
+    async def on_timelimit(self, left_time: int) -> None:
+        self._left_time = float(left_time)
+
+
+    async def _decide(self, method: str, *args: Any) -> Any:
+        self.decisions += 1
+        timeout: Optional[float] = self.timeout
+        if self._left_time is not None:
+            limit: float = self._left_time - self.margin
+            timeout = limit if timeout is None else min(timeout, limit)
+
+        start: float = time.monotonic()
+        future: Optional[asyncio.Future[Any]] = None
+        try:
+            if timeout is not None and timeout <= 0:
+                raise asyncio.TimeoutError()
+            future = asyncio.wrap_future(self.pool.submit(getattr(self.executor, method), *args))
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            self.fallbacks += 1
+            if future is not None:
+                future.add_done_callback(self._report)
+                if not isinstance(self.pool, concurrent.futures.ProcessPoolExecutor):
+                    self._linger(future)
+            logger.warning(f'{method} missed its deadline of {timeout:.2f}s; answering with the fallback.')
+            return getattr(self.fallback, method)(*args)
+        finally:
+            if self._left_time is not None:
+                self._left_time -= time.monotonic() - start
+
+
+    def _linger(self, future: asyncio.Future[Any]) -> None:
+        """ Keep future in lingering until it and every other timed-out decision are done. """
+        lingering: asyncio.Future[Any] = future
+        if self.lingering is not None:
+            lingering = asyncio.gather(self.lingering, future, return_exceptions=True)
+        self.lingering = lingering
+        lingering.add_done_callback(self._settle)
+
+
+    def _settle(self, lingering: asyncio.Future[Any]) -> None:
+        if self.lingering is lingering:
+            self.lingering = None
+
+
+    def _report(self, future: asyncio.Future[Any]) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning('A decision that missed its deadline failed.', exc_info=future.exception())
+
+
+    async def on_start(self) -> None:
+        self.executor.on_start()
+
+
+    async def on_new_turn(self) -> None:
+        self.executor.on_new_turn()
+
+
+    async def on_new_phase(self) -> None:
+        self.executor.on_new_phase()
+
+
+    async def on_win(self, win: bool) -> None:
+        self.executor.on_win(win)
+
+
+    async def change_side(self, deck: Deck) -> None:
+        self.executor.change_side(deck)
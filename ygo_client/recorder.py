@@ -0,0 +1,294 @@
+""" Append-only binary log of the frames sent and received by a connection.
+
+Layout, little-endian:
+    header   b'YGOL', version (u16)
+    records  direction (u8), timestamp in ns (u64), size (u16), frame (msg id and content)
+    index    one (start, end, first turn, turns) per game (u64, u64, u32, u32),
+             then the offset of every NEW_TURN record (u64)
+    footer   index offset (u64), games (u32), turns (u32), b'YGOI'
+
+A game runs from its DUEL_START record to the end of its DUEL_END record. The index
+and footer are written by close(); a log without them is still read, by scanning it.
+"""
+import mmap
+import queue
+import struct
+import threading
+import time
+from typing import BinaryIO, Iterator, NamedTuple, Optional, Union
+
+from ygo_client.connection.enums.stoc_message import StocMessage
+from ygo_client.connection.enums.game_message import GameMessage
+
+
+RECEIVED: int = 0
+SENT: int = 1
+
+_MAGIC: bytes = b'YGOL'
+_INDEX_MAGIC: bytes = b'YGOI'
+_VERSION: int = 1
+_HEADER: struct.Struct = struct.Struct('<4sH')
+_RECORD: struct.Struct = struct.Struct('<BQH')
+_GAME: struct.Struct = struct.Struct('<QQII')
+_TURN: struct.Struct = struct.Struct('<Q')
+_FOOTER: struct.Struct = struct.Struct('<QII4s')
+# as plain ints, compared on every received frame
+_GAME_MSG: int = int(StocMessage.GAME_MSG)
+_DUEL_START: int = int(StocMessage.DUEL_START)
+_DUEL_END: int = int(StocMessage.DUEL_END)
+_NEW_TURN: int = int(GameMessage.NEW_TURN)
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class PacketRecorder:
+    """ Writes the frames passed to record() to a log file.\n
+    record() only appends to an in-memory buffer; full buffers are written by a
+    thread of their own, so recording does not wait for the disk. The buffer is
+    also passed on at the end of each game, and by the first record() made
+    flush_interval seconds after the last flush, so a crash loses little. """
+    path: str
+    buffer_size: int
+    flush_interval: float # seconds
+    _flushed_at: float # time.monotonic() of the last flush
+    _buffer: bytearray
+    _offset: int # file offset of the next record
+    _games: list[tuple[int, int, int, int]] # (start, end, first turn, turns) of the finished games
+    _game_start: Optional[int] = None
+    _game_first_turn: int = 0
+    _turns: list[int]
+    _queue: queue.SimpleQueue[Optional[bytearray]]
+    _writer: threading.Thread
+    _error: Optional[BaseException] = None
+    _closed: bool = False
+
+    def __init__(self, path: str, buffer_size: int=1 << 16, flush_interval: float=1.0) -> None:
+        self.path = path
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._flushed_at = time.monotonic()
+        self._buffer = bytearray(_HEADER.pack(_MAGIC, _VERSION))
+        self._offset = len(self._buffer)
+        self._games = []
+        self._turns = []
+        self._queue = queue.SimpleQueue()
+        file: BinaryIO = open(path, 'wb')
+        self._writer = threading.Thread(target=self._write, args=(file,), name=f'PacketRecorder({path})', daemon=True)
+        self._writer.start()
+
+
+    def __enter__(self) -> 'PacketRecorder':
+        return self
+
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+    def received(self, data: Buffer) -> None:
+        self.record(RECEIVED, data)
+
+
+    def sent(self, data: Buffer) -> None:
+        self.record(SENT, data)
+
+
+    def record(self, direction: int, data: Buffer, timestamp: Optional[int]=None) -> None:
+        """ Append a frame (msg id followed by content) received or sent at timestamp (ns, now by default). """
+        if self._closed:
+            raise ValueError('Recorder has been closed.')
+        offset: int = self._offset
+        size: int = len(data)
+        game_over: bool = False
+        if direction == RECEIVED and size:
+            msg_id: int = data[0]
+            if msg_id == _GAME_MSG:
+                if size > 1 and data[1] == _NEW_TURN and self._game_start is not None:
+                    self._turns.append(offset)
+            elif msg_id == _DUEL_START:
+                self._end_game(offset)
+                self._game_start = offset
+                self._game_first_turn = len(self._turns)
+            elif msg_id == _DUEL_END:
+                self._end_game(offset + _RECORD.size + size)
+                game_over = True
+
+        buffer: bytearray = self._buffer
+        buffer += _RECORD.pack(direction, time.time_ns() if timestamp is None else timestamp, size)
+        buffer += data
+        self._offset = offset + _RECORD.size + size
+        if len(buffer) >= self.buffer_size or game_over or time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+
+    def flush(self) -> None:
+        """ Pass the buffered records to the writer thread. """
+        if self._buffer:
+            self._queue.put(self._buffer)
+            self._buffer = bytearray()
+        self._flushed_at = time.monotonic()
+
+
+    def close(self) -> None:
+        """ Write the index and wait until everything is on disk. """
+        if self._closed:
+            return
+        self._end_game(self._offset)
+        index: bytearray = bytearray()
+        for game in self._games:
+            index += _GAME.pack(*game)
+        for turn in self._turns:
+            index += _TURN.pack(turn)
+        index += _FOOTER.pack(self._offset, len(self._games), len(self._turns), _INDEX_MAGIC)
+        self._buffer += index
+        self.flush()
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        if self._error is not None:
+            raise self._error
+
+
+    def _end_game(self, end: int) -> None:
+        if self._game_start is None:
+            return
+        first: int = self._game_first_turn
+        self._games.append((self._game_start, end, first, len(self._turns) - first))
+        self._game_start = None
+
+
+    def _write(self, file: BinaryIO) -> None:
+        with file:
+            while True:
+                chunk: Optional[bytearray] = self._queue.get()
+                if chunk is None:
+                    break
+                if self._error is None:
+                    try:
+                        file.write(chunk)
+                        file.flush()
+                    except BaseException as e:
+                        self._error = e
+
+
+
+class Frame(NamedTuple):
+    offset: int # of the record in the log
+    direction: int # RECEIVED or SENT
+    timestamp: int # ns since the epoch
+    data: memoryview # msg id followed by content
+
+
+
+class Game(NamedTuple):
+    start: int # offset of the DUEL_START record
+    end: int # offset past the DUEL_END record, or the end of the records
+    turns: tuple[int, ...] # offset of the NEW_TURN record of each turn
+
+
+
+class PacketLog:
+    """ A log written by PacketRecorder, mapped into memory.\n
+    The data of the frames are views of the mapping, which stays open while any is referenced. """
+    path: str
+    games: list[Game]
+    _mmap: mmap.mmap
+    _view: memoryview
+    _end: int # end of the records
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        if len(self._view) < _HEADER.size or _HEADER.unpack_from(self._view, 0)[0] != _MAGIC:
+            self.close()
+            raise ValueError(f'{path} is not a packet log.')
+        if not self._read_index():
+            self._scan()
+
+
+    def __enter__(self) -> 'PacketLog':
+        return self
+
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+    def frames(self, start: int=_HEADER.size, end: Optional[int]=None) -> Iterator[Frame]:
+        """ The frames recorded from offset start to offset end. """
+        view: memoryview = self._view
+        end = self._end if end is None else min(end, self._end)
+        offset: int = start
+        while offset + _RECORD.size <= end:
+            direction, timestamp, size = _RECORD.unpack_from(view, offset)
+            data_start: int = offset + _RECORD.size
+            if data_start + size > end:
+                break
+            yield Frame(offset, direction, timestamp, view[data_start:data_start+size])
+            offset = data_start + size
+
+
+    def game(self, index: int) -> Iterator[Frame]:
+        game: Game = self.games[index]
+        return self.frames(game.start, game.end)
+
+
+    def turn(self, game_index: int, turn: int) -> Iterator[Frame]:
+        """ The frames of the turn-th turn (from 0) of a game, up to the next turn. """
+        game: Game = self.games[game_index]
+        end: int = game.turns[turn+1] if turn + 1 < len(game.turns) else game.end
+        return self.frames(game.turns[turn], end)
+
+
+    def close(self) -> None:
+        self._view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass # frames are still referenced; the mapping goes with the last of them
+
+
+    def _read_index(self) -> bool:
+        view: memoryview = self._view
+        if len(view) < _HEADER.size + _FOOTER.size:
+            return False
+        index_offset, games, turns, magic = _FOOTER.unpack_from(view, len(view) - _FOOTER.size)
+        if magic != _INDEX_MAGIC or index_offset + games * _GAME.size + turns * _TURN.size + _FOOTER.size != len(view):
+            return False
+        turn_offset: int = index_offset + games * _GAME.size
+        offsets: list[int] = [t for t, in _TURN.iter_unpack(view[turn_offset:turn_offset+turns*_TURN.size])]
+        self.games = [
+            Game(start, end, tuple(offsets[first:first+count]))
+            for start, end, first, count in _GAME.iter_unpack(view[index_offset:turn_offset])
+        ]
+        self._end = index_offset
+        return True
+
+
+    def _scan(self) -> None:
+        """ Rebuild the index of a log that was not closed, ignoring a truncated last record. """
+        self._end = len(self._view)
+        self.games = []
+        start: Optional[int] = None
+        turns: list[int] = []
+        end: int = _HEADER.size
+        for frame in self.frames():
+            end = frame.offset + _RECORD.size + len(frame.data)
+            if frame.direction != RECEIVED or not frame.data:
+                continue
+            msg_id: int = frame.data[0]
+            if msg_id == _GAME_MSG:
+                if len(frame.data) > 1 and frame.data[1] == _NEW_TURN and start is not None:
+                    turns.append(frame.offset)
+            elif msg_id == _DUEL_START:
+                if start is not None:
+                    self.games.append(Game(start, frame.offset, tuple(turns)))
+                start, turns = frame.offset, []
+            elif msg_id == _DUEL_END and start is not None:
+                self.games.append(Game(start, end, tuple(turns)))
+                start = None
+        if start is not None:
+            self.games.append(Game(start, end, tuple(turns)))
+        self._end = end
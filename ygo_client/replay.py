@@ -0,0 +1,306 @@
+""" Offline replay of a PacketLog through the handlers of a GameClient.
+
+The frames received from the server are published one after another, with no socket
+and no event loop, and the prompts are answered by a ScriptedExecutor returning the
+decisions sent in the recording. GameManager rebuilds the duel as it did live, at CPU
+speed, and each reply it makes is checked against the recorded one, which makes a
+replay a regression test of the decoding path.
+
+Run ``python -m ygo_client.replay LOG [GAME]`` to print the messages per second.
+"""
+import time
+from inspect import isawaitable
+from typing import Any, Awaitable, Callable, Iterator, List, Optional, Tuple, Union
+
+from ygo_core import Deck, Card
+from ygo_core.enums import Player
+from ygo_core.phase import MainPhase, BattlePhase
+
+from ygo_client.client import GameClient
+from ygo_client.bus import Event
+from ygo_client.executor import DuelExecutor
+from ygo_client.recorder import PacketLog, Frame, RECEIVED, SENT
+from ygo_client.connection.packet import Packet
+from ygo_client.connection.enums.ctos_message import CtosMessage
+from ygo_client.connection.enums.game_message import GameMessage
+from ygo_client.connection.messages import SelectSum
+
+
+# replies carrying a decision of the executor
+DECISIONS: frozenset[int] = frozenset((
+    CtosMessage.RESPONSE, CtosMessage.HAND_RESULT, CtosMessage.TP_RESULT, CtosMessage.REMATCH_RESPONSE
+))
+
+
+class ScriptedExecutor(DuelExecutor):
+    """ DuelExecutor answering each decision with the next reply of script.\n
+    script yields the recorded replies (msg id followed by content) in the order they were
+    sent, and each method decodes from its reply the value it returned live. EOFError is
+    raised when script runs out. """
+    script: Iterator[memoryview]
+    used: int = 0 # replies taken from script
+    last: Optional[memoryview] = None # the reply taken last
+    _must_selected: int = 0 # cards selected by the server in the pending SELECT_SUM
+
+    def __init__(self, script: Iterator[memoryview]=iter(())) -> None:
+        self.script = script
+
+
+    def take(self) -> memoryview:
+        """ The next reply of script. """
+        try:
+            self.last = next(self.script)
+        except StopIteration:
+            raise EOFError('The recording has no reply left.') from None
+        self.used += 1
+        return self.last
+
+
+    def on_select_sum(self, event: Event) -> None:
+        """ Subscriber to SELECT_SUM: its reply starts with the cards selected by the server. """
+        message: SelectSum = event.message # type: ignore
+        self._must_selected = len(message.must_selected)
+
+
+    def _content(self) -> memoryview:
+        return self.take()[1:]
+
+
+    def _int(self) -> int:
+        return int.from_bytes(self._content()[:4], 'little', signed=True)
+
+
+    def _bool(self) -> bool:
+        return any(self._content())
+
+
+    def _ints(self, data: memoryview, size: int=4) -> List[int]:
+        return [int.from_bytes(data[i:i+size], 'little', signed=True) for i in range(0, len(data), size)]
+
+
+    def _flags(self) -> List[int]:
+        value: int = self._int()
+        return [1 << i for i in range(32) if value >> i & 1]
+
+
+    def on_start(self) -> None:
+        pass
+
+
+    def on_new_turn(self) -> None:
+        pass
+
+
+    def on_new_phase(self) -> None:
+        pass
+
+
+    def on_win(self, win: bool) -> None:
+        pass
+
+
+    def change_side(self, deck: Deck) -> None:
+        pass
+
+
+    def rematch(self, win_on_match: bool) -> bool:
+        return self._bool()
+
+
+    def select_hand(self) -> int:
+        return self._content()[0]
+
+
+    def select_tp(self) -> bool:
+        return self._bool()
+
+
+    def select_mainphase_action(self, main: MainPhase) -> int:
+        return self._int()
+
+
+    def select_battle_action(self, battle: BattlePhase) -> int:
+        return self._int()
+
+
+    def select_effect_yn(self, card: Card, description: int) -> bool:
+        return self._bool()
+
+
+    def select_yn(self) -> bool:
+        return self._bool()
+
+
+    def select_battle_replay(self) -> bool:
+        return self._bool()
+
+
+    def select_option(self, options: List[int]) -> int:
+        return self._int()
+
+
+    def select_card(self, choices: List[Card], min_: int, max_: int, cancelable: bool, select_hint: int) -> List[int]:
+        return self._ints(self._content()[8:])
+
+
+    def select_tribute(self, choices: List[Card], min_: int, max_: int, cancelable: bool, select_hint: int) -> List[int]:
+        return self._ints(self._content()[8:])
+
+
+    def select_chain(self, choices: List[Card], descriptions: List[int], forced: bool) -> int:
+        return self._int()
+
+
+    def select_place(self, player: Player, choices: List[int]) -> int:
+        return self._content()[2]
+
+
+    def select_position(self, card_id: int, choices: List[int]) -> int:
+        return self._int()
+
+
+    def select_sum(self, choices: List[Tuple[Card, int, int]], sum_value: int, min_: int, max_: int, must_just: bool, select_hint: int) -> List[int]:
+        return list(self._content()[8+self._must_selected:])
+
+
+    def select_unselect(self, choices: List[Card], min_: int, max_: int, cancelable: bool, hint: int) -> list[int]:
+        values: List[int] = self._ints(self._content())
+        return [] if values[0] == -1 else values[1:]
+
+
+    def select_counter(self, counter_type: int, quantity: int, cards: List[Card], counters: List[int]) -> List[int]:
+        return self._ints(self._content(), size=2)
+
+
+    def select_number(self, choices: List[int]) -> int:
+        return self._int()
+
+
+    def sort_card(self, cards: List[Card]) -> List[int]:
+        return list(self._content())
+
+
+    def announce_attr(self, choices: List[int], count: int) -> List[int]:
+        return self._flags()
+
+
+    def announce_race(self, choices: List[int], count: int) -> List[int]:
+        return self._flags()
+
+
+
+class ReplayStats:
+    """ Counters of the runs of a ReplayDriver. """
+    messages: int = 0 # received frames published
+    decisions: int = 0 # replies made to them
+    mismatches: int = 0 # replies differing from the recorded ones
+    truncated: bool = False # the recording ended while a decision was pending
+    seconds: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        """ Messages per second. """
+        return self.messages / self.seconds if self.seconds else 0.0
+
+
+
+class ReplayDriver:
+    """ Publishes the received frames of log to client, a GameClient answering through executor.\n
+    Subscribe to client before run() to see the messages and the rebuilt duel. Only
+    synchronous subscribers can be used, as there is no event loop. Handlers must not
+    wait on anything but the executor. """
+    log: Optional[PacketLog] # None to feed() frames from elsewhere
+    executor: ScriptedExecutor
+    client: GameClient
+    stats: ReplayStats
+    on_decision: Optional[Callable[[memoryview], None]] = None # called with each recorded reply used
+
+    def __init__(self, log: Optional[PacketLog]=None, deck: Optional[Deck]=None, track_state: bool=True) -> None:
+        self.log = log
+        self.executor = ScriptedExecutor()
+        self.client = GameClient(self.executor, deck or Deck([], [], []), track_state=track_state)
+        self.client.subscribe(self.executor.on_select_sum, types=(GameMessage.SELECT_SUM,))
+        self.stats = ReplayStats()
+
+
+    def run(self, game: Optional[int]=None) -> ReplayStats:
+        """ Replay game (the whole log if None) and return the updated stats. """
+        executor: ScriptedExecutor = self.executor
+        stats: ReplayStats = self.stats
+        executor.script = self.replies(game)
+        start: float = time.perf_counter()
+        try:
+            for frame in self._frames(game):
+                if frame.direction == RECEIVED:
+                    self.feed(frame.data)
+        except EOFError:
+            stats.truncated = True
+        finally:
+            stats.seconds += time.perf_counter() - start
+            executor.script.close() # type: ignore
+            executor.script = iter(())
+            executor.last = None # release the views of the log
+        return stats
+
+
+    def replies(self, game: Optional[int]=None) -> Iterator[memoryview]:
+        """ The recorded replies of game (the whole log if None), a script for executor. """
+        return (frame.data for frame in self._frames(game) if frame.direction == SENT and frame.data[0] in DECISIONS)
+
+
+    def feed(self, data: Union[bytes, memoryview]) -> None:
+        """ Publish one received frame (msg id followed by content); the prompts take their
+        answers from executor.script, and EOFError is raised if it has none left. """
+        executor: ScriptedExecutor = self.executor
+        stats: ReplayStats = self.stats
+        used: int = executor.used
+        reply: Optional[Packet] = _complete(self.client.publish(Packet.from_bytes(data)))
+        stats.messages += 1
+        if reply is None or reply.msg_id not in DECISIONS:
+            return
+        # GameManager answers some prompts by itself, e.g. a chain with no choices
+        recorded: memoryview = executor.last if executor.used > used else executor.take() # type: ignore
+        stats.decisions += 1
+        if self.on_decision is not None:
+            self.on_decision(recorded)
+        if reply.data != recorded:
+            stats.mismatches += 1
+
+
+    def _frames(self, game: Optional[int]) -> Iterator[Frame]:
+        if self.log is None:
+            raise ValueError('ReplayDriver has no log to replay.')
+        return self.log.frames() if game is None else self.log.game(game)
+
+
+
+def _complete(result: Union[Optional[Packet], Awaitable[Optional[Packet]]]) -> Optional[Packet]:
+    """ The reply of a handler, running its coroutine to the end without an event loop. """
+    if not isawaitable(result):
+        return result
+    steps: Any = result.__await__()
+    try:
+        steps.send(None)
+    except StopIteration as e:
+        reply: Optional[Packet] = e.value
+        return reply
+    steps.close()
+    raise RuntimeError('A handler waited on the event loop, which a replay does not run.')
+
+
+
+def benchmark(path: str, game: Optional[int]=None) -> None:
+    """ Replay the log at path and print the messages per second. """
+    with PacketLog(path) as log:
+        stats: ReplayStats = ReplayDriver(log).run(game)
+    print(
+        f'{stats.messages} messages in {stats.seconds:.3f}s: {stats.rate:.0f}/s, '
+        f'{stats.decisions} decisions, {stats.mismatches} mismatches'
+        + (', truncated' if stats.truncated else '')
+    )
+
+
+
+if __name__ == '__main__':
+    import sys
+    benchmark(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else None)
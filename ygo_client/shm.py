@@ -0,0 +1,397 @@
+""" Request/response slots in shared memory, so bot processes can share one inference process.
+
+Each worker process owns one slot of an ShmRing and writes its encoded observation into
+it; the inference process wakes up, answers every waiting request in one call and writes
+the responses back in place. Payloads are raw bytes, nothing is pickled. Wake-ups go
+through a named pipe (FIFO) per slot and one for the server, so neither side polls;
+this needs a POSIX system.
+
+Run ``python -m ygo_client.shm`` for a round-trip comparison against multiprocessing.Queue.
+"""
+import asyncio
+import os
+import select
+import struct
+import tempfile
+import time
+from multiprocessing import shared_memory
+from typing import Any, Callable, List, Optional, Sequence
+
+from ygo_client.executor import DelegatingExecutor
+
+
+FREE: int = 0
+REQUEST: int = 1
+RESPONSE: int = 2
+
+_HEADER: struct.Struct = struct.Struct('<4sIII') # magic, slots, request_size, response_size
+_SLOT: struct.Struct = struct.Struct('<III') # state, request length, response length
+_MAGIC: bytes = b'YGOR'
+_ALIGN: int = 64
+
+
+class ShmRing:
+    """ Fixed-size slots in a shared memory block, each carrying one request and its response.\n
+    The slot state is only written by the side that owns the next step (the worker sets
+    REQUEST and FREE, the server RESPONSE), so no lock is needed. Writing a request
+    notifies the server and writing a response notifies the slot: a byte is written to
+    its FIFO, which wait() blocks on. The state is written before the notification, so
+    a side that finds the state it waits for can ignore the notifications left over. """
+    shm: shared_memory.SharedMemory
+    slots: int
+    request_size: int
+    response_size: int
+    _owner: bool
+    _stride: int
+    _buf: memoryview # shm.buf, released by shm.close()
+    _states: memoryview # the state word of every slot
+    _fds: List[int] # FIFO of every slot, then the server's, opened non-blocking
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool) -> None:
+        self.shm = shm
+        self._owner = owner
+        self._buf = _buffer(shm)
+        magic, self.slots, self.request_size, self.response_size = _HEADER.unpack_from(self._buf, 0)
+        if magic != _MAGIC:
+            raise ValueError(f'{shm.name} is not an ShmRing.')
+        self._stride = _slot_stride(self.request_size, self.response_size)
+        words: memoryview = self._buf.cast('I')
+        self._states = words[_ALIGN//4::self._stride//4][:self.slots]
+        self._fds = [os.open(path, os.O_RDWR | os.O_NONBLOCK) for path in _fifos(shm.name, self.slots)]
+
+
+    @classmethod
+    def create(cls, slots: int, request_size: int=4096, response_size: int=256, name: Optional[str]=None) -> 'ShmRing':
+        stride: int = _slot_stride(request_size, response_size)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=_ALIGN + slots * stride)
+        _HEADER.pack_into(_buffer(shm), 0, _MAGIC, slots, request_size, response_size)
+        for path in _fifos(shm.name, slots):
+            os.mkfifo(path, 0o600)
+        return cls(shm, owner=True)
+
+
+    @classmethod
+    def attach(cls, name: str) -> 'ShmRing':
+        """ Open a ring created by another process.\n
+        Processes started by multiprocessing share the resource tracker of the creator, which
+        unlinks the block if the creator dies without closing it. Before Python 3.13 a process
+        started otherwise registers the block with a tracker of its own, which unlinks it when
+        that process exits. """
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False) # type: ignore
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, owner=False)
+
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+
+    def state(self, slot: int) -> int:
+        return self._states[slot]
+
+
+    def ready(self) -> List[int]:
+        """ Slots holding a request waiting for its response. """
+        return [slot for slot, state in enumerate(self._states.tolist()) if state == REQUEST]
+
+
+    def write_request(self, slot: int, data: bytes) -> None:
+        if len(data) > self.request_size:
+            raise ValueError(f'Request of {len(data)} bytes exceeds the slot size {self.request_size}.')
+        base: int = self._base(slot)
+        start: int = base + _SLOT.size
+        self._buf[start:start+len(data)] = data
+        struct.pack_into('<I', self._buf, base + 4, len(data))
+        self._states[slot] = REQUEST
+        self.notify(None)
+
+
+    def read_request(self, slot: int) -> memoryview:
+        base: int = self._base(slot)
+        length: int = struct.unpack_from('<I', self._buf, base + 4)[0]
+        start: int = base + _SLOT.size
+        return self._buf[start:start+length]
+
+
+    def write_response(self, slot: int, data: bytes) -> None:
+        if len(data) > self.response_size:
+            raise ValueError(f'Response of {len(data)} bytes exceeds the slot size {self.response_size}.')
+        base: int = self._base(slot)
+        start: int = base + _SLOT.size + self.request_size
+        self._buf[start:start+len(data)] = data
+        struct.pack_into('<I', self._buf, base + 8, len(data))
+        self._states[slot] = RESPONSE
+        self.notify(slot)
+
+
+    def read_response(self, slot: int) -> bytes:
+        """ Copy the response out of the slot and free it. """
+        base: int = self._base(slot)
+        length: int = struct.unpack_from('<I', self._buf, base + 8)[0]
+        start: int = base + _SLOT.size + self.request_size
+        data: bytes = bytes(self._buf[start:start+length])
+        self._states[slot] = FREE
+        return data
+
+
+    def fileno(self, slot: Optional[int]) -> int:
+        """ The FIFO of slot, or of the server if slot is None, readable once it is notified. """
+        return self._fds[self.slots if slot is None else slot]
+
+
+    def notify(self, slot: Optional[int]) -> None:
+        """ Wake the worker of slot, or the server if slot is None. """
+        try:
+            os.write(self.fileno(slot), b'\x01')
+        except BlockingIOError:
+            pass # the FIFO is full of notifications not read yet
+
+
+    def wait(self, slot: Optional[int], timeout: Optional[float]=None) -> bool:
+        """ Block until slot, or the server if slot is None, is notified, and clear its
+        notifications. Return False if timeout seconds passed first. """
+        fd: int = self.fileno(slot)
+        if not select.select([fd], [], [], timeout)[0]:
+            return False
+        self.clear(slot)
+        return True
+
+
+    def clear(self, slot: Optional[int]) -> None:
+        """ Drop the pending notifications of slot, or of the server if slot is None. """
+        try:
+            os.read(self.fileno(slot), 4096)
+        except BlockingIOError:
+            pass
+
+
+    def close(self) -> None:
+        self._states.release()
+        for fd in self._fds:
+            os.close(fd)
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+            for path in _fifos(self.shm.name, self.slots):
+                os.unlink(path)
+
+
+    def _base(self, slot: int) -> int:
+        return _ALIGN + slot * self._stride
+
+
+
+def _buffer(shm: shared_memory.SharedMemory) -> memoryview:
+    buf: Optional[memoryview] = shm.buf
+    if buf is None:
+        raise ValueError(f'{shm.name} is closed.')
+    return buf
+
+
+def _wake(future: 'asyncio.Future[None]') -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def _fifos(name: str, slots: int) -> List[str]:
+    """ Paths of the FIFOs of the ring name: one per slot, then the server's. """
+    prefix: str = os.path.join(tempfile.gettempdir(), name.lstrip('/'))
+    return [f'{prefix}.{slot}' for slot in range(slots)] + [f'{prefix}.server']
+
+
+def _slot_stride(request_size: int, response_size: int) -> int:
+    size: int = _SLOT.size + request_size + response_size
+    return (size + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+
+class ShmClient:
+    """ Worker side of one slot of an ShmRing. """
+    ring: ShmRing
+    slot: int
+    _lock: asyncio.Lock # the slot carries one request at a time
+
+    def __init__(self, ring: ShmRing, slot: int) -> None:
+        self.ring = ring
+        self.slot = slot
+        self._lock = asyncio.Lock()
+
+
+    def request(self, data: bytes) -> bytes:
+        self.ring.write_request(self.slot, data)
+        while self.ring.state(self.slot) != RESPONSE:
+            self.ring.wait(self.slot)
+        return self.ring.read_response(self.slot)
+
+
+    async def arequest(self, data: bytes) -> bytes:
+        """ request() that lets the event loop run while waiting for the notification. """
+        async with self._lock:
+            self.ring.write_request(self.slot, data)
+            loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+            fd: int = self.ring.fileno(self.slot)
+            while self.ring.state(self.slot) != RESPONSE:
+                notified: asyncio.Future[None] = loop.create_future()
+                loop.add_reader(fd, _wake, notified)
+                try:
+                    await notified
+                finally:
+                    loop.remove_reader(fd)
+                self.ring.clear(self.slot)
+            return self.ring.read_response(self.slot)
+
+
+
+class ShmServer:
+    """ Inference side of an ShmRing: answers all waiting requests with one handler call. """
+    ring: ShmRing
+    handler: Callable[[List[memoryview]], Sequence[bytes]]
+    timeout: float # seconds between checks of should_stop while no request comes
+    batches: int = 0
+    requests: int = 0
+
+    def __init__(self, ring: ShmRing, handler: Callable[[List[memoryview]], Sequence[bytes]], timeout: float=0.1) -> None:
+        self.ring = ring
+        self.handler = handler
+        self.timeout = timeout
+
+
+    def poll(self) -> int:
+        """ Answer the waiting requests and return their number. """
+        slots: List[int] = self.ring.ready()
+        if not slots:
+            return 0
+        requests: List[memoryview] = [self.ring.read_request(slot) for slot in slots]
+        responses: Sequence[bytes] = self.handler(requests)
+        for request in requests:
+            request.release()
+        for slot, response in zip(slots, responses):
+            self.ring.write_response(slot, response)
+        self.batches += 1
+        self.requests += len(slots)
+        return len(slots)
+
+
+    def serve(self, should_stop: Callable[[], bool]) -> None:
+        """ Answer requests as they come until should_stop() is true. """
+        while not should_stop():
+            if not self.poll():
+                self.ring.wait(None, self.timeout)
+
+
+
+class ShmExecutor(DelegatingExecutor):
+    """ AsyncDuelExecutor sending each decision through an ShmClient.\n
+    encode turns (method, args) into the request bytes and decode turns the response
+    back into the return value of the method. """
+    client: ShmClient
+    encode: Callable[[str, tuple[Any, ...]], bytes]
+    decode: Callable[[str, bytes], Any]
+
+    def __init__(self, client: ShmClient, encode: Callable[[str, tuple[Any, ...]], bytes], decode: Callable[[str, bytes], Any]) -> None:
+        self.client = client
+        self.encode = encode
+        self.decode = decode
+
+
+    async def _decide(self, method: str, *args: Any) -> Any:
+        response: bytes = await self.client.arequest(self.encode(method, args))
+        return self.decode(method, response)
+
+
+
+def _echo(requests: List[memoryview]) -> List[bytes]:
+    return [bytes(request[:8]) for request in requests]
+
+
+def _ring_server(name: str, stop: Any) -> None:
+    ring: ShmRing = ShmRing.attach(name)
+    ShmServer(ring, _echo).serve(stop.is_set)
+    ring.close()
+
+
+def _ring_worker(name: str, slot: int, rounds: int, size: int, results: Any) -> None:
+    ring: ShmRing = ShmRing.attach(name)
+    client: ShmClient = ShmClient(ring, slot)
+    payload: bytes = bytes(size)
+    latencies: list[float] = []
+    for _ in range(rounds):
+        start: float = time.perf_counter()
+        client.request(payload)
+        latencies.append(time.perf_counter() - start)
+    results.put(latencies)
+    ring.close()
+
+
+def _queue_server(requests: Any, responses: List[Any], stop: Any) -> None:
+    import queue
+    while not stop.is_set():
+        try:
+            worker, data = requests.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        responses[worker].put(data[:8])
+
+
+def _queue_worker(slot: int, rounds: int, size: int, requests: Any, response: Any, results: Any) -> None:
+    payload: bytes = bytes(size)
+    latencies: list[float] = []
+    for _ in range(rounds):
+        start: float = time.perf_counter()
+        requests.put((slot, payload))
+        response.get()
+        latencies.append(time.perf_counter() - start)
+    results.put(latencies)
+
+
+def benchmark(workers: int=4, rounds: int=5000, size: int=1024) -> None:
+    """ Print the decision round-trip latency of ShmRing and of a multiprocessing.Queue pair. """
+    import multiprocessing
+    import statistics
+
+    def report(label: str, latencies: list[float]) -> None:
+        latencies.sort()
+        print(
+            f'{label:>6}: mean {statistics.mean(latencies)*1e6:7.1f}us'
+            f'  p50 {latencies[len(latencies)//2]*1e6:7.1f}us'
+            f'  p99 {latencies[int(len(latencies)*0.99)]*1e6:7.1f}us'
+        )
+
+    results: 'multiprocessing.Queue[list[float]]' = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    ring: ShmRing = ShmRing.create(workers, request_size=size, response_size=64)
+    server = multiprocessing.Process(target=_ring_server, args=(ring.name, stop))
+    server.start()
+    procs = [multiprocessing.Process(target=_ring_worker, args=(ring.name, i, rounds, size, results)) for i in range(workers)]
+    for p in procs:
+        p.start()
+    latencies: list[float] = [t for _ in procs for t in results.get()]
+    for p in procs:
+        p.join()
+    stop.set()
+    server.join()
+    ring.close()
+    report('shm', latencies)
+
+    stop.clear()
+    requests: 'multiprocessing.Queue[tuple[int, bytes]]' = multiprocessing.Queue()
+    responses: 'list[multiprocessing.Queue[bytes]]' = [multiprocessing.Queue() for _ in range(workers)]
+    server = multiprocessing.Process(target=_queue_server, args=(requests, responses, stop))
+    server.start()
+    procs = [multiprocessing.Process(target=_queue_worker, args=(i, rounds, size, requests, responses[i], results)) for i in range(workers)]
+    for p in procs:
+        p.start()
+    latencies = [t for _ in procs for t in results.get()]
+    for p in procs:
+        p.join()
+    stop.set()
+    server.join()
+    report('queue', latencies)
+
+
+
+if __name__ == '__main__':
+    benchmark()
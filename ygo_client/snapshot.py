@@ -0,0 +1,315 @@
+""" Snapshots of the Duel of a GameManager that can be restored in place, for agents searching ahead.
+
+A snapshot keeps a shallow copy of every object, list and dict reachable from the
+Duel; immutable values are shared. Restoring writes the saved contents back into
+the same objects, so every reference between them (equip_target, target_cards,
+targeted_by, reason_card, the zones, ...) stays valid without being remapped.
+
+The saved contents are grouped by the card of a location, the field or the duel
+owning them. The snapshot listens to the changes GameManager makes (see
+ygo_client.tracking) and keeps the set of cards changed since it was taken;
+restore() writes back the groups of these cards, the fields and the duel, so it
+costs O(changes) rather than O(state). Changes made to the Duel other than through
+GameManager are only undone by restore(full=True).
+
+Run ``python -m ygo_client.snapshot`` to compare it with copy.deepcopy.
+"""
+import enum
+import types
+from typing import Any, Callable, Optional, Sequence
+
+from ygo_core.duel import Duel, Card
+from ygo_core.card import Location
+from ygo_core.enums import Player
+
+from ygo_client.manager import GameManager
+from ygo_client.tracking import LOCATIONS, DuelListener
+
+
+_ATOMIC: tuple[type, ...] = (
+    int, float, complex, str, bytes, bool, type(None), enum.Enum, type,
+    types.FunctionType, types.MethodType, types.BuiltinFunctionType, types.ModuleType
+)
+
+
+class _Group:
+    """ The saved contents of the objects and containers owned by one card, field or duel. """
+    objects: list[tuple[Any, dict[str, Any]]] # object and a copy of its __dict__
+    slots: list[tuple[Any, tuple[str, ...], list[Any]]] # object, slot names and their values
+    lists: list[tuple[list[Any], list[Any]]]
+    dicts: list[tuple[dict[Any, Any], dict[Any, Any]]]
+    sets: list[tuple[set[Any], set[Any]]]
+
+    def __init__(self) -> None:
+        self.objects = []
+        self.slots = []
+        self.lists = []
+        self.dicts = []
+        self.sets = []
+
+
+    def restore(self) -> int:
+        """ Write back the saved contents that differ and return the number of objects written. """
+        written: int = 0
+        for obj, state in self.objects:
+            current: dict[str, Any] = obj.__dict__
+            if current != state:
+                current.clear()
+                current.update(state)
+                written += 1
+        for obj, names, values in self.slots:
+            if [getattr(obj, name, _MISSING) for name in names] != values:
+                for name, value in zip(names, values):
+                    if value is _MISSING:
+                        if hasattr(obj, name):
+                            delattr(obj, name)
+                    else:
+                        setattr(obj, name, value)
+                written += 1
+        for lst, items in self.lists:
+            if lst != items:
+                lst[:] = items
+                written += 1
+        for dct, entries in self.dicts:
+            if dct != entries:
+                dct.clear()
+                dct.update(entries)
+                written += 1
+        for st, members in self.sets:
+            if st != members:
+                st.clear()
+                st.update(members)
+                written += 1
+        return written
+
+
+
+class DuelSnapshot(DuelListener):
+    """ The state of the duel of manager when the snapshot was taken.\n
+    restore() may be called any number of times, e.g. once per branch of a search.
+    Objects created after the snapshot are dropped from the restored state;
+    the objects themselves are never replaced. The other listeners of manager are
+    told on_restore() after each restore that wrote anything. The snapshot listens
+    to manager until close() is called. """
+    manager: GameManager
+    duel: Duel
+    _duel: _Group # the duel and what it owns outside the fields and cards
+    _fields: list[_Group]
+    _cards: dict[int, _Group] # by id of the card
+    _dirty: set[int] # ids of the cards changed since the snapshot or the last restore
+    _changed: bool # whether anything changed since then
+    _all: bool # whether any card may have changed since then
+
+    def __init__(self, manager: GameManager) -> None:
+        self.manager = manager
+        self.duel = manager.duel
+        self._duel = _Group()
+        self._fields = []
+        self._cards = {}
+        self._dirty = set()
+        self._changed = self._all = False
+        self._take()
+        manager.add_listener(self)
+
+
+    def restore(self, full: bool=False) -> int:
+        """ Put the duel back in the saved state and return the number of objects written.\n
+        Only the cards changed since the snapshot or the last restore are compared with
+        their saved state, or every card if full. """
+        if not (full or self._changed):
+            return 0
+        groups: list[_Group] = [self._duel, *self._fields]
+        if full or self._all:
+            groups.extend(self._cards.values())
+        else:
+            cards: dict[int, _Group] = self._cards
+            groups.extend(cards[key] for key in self._dirty if key in cards) # cards created since are dropped
+        written: int = sum(group.restore() for group in groups)
+        self._dirty.clear()
+        self._changed = self._all = False
+        if written:
+            for listener in self.manager.listeners:
+                if listener is not self:
+                    listener.on_restore()
+        return written
+
+
+    def close(self) -> None:
+        """ Stop listening to manager; the snapshot can no longer be restored. """
+        self.manager.remove_listener(self)
+
+
+    def _mark(self, card: Card) -> None:
+        self._changed = True
+        self._dirty.add(id(card))
+
+
+    def on_reset(self) -> None:
+        self._changed = self._all = True
+
+
+    def on_card_added(self, player: Player, location: int, index: int, card: Card) -> None:
+        self._mark(card)
+
+
+    def on_card_removed(self, player: Player, location: int, index: int, card: Card) -> None:
+        self._mark(card)
+
+
+    def on_card_changed(self, player: Player, location: int, index: int, card: Card) -> None:
+        self._mark(card)
+
+
+    def on_lp_changed(self, player: Player) -> None:
+        self._changed = True
+
+
+    def on_new_turn(self) -> None:
+        self._changed = True
+
+
+    def on_new_phase(self) -> None:
+        self._changed = True
+
+
+    def on_duel_changed(self, cards: Optional[Sequence[Card]]) -> None:
+        self._changed = True
+        if cards is None:
+            self._all = True
+        else:
+            self._dirty.update(id(card) for card in cards)
+
+
+    def on_restore(self) -> None:
+        # another snapshot wrote the duel
+        self._changed = self._all = True
+
+
+    def _take(self) -> None:
+        kinds: dict[type, int] = _KINDS
+        duel: Duel = self.duel
+        fields: dict[int, _Group] = {}
+        for player in duel.players:
+            fields.setdefault(id(duel.field[player]), _Group())
+        self._fields = list(fields.values())
+        cards: dict[int, _Group] = self._cards
+        for player in duel.players:
+            for location in LOCATIONS:
+                for card in duel.get_cards(player, Location(location)):
+                    if card is not None:
+                        cards[id(card)] = _Group()
+        seen: set[int] = {id(duel)}
+        stack: list[tuple[Any, _Group]] = [(duel, self._duel)]
+        while stack:
+            obj, group = stack.pop()
+            cls: type = type(obj)
+            kind: int = kinds.get(cls) or _classify(cls)
+            children: Any
+            if kind == _LIST:
+                group.lists.append((obj, obj[:]))
+                children = obj
+            elif kind == _DICT:
+                group.dicts.append((obj, obj.copy()))
+                children = obj.values()
+            elif kind == _OBJECT:
+                state: dict[str, Any] = obj.__dict__.copy()
+                group.objects.append((obj, state))
+                children = state.values()
+                names: tuple[str, ...] = _SLOT_NAMES[cls]
+                if names:
+                    values: list[Any] = [getattr(obj, name, _MISSING) for name in names]
+                    group.slots.append((obj, names, values))
+                    children = [*children, *values]
+            elif kind == _SLOTS:
+                names = _SLOT_NAMES[cls]
+                values = [getattr(obj, name, _MISSING) for name in names]
+                group.slots.append((obj, names, values))
+                children = values
+            elif kind == _SET:
+                group.sets.append((obj, obj.copy()))
+                children = obj
+            else: # tuple or frozenset
+                children = obj
+
+            for child in children:
+                kind = kinds.get(type(child), -1)
+                if kind == -1:
+                    kind = _classify(type(child))
+                key: int = id(child)
+                if kind != _ATOMIC_KIND and key not in seen and child is not _MISSING:
+                    seen.add(key)
+                    owner: Optional[_Group] = cards.get(key) or fields.get(key)
+                    stack.append((child, owner or group))
+
+
+
+_MISSING: Any = object()
+_ATOMIC_KIND, _LIST, _DICT, _SET, _SEQUENCE, _OBJECT, _SLOTS = range(7)
+_KINDS: dict[type, int] = {list: _LIST, dict: _DICT, set: _SET, tuple: _SEQUENCE, frozenset: _SEQUENCE}
+_SLOT_NAMES: dict[type, tuple[str, ...]] = {}
+
+
+def _classify(cls: type) -> int:
+    """ Find and cache how the values of cls are saved. """
+    if issubclass(cls, _ATOMIC):
+        kind: int = _ATOMIC_KIND
+    else:
+        names: list[str] = []
+        for klass in cls.__mro__:
+            slots = klass.__dict__.get('__slots__', ())
+            for name in (slots,) if isinstance(slots, str) else slots:
+                if name not in ('__dict__', '__weakref__') and name not in names:
+                    names.append(name)
+        _SLOT_NAMES[cls] = tuple(names)
+        kind = _OBJECT if cls.__dictoffset__ else _SLOTS
+    _KINDS[cls] = kind
+    return kind
+
+
+def snapshot(manager: GameManager) -> DuelSnapshot:
+    return DuelSnapshot(manager)
+
+
+
+def benchmark(rounds: int=200) -> None:
+    """ Print snapshots and restores per second for a duel after the opening draws, next to copy.deepcopy. """
+    import asyncio
+    import copy
+    import time
+    from ygo_core.deck import Deck
+    from ygo_client.offload import FallbackExecutor
+    from ygo_client.connection.messages import Start, DeckCount, Draw
+
+    manager: GameManager = GameManager(Deck([], [], []), FallbackExecutor())
+    asyncio.run(manager.on_start(Start(
+        player_type=0, lp_0=8000, lp_1=8000, deck_0=DeckCount(main=40, extra=15), deck_1=DeckCount(main=40, extra=15)
+    )))
+    for player in range(2):
+        manager.on_draw(Draw(player=player, count=5))
+    duel: Duel = manager.duel
+
+    def rate(label: str, fn: Callable[[], Any]) -> None:
+        start: float = time.perf_counter()
+        for _ in range(rounds):
+            fn()
+        elapsed: float = time.perf_counter() - start
+        print(f'{label:>24}: {rounds/elapsed:9.0f}/s  {elapsed/rounds*1e6:8.1f}us')
+
+    rate('deepcopy', lambda: copy.deepcopy(duel))
+    rate('snapshot', lambda: snapshot(manager).close())
+    snap: DuelSnapshot = snapshot(manager)
+    rate('restore, unchanged', snap.restore)
+    draw: Draw = Draw(player=0, count=1)
+    def draw_and_restore() -> None:
+        manager.on_draw(draw)
+        snap.restore()
+    rate('draw + restore', draw_and_restore)
+    def draw_and_full_restore() -> None:
+        manager.on_draw(draw)
+        snap.restore(full=True)
+    rate('draw + full restore', draw_and_full_restore)
+
+
+
+if __name__ == '__main__':
+    benchmark()
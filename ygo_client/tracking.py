@@ -0,0 +1,216 @@
+""" Changes GameManager makes to the cards of its Duel, for the views kept up to date from them.
+
+A DuelListener added to GameManager is told of every card added to, removed from or
+changed in a tracked location once the change is made, along with the index of the
+card in Duel.get_cards(player, location). In a zone location the index is the zone;
+in the other locations the cards after index move by one, as in a list. Any other
+change to the duel is told through on_duel_changed, with the cards it may have
+changed: a Duel method is taken to change the duel, its fields and the cards passed
+to it, so a call changing other cards is told with None.
+"""
+import functools
+from typing import Any, Optional, Sequence
+
+from ygo_core.duel import Duel, Card
+from ygo_core.card import Location
+from ygo_core.enums import Player
+
+
+DECK, HAND, MONSTER_ZONE, SPELL_ZONE, GRAVE, BANISHED, EXTRA = 0x01, 0x02, 0x04, 0x08, 0x10, 0x20, 0x40
+# locations whose cards are reported; overlay units (location | 0x80) are not, as the card of their zone stays the same
+LOCATIONS: tuple[int, ...] = (DECK, HAND, MONSTER_ZONE, SPELL_ZONE, GRAVE, BANISHED, EXTRA)
+ZONE_LOCATIONS: tuple[int, ...] = (MONSTER_ZONE, SPELL_ZONE) # cards keyed by their zone
+
+_MASK64: int = (1 << 64) - 1
+_CARD_KEY, _ZONE_KEY, _LP_KEY, _PHASE_KEY, _TURN_KEY = range(5)
+
+
+class DuelListener:
+    """ Told of the changes GameManager makes to its duel, after each of them.
+    Every method does nothing unless overridden. """
+
+    def on_reset(self) -> None:
+        """ The duel has started: every card and value may have changed. """
+        pass
+
+
+    def on_card_added(self, player: Player, location: int, index: int, card: Card) -> None:
+        pass
+
+
+    def on_card_removed(self, player: Player, location: int, index: int, card: Card) -> None:
+        """ card was at index before it was removed. """
+        pass
+
+
+    def on_card_changed(self, player: Player, location: int, index: int, card: Card) -> None:
+        """ The id, position or stats of card changed, or a zone holds card in place of another. """
+        pass
+
+
+    def on_lp_changed(self, player: Player) -> None:
+        pass
+
+
+    def on_new_turn(self) -> None:
+        pass
+
+
+    def on_new_phase(self) -> None:
+        pass
+
+
+    def on_duel_changed(self, cards: Optional[Sequence[Card]]) -> None:
+        """ A change the other methods do not describe was made: to the chain, battle or
+        phase state of the duel or its fields, or to the links, counters and flags of
+        cards; None when any card may have changed. """
+        pass
+
+
+    def on_restore(self) -> None:
+        """ A DuelSnapshot put the duel back in an earlier state: every card and value may have changed. """
+        pass
+
+
+
+def index_of(cards: Sequence[Optional[Card]], card: Card, hint: int=-1) -> int:
+    """ The index of card itself (not of an equal card) in cards, or -1. hint is tried first. """
+    if 0 <= hint < len(cards) and cards[hint] is card:
+        return hint
+    for index, other in enumerate(cards):
+        if other is card:
+            return index
+    return -1
+
+
+def removed_index(before: Sequence[Optional[Card]], after: Sequence[Optional[Card]]) -> int:
+    """ The index in before of the card missing from after, which holds the others in order. """
+    if not after or after[-1] is not before[-1]:
+        return len(before) - 1
+    for index, card in enumerate(after):
+        if card is not before[index]:
+            return index
+    return len(after)
+
+
+
+class StateHash(DuelListener):
+    """ 64-bit Zobrist hash of the observable state of duel: the id and position of the
+    cards of each location, LP, phase and turn player.\n
+    Added to the listeners of GameManager, it XORs the key of the old value of each
+    change out of value and the key of the new one in. A zone is keyed by its index.
+    The other locations are hashed as multisets: the k-th card of a location with the
+    same id and position is keyed with k, so equal cards do not cancel out and the
+    order of the cards is left out. on_reset and on_restore rehash all of duel. """
+    duel: Duel
+    value: int
+    _zones: dict[tuple[Player, int, int], int] # (player, location, zone) -> key of its card
+    _cards: dict[int, tuple[int, int, int, int]] # id of a card out of the zones -> (player, location, id, position) counted
+    _counts: dict[tuple[int, int, int, int], int] # (player, location, id, position) -> cards counted
+    _scalars: dict[tuple[int, ...], int] # LP of a player, phase or turn player -> its key
+
+    def __init__(self, duel: Duel) -> None:
+        self.duel = duel
+        self.rehash()
+
+
+    def rehash(self) -> None:
+        """ Hash all of duel again. """
+        self.value = 0
+        self._zones = {}
+        self._cards = {}
+        self._counts = {}
+        self._scalars = {}
+        for player in self.duel.players:
+            for location in LOCATIONS:
+                for index, card in enumerate(self.duel.get_cards(player, Location(location))):
+                    if card is not None:
+                        self.on_card_added(player, location, index, card)
+            self.on_lp_changed(player)
+        self.on_new_turn()
+        self.on_new_phase()
+
+
+    def on_reset(self) -> None:
+        self.rehash()
+
+
+    def on_restore(self) -> None:
+        self.rehash()
+
+
+    def on_card_added(self, player: Player, location: int, index: int, card: Card) -> None:
+        if location in ZONE_LOCATIONS:
+            self._set_zone(player, location, index, card)
+            return
+        counted: tuple[int, int, int, int] = (player.value, location, card.id or 0, _value(card.position))
+        self._cards[id(card)] = counted
+        count: int = self._counts.get(counted, 0)
+        self._counts[counted] = count + 1
+        self.value ^= zobrist_key(_CARD_KEY, *counted, count)
+
+
+    def on_card_removed(self, player: Player, location: int, index: int, card: Card) -> None:
+        if location in ZONE_LOCATIONS:
+            self._set_zone(player, location, index, None)
+            return
+        counted: Optional[tuple[int, int, int, int]] = self._cards.pop(id(card), None)
+        if counted is not None:
+            count: int = self._counts.pop(counted) - 1
+            if count:
+                self._counts[counted] = count
+            self.value ^= zobrist_key(_CARD_KEY, *counted, count)
+
+
+    def on_card_changed(self, player: Player, location: int, index: int, card: Card) -> None:
+        if location in ZONE_LOCATIONS:
+            self._set_zone(player, location, index, card)
+        else:
+            self.on_card_removed(player, location, index, card)
+            self.on_card_added(player, location, index, card)
+
+
+    def on_lp_changed(self, player: Player) -> None:
+        self._set((_LP_KEY, player.value), self.duel.field[player].life_point)
+
+
+    def on_new_turn(self) -> None:
+        turn_player: Optional[Player] = self.duel.turn_player
+        self._set((_TURN_KEY,), -1 if turn_player is None else turn_player.value)
+
+
+    def on_new_phase(self) -> None:
+        self._set((_PHASE_KEY,), _value(self.duel.phase))
+
+
+    def _set_zone(self, player: Player, location: int, index: int, card: Optional[Card]) -> None:
+        zone: tuple[Player, int, int] = (player, location, index)
+        self.value ^= self._zones.pop(zone, 0)
+        if card is not None:
+            key: int = zobrist_key(_ZONE_KEY, player.value, location, index, card.id or 0, _value(card.position))
+            self._zones[zone] = key
+            self.value ^= key
+
+
+    def _set(self, name: tuple[int, ...], value: int) -> None:
+        key: int = zobrist_key(*name, value)
+        self.value ^= self._scalars.get(name, 0) ^ key
+        self._scalars[name] = key
+
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def zobrist_key(*values: int) -> int:
+    """ Pseudo-random 64-bit key of values (splitmix64 over each of them). """
+    h: int = 0
+    for value in values:
+        h = (h + (value & _MASK64) + 0x9e3779b97f4a7c15) & _MASK64
+        h = ((h ^ (h >> 30)) * 0xbf58476d1ce4e5b9) & _MASK64
+        h = ((h ^ (h >> 27)) * 0x94d049bb133111eb) & _MASK64
+        h ^= h >> 31
+    return h
+
+
+def _value(flag: Any) -> int:
+    """ The int of a Position or Phase (wrapping an enum in .value), or 0. """
+    return getattr(flag, 'value', flag) or 0
@@ -0,0 +1,245 @@
+""" Streaming reader of EDOPro replay files (.yrp and .yrpX).
+
+A replay is a header followed by its data, LZMA-compressed unless the header says
+otherwise. The data opens with the player names and the duel flags; in a .yrpX
+the GameMessage stream of the duel follows, as (msg id (u8), size (u32), body)
+packets. Data is decompressed as it is read, so a replay of any size is read in
+bounded memory.
+
+A .yrp holds the decks and the responses of the players instead of messages, and
+the core would be needed to play them again: only its header and preamble are read.
+
+Run ``python -m ygo_client.yrp FILE...`` to print the messages per second.
+"""
+import io
+import lzma
+import struct
+from typing import BinaryIO, Iterable, Iterator, NamedTuple, Optional, Union
+
+from ygo_client.connection.packet import Packet
+from ygo_client.connection.codec import Message
+from ygo_client.connection.enums.stoc_message import StocMessage
+from ygo_client.connection.enums.game_message import GameMessage
+from ygo_client.connection.messages import GAME_MESSAGES, Payload
+
+
+REPLAY_YRP1: int = 0x31707279 # b'yrp1'
+REPLAY_YRPX: int = 0x58707279 # b'yrpX'
+
+# header flags
+REPLAY_COMPRESSED: int = 0x1
+REPLAY_TAG: int = 0x2
+REPLAY_DECODED: int = 0x4
+REPLAY_SINGLE_MODE: int = 0x8
+REPLAY_LUA64: int = 0x10
+REPLAY_NEWREPLAY: int = 0x20
+REPLAY_HAND_TEST: int = 0x40
+REPLAY_DIRECT_SEED: int = 0x80
+REPLAY_64BIT_DUELFLAG: int = 0x100
+REPLAY_EXTENDED_HEADER: int = 0x200
+
+OLD_REPLAY_MODE: int = 231 # packet embedding the .yrp of the duel at the end of a .yrpX
+
+_HEADER: struct.Struct = struct.Struct('<IIIIII8s')
+_EXTENDED_HEADER: struct.Struct = struct.Struct('<Q32s') # version, seeds
+_PACKET: struct.Struct = struct.Struct('<BI')
+_NAME_SIZE: int = 40
+_CHUNK: int = 1 << 16
+
+
+class ReplayHeader(NamedTuple):
+    id: int # REPLAY_YRP1 or REPLAY_YRPX
+    version: int
+    flags: int
+    seed: int
+    size: int # of the data once decompressed
+    hash: int
+    props: bytes # LZMA properties
+
+
+
+class Replay:
+    """ A replay read from source, a binary file or the bytes of one.\n
+    The header and the preamble are read at once; packets() and messages() read
+    the rest of the data, once. """
+    header: ReplayHeader
+    players: list[str] # those of the home team first
+    home_count: int
+    duel_flags: int
+    start_lp: Optional[int] = None # .yrp only
+    start_hand: Optional[int] = None
+    draw_count: Optional[int] = None
+    _file: BinaryIO
+    _decompressor: Optional['lzma.LZMADecompressor'] = None
+    _buffer: bytes # the data not read yet starts at _position
+    _position: int = 0
+
+    def __init__(self, source: Union[BinaryIO, bytes, bytearray, memoryview]) -> None:
+        self._file = source if hasattr(source, 'read') else io.BytesIO(source) # type: ignore
+        self._buffer = b''
+        self.header = ReplayHeader(*_HEADER.unpack(self._file.read(_HEADER.size)))
+        if self.header.id not in (REPLAY_YRP1, REPLAY_YRPX):
+            raise ValueError(f'Not a replay: {self.header.id:#x}.')
+        if self.header.flags & REPLAY_EXTENDED_HEADER:
+            self._file.read(_EXTENDED_HEADER.size)
+        if self.header.flags & REPLAY_COMPRESSED:
+            self._decompressor = lzma.LZMADecompressor(lzma.FORMAT_ALONE)
+            # the .lzma header: properties, dictionary size and data size
+            self._decompressor.decompress(self.header.props[:5] + struct.pack('<Q', self.header.size))
+        self._read_preamble()
+
+
+    @classmethod
+    def open(cls, path: str) -> 'Replay':
+        file: BinaryIO = open(path, 'rb')
+        try:
+            return cls(file)
+        except BaseException:
+            file.close()
+            raise
+
+
+    def __enter__(self) -> 'Replay':
+        return self
+
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+    def close(self) -> None:
+        self._file.close()
+
+
+    @property
+    def is_new_replay(self) -> bool:
+        """ Whether the replay holds the messages of the duel (.yrpX). """
+        return self.header.id == REPLAY_YRPX
+
+
+    def packets(self) -> Iterator[tuple[int, memoryview]]:
+        """ The (GameMessage id, body) of each message of the duel. """
+        if not self.is_new_replay:
+            raise ValueError('A .yrp holds the responses of the players, not the messages of the duel.')
+        while True:
+            head: Optional[memoryview] = self._read(_PACKET.size)
+            if head is None:
+                return
+            msg_id, size = _PACKET.unpack(head)
+            body: Optional[memoryview] = self._read(size)
+            if body is None:
+                return # truncated
+            if msg_id != OLD_REPLAY_MODE:
+                yield msg_id, body
+
+
+    def frames(self) -> Iterator[bytes]:
+        """ The messages as GAME_MSG frames (msg id followed by content), for Packet.from_bytes. """
+        for msg_id, body in self.packets():
+            yield bytes((StocMessage.GAME_MSG, msg_id)) + body
+
+
+    def messages(self, types: Optional[Iterable[int]]=None) -> Iterator[tuple[int, Message]]:
+        """ (msg id, message) of each message of types (all if None), decoded by the layouts
+        of GameManager; messages of other types are skipped undecoded. """
+        wanted: Optional[frozenset[int]] = None if types is None else frozenset(types)
+        for msg_id, body in self.packets():
+            if wanted is not None and msg_id not in wanted:
+                continue
+            layout: type[Message] = GAME_MESSAGES.get(msg_id, Payload)
+            yield _game_message(msg_id), layout.decode(Packet.from_bytes(body, msg_id=msg_id))
+
+
+    def _read_preamble(self) -> None:
+        flags: int = self.header.flags
+        self.players = []
+        if flags & REPLAY_SINGLE_MODE:
+            self.players = [self._read_name(), self._read_name()]
+            self.home_count = 1
+        else:
+            counts: list[int] = []
+            for _ in range(2):
+                count: int = self._read_u32() if flags & REPLAY_NEWREPLAY else 2 if flags & REPLAY_TAG else 1
+                self.players += [self._read_name() for _ in range(count)]
+                counts.append(count)
+            self.home_count = counts[0]
+        if self.header.id == REPLAY_YRP1:
+            self.start_lp, self.start_hand, self.draw_count = self._read_u32(), self._read_u32(), self._read_u32()
+        if flags & REPLAY_64BIT_DUELFLAG:
+            self.duel_flags = struct.unpack('<Q', self._read_exactly(8))[0]
+        else:
+            self.duel_flags = self._read_u32()
+
+
+    def _read_u32(self) -> int:
+        return int.from_bytes(self._read_exactly(4), 'little')
+
+
+    def _read_name(self) -> str:
+        name: str = bytes(self._read_exactly(_NAME_SIZE)).decode('utf-16-le', errors='replace')
+        return name.split('\0', 1)[0]
+
+
+    def _read_exactly(self, n: int) -> memoryview:
+        data: Optional[memoryview] = self._read(n)
+        if data is None:
+            raise EOFError('Replay ends within its preamble.')
+        return data
+
+
+    def _read(self, n: int) -> Optional[memoryview]:
+        """ The next n bytes of data, or None if fewer are left. """
+        while len(self._buffer) - self._position < n:
+            chunk: bytes = self._more()
+            if not chunk:
+                return None
+            # the views returned so far keep the previous buffer alive
+            self._buffer = self._buffer[self._position:] + chunk
+            self._position = 0
+        start: int = self._position
+        self._position += n
+        return memoryview(self._buffer)[start:start+n]
+
+
+    def _more(self) -> bytes:
+        """ The next chunk of data, b'' at its end. """
+        decompressor: Optional[lzma.LZMADecompressor] = self._decompressor
+        if decompressor is None:
+            return self._file.read(_CHUNK)
+        while not decompressor.eof:
+            data: bytes = b''
+            if decompressor.needs_input:
+                data = self._file.read(_CHUNK)
+                if not data:
+                    break # truncated
+            chunk: bytes = decompressor.decompress(data, _CHUNK)
+            if chunk:
+                return chunk
+        return b''
+
+
+
+def _game_message(msg_id: int) -> int:
+    try:
+        return GameMessage(msg_id)
+    except ValueError:
+        return msg_id
+
+
+def benchmark(paths: list[str]) -> None:
+    """ Decode every message of the replays at paths and print the messages per second. """
+    import time
+    messages: int = 0
+    start: float = time.perf_counter()
+    for path in paths:
+        with Replay.open(path) as replay:
+            for _ in replay.messages():
+                messages += 1
+    elapsed: float = time.perf_counter() - start
+    print(f'{messages} messages in {elapsed:.3f}s: {messages/elapsed:.0f}/s')
+
+
+
+if __name__ == '__main__':
+    import sys
+    benchmark(sys.argv[1:])